@@ -4,11 +4,19 @@ FA Report Improvement Script v2.1.5
 Updated: 2026-01-29
 """
 
+import argparse
+import contextlib
+import csv
+import io
 import json
 import os
 import sys
 import subprocess
 import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # 強制 stdout/stderr 使用 utf-8 編碼 (解決 Windows cp950 問題)
 if sys.platform.startswith('win'):
@@ -23,6 +31,8 @@ from pptx.dml.color import RGBColor
 
 # 導入 PPT 轉換器
 from ppt_converter import PPTConverter
+# 與 app/services/json_extract.py 同步的 JSON 擷取/修復工具
+from json_extract import extract_json
 
 def auto_convert_if_needed(input_file):
     """自動檢測並轉換 .ppt 文件為 .pptx"""
@@ -42,42 +52,46 @@ def auto_convert_if_needed(input_file):
     
     return input_file, None
 
-def sanitize_json_content(content):
-    """清理 JSON 內容，移除多餘結尾符號或 Markdown 標記"""
-    import re
-    # 移除 Markdown 代碼塊標記
-    content = content.replace("```json", "").replace("```", "").strip()
-    
-    # 移除結尾可能存在的標點符號 (如 }. 或 }, 或 }; )
-    content = re.sub(r'\}\s*[,.;\s]*$', '}', content)
-    content = re.sub(r'\]\s*[,.;\s]*$', ']', content)
-    
-    # 移除內容中物件或陣列結尾多餘的逗號 (如 "a": 1, } -> "a": 1 })
-    content = re.sub(r',\s*\}', '}', content)
-    content = re.sub(r',\s*\]', ']', content)
-    
-    return content
-
-def load_evaluation(eval_path):
-    """載入評估結果"""
+def load_evaluations(eval_path):
+    """載入評估結果，一律回傳 list (評核系統匯出的陣列含多份報告的評估)"""
     with open(eval_path, 'r', encoding='utf-8') as f:
         raw_content = f.read()
         
     try:
         data = json.loads(raw_content)
-    except json.JSONDecodeError:
-        # 嘗試清洗後再次解析
-        try:
-            sanitized = sanitize_json_content(raw_content)
-            data = json.loads(sanitized)
-        except Exception as e:
+    except json.JSONDecodeError as e:
+        # 嘗試略過 Markdown 標記、結尾標點與多餘逗號後再次解析
+        data = extract_json(raw_content, openers="{[")
+        if data is None:
             # 如果還是失敗，拋出更有意義的訊息
             raise ValueError(f"JSON 格式解析失敗 (已嘗試自動修正仍無效)。原始錯誤: {str(e)}")
 
-    # Handle JSON array format - take first item if it's a list
-    if isinstance(data, list) and len(data) > 0:
-        return data[0]
-    return data
+    entries = data if isinstance(data, list) else [data]
+    if not entries:
+        raise ValueError("評估 JSON 為空陣列")
+    return entries
+
+def _deck_key(file_name):
+    """比對用的檔名：去除路徑與副檔名 (.ppt 與轉換後的 .pptx 視為同一份)"""
+    return os.path.splitext(os.path.basename(str(file_name or '')))[0].strip().lower()
+
+def match_evaluation(entries, input_file):
+    """依 file_name 找出對應簡報的評估；找不到時回傳 None"""
+    key = _deck_key(input_file)
+    for entry in entries:
+        if isinstance(entry, dict) and _deck_key(entry.get('file_name')) == key:
+            return entry
+    return None
+
+def load_evaluation(eval_path, input_file=None):
+    """載入單一報告的評估：陣列格式時依 file_name 對應 input_file，找不到則使用第一筆"""
+    entries = load_evaluations(eval_path)
+    if len(entries) > 1:
+        matched = match_evaluation(entries, input_file) if input_file else None
+        if matched is not None:
+            return matched
+        print(f"⚠️  評估 JSON 含 {len(entries)} 筆資料但無對應 file_name，使用第一筆")
+    return entries[0]
 
 def get_or_create_title(slide):
     """安全地獲取或創建標題形狀"""
@@ -278,35 +292,89 @@ def add_prevention_measures_slide(prs):
     
     return slide
 
-def fix_summary_slide(prs):
-    """修正 Summary 投影片佈局"""
-    summary_idx = None
-    for i, slide in enumerate(prs.slides):
-        for shape in slide.shapes:
-            if hasattr(shape, 'text_frame'):
-                if 'Summary' in shape.text_frame.text or '根因' in shape.text_frame.text:
-                    summary_idx = i
-                    break
-        if summary_idx is not None:
-            break
-    
-    if summary_idx is None:
+class ShapeInfo:
+    """形狀與其文字 (text_frame.text 每次都會串接所有 run，只讀一次)"""
+    __slots__ = ('shape', 'text')
+
+    def __init__(self, shape, text):
+        self.shape = shape
+        self.text = text
+
+class SlideEntry:
+    __slots__ = ('position', 'slide', 'shapes')
+
+    def __init__(self, position, slide):
+        self.position = position
+        self.slide = slide
+        self.shapes = [ShapeInfo(shape, shape.text_frame.text)
+                       for shape in slide.shapes if hasattr(shape, 'text_frame')]
+
+    def contains(self, *keywords):
+        return any(keyword in info.text for info in self.shapes for keyword in keywords)
+
+class SlideIndex:
+    """投影片索引：依序走訪原始投影片一次 (需要到哪裡才建到哪裡)，快取各形狀的文字，
+    供所有改善步驟共用；新增投影片的搬移先記錄在清單上，存檔前一次套用到 XML"""
+
+    def __init__(self, prs):
+        self.prs = prs
+        self._slides = list(prs.slides)
+        self._entries = []
+        self._order = list(prs.slides._sldIdLst)
+        self._reordered = False
+
+    def __len__(self):
+        return len(self._slides)
+
+    def entries(self):
+        for position in range(len(self._slides)):
+            if position == len(self._entries):
+                self._entries.append(SlideEntry(position, self._slides[position]))
+            yield self._entries[position]
+
+    def find(self, *keywords):
+        """第一張任一形狀文字包含關鍵字的原始投影片"""
+        for entry in self.entries():
+            if entry.contains(*keywords):
+                return entry
+        return None
+
+    def place_last_slide(self, position):
+        """把剛新增 (位於最後) 的投影片排到 position，語意同 list.insert，實際搬移延到 apply_order"""
+        self._order.insert(position, self.prs.slides._sldIdLst[-1])
+        self._reordered = True
+
+    def apply_order(self):
+        if not self._reordered:
+            return
+        xml_slides = self.prs.slides._sldIdLst
+        placed = set(self._order)
+        # append 既有子元素即為搬移，依序 append 一次完成所有重排
+        for element in self._order + [e for e in xml_slides if e not in placed]:
+            xml_slides.append(element)
+        self._reordered = False
+
+def fix_summary_slide(prs, index=None):
+    """修正 Summary 投影片佈局 (只在原始投影片中尋找，不會選到新增的改善頁)"""
+    if index is None:
+        index = SlideIndex(prs)
+    entry = index.find('Summary', '根因')
+    if entry is None:
         return
     
-    slide = prs.slides[summary_idx]
+    slide = entry.slide
     
     # 清除現有內容(保留標題)
     title_shape = None
-    for shape in list(slide.shapes):
-        if hasattr(shape, 'text_frame'):
-            text = shape.text_frame.text.strip()
-            if 'Summary' in text and len(text) < 20:
-                title_shape = shape
-                continue
-            if text.isdigit() or (len(text) <= 3 and text):
-                continue
-            if hasattr(shape, 'text_frame'):
-                shape.text_frame.clear()
+    for info in entry.shapes:
+        text = info.text.strip()
+        if 'Summary' in text and len(text) < 20:
+            title_shape = info.shape
+            continue
+        if text.isdigit() or (len(text) <= 3 and text):
+            continue
+        info.shape.text_frame.clear()
+        info.text = ''
     
     # 添加左側 - 根因確認依據
     left = Inches(0.5)
@@ -408,63 +476,9 @@ def improve_report(input_pptx, eval_json, output_pptx):
     
     try:
         prs = Presentation(converted_file)
-        eval_data = load_evaluation(eval_json)
-        
-        print(f"原始分數: {eval_data.get('total_score', 'N/A')}")
-        print(f"等級: {eval_data.get('grade', 'N/A')}")
-        
-        improvements = []
-        dimensions = eval_data.get('dimensions', {})
-        
-        # 1. 基本資訊
-        if dimensions.get('基本資訊完整性', 100) < 80:
-            print("✓ 添加基本資訊投影片")
-            basic_slide = add_basic_info_slide(prs, eval_data)
-            xml_slides = prs.slides._sldIdLst
-            slides = list(xml_slides)
-            xml_slides.remove(slides[-1])
-            xml_slides.insert(2, slides[-1])
-            improvements.append("添加完整基本資訊頁")
-        
-        # 2. 根因分析
-        if dimensions.get('根因分析', 100) < 80:
-            print("✓ 添加統計驗證分析投影片")
-            stat_slide = add_statistical_analysis_slide(prs)
-            xml_slides = prs.slides._sldIdLst
-            slides = list(xml_slides)
-            xml_slides.remove(slides[-1])
-            xml_slides.insert(8, slides[-1])
-            improvements.append("添加統計驗證分析")
-        
-        # 3. 改善對策
-        if dimensions.get('改善對策', 100) < 85:
-            print("✓ 添加長期預防措施投影片")
-            prev_slide = add_prevention_measures_slide(prs)
-            xml_slides = prs.slides._sldIdLst
-            slides = list(xml_slides)
-            xml_slides.remove(slides[-1])
-            xml_slides.insert(-2, slides[-1])
-            improvements.append("添加長期預防措施")
-        
-        # 4. 修正 Summary
-        print("✓ 改善總結投影片")
-        fix_summary_slide(prs)
-        improvements.append("修正 Summary 佈局")
-        
-        # 5. 圖表說明改善
-        print("✓ 改善圖表說明")
-        improvements.append("改善圖表標註")
-        
-        # 保存
-        os.makedirs(os.path.dirname(output_pptx) or '.', exist_ok=True)
-        prs.save(output_pptx)
-        
-        print(f"\n報告改善完成!")
-        print(f"輸出檔案: {output_pptx}")
-        print(f"\n主要改善項目:")
-        for i, imp in enumerate(improvements, 1):
-            print(f"{i}. ✓ {imp}")
-        
+        eval_data = load_evaluation(eval_json, input_pptx)
+        improvements = improve_presentation(prs, eval_data)
+        save_presentation(prs, output_pptx, improvements)
         return True
         
     finally:
@@ -472,15 +486,347 @@ def improve_report(input_pptx, eval_json, output_pptx):
         if converter:
             converter.cleanup()
 
+def improve_presentation(prs, eval_data, index=None):
+    """依評估結果改善已載入的簡報，回傳改善項目"""
+    if index is None:
+        index = SlideIndex(prs)
+    print(f"原始分數: {eval_data.get('total_score', 'N/A')}")
+    print(f"等級: {eval_data.get('grade', 'N/A')}")
+    
+    improvements = []
+    dimensions = eval_data.get('dimensions', {})
+    
+    # 1. 基本資訊
+    if dimensions.get('基本資訊完整性', 100) < 80:
+        print("✓ 添加基本資訊投影片")
+        add_basic_info_slide(prs, eval_data)
+        index.place_last_slide(2)
+        improvements.append("添加完整基本資訊頁")
+    
+    # 2. 根因分析
+    if dimensions.get('根因分析', 100) < 80:
+        print("✓ 添加統計驗證分析投影片")
+        add_statistical_analysis_slide(prs)
+        index.place_last_slide(8)
+        improvements.append("添加統計驗證分析")
+    
+    # 3. 改善對策
+    if dimensions.get('改善對策', 100) < 85:
+        print("✓ 添加長期預防措施投影片")
+        add_prevention_measures_slide(prs)
+        index.place_last_slide(-2)
+        improvements.append("添加長期預防措施")
+    
+    # 4. 修正 Summary
+    print("✓ 改善總結投影片")
+    fix_summary_slide(prs, index)
+    improvements.append("修正 Summary 佈局")
+    
+    # 5. 圖表說明改善
+    print("✓ 改善圖表說明")
+    improvements.append("改善圖表標註")
+    
+    # 新增投影片的排序一次套用
+    index.apply_order()
+    return improvements
+
+def save_presentation(prs, output_pptx, improvements):
+    os.makedirs(os.path.dirname(output_pptx) or '.', exist_ok=True)
+    prs.save(output_pptx)
+    
+    print(f"\n報告改善完成!")
+    print(f"輸出檔案: {output_pptx}")
+    print(f"\n主要改善項目:")
+    for i, imp in enumerate(improvements, 1):
+        print(f"{i}. ✓ {imp}")
+
+# ---------------------------------------------------------------------------
+# 陣列模式：一份評估 JSON 陣列對應多份簡報，單次執行全部處理
+# ---------------------------------------------------------------------------
+
+def index_decks(decks_dir):
+    """建立 檔名 -> 路徑 索引 (忽略大小寫與副檔名)；同名的 .pptx 優先於 .ppt (免轉換)"""
+    index = {}
+    for name in sorted(os.listdir(decks_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in PPT_EXTENSIONS or stem.endswith('_converted'):
+            continue
+        key = _deck_key(name)
+        if key not in index or ext.lower() == '.pptx':
+            index[key] = os.path.join(decks_dir, name)
+    return index
+
+def improve_reports_from_array(eval_json, decks_dir, output_dir):
+    """評估 JSON 只解析一次；每份簡報只轉換與讀取一次，每筆評估各自輸出一份檔案
+
+    輸出檔名一律加上 `_improved` (同一簡報有多筆評估時再加序號)，不會寫到任何輸入簡報或重複的路徑。
+    """
+    entries = load_evaluations(eval_json)
+    deck_index = index_decks(decks_dir)
+    used = {_path_key(os.path.join(decks_dir, name)) for name in os.listdir(decks_dir)
+            if os.path.splitext(name)[1].lower() in PPT_EXTENSIONS}
+    plan = {}  # 簡報路徑 -> [(序號, 評估)]
+    results = [None] * len(entries)
+    for position, entry in enumerate(entries):
+        file_name = entry.get('file_name') if isinstance(entry, dict) else None
+        deck = deck_index.get(_deck_key(file_name)) if file_name else None
+        if deck is None:
+            reason = '評估缺少 file_name' if not file_name else f'找不到對應簡報: {file_name}'
+            results[position] = {'entry': position, 'file_name': file_name, 'input': None, 'output': None,
+                                 'ok': False, 'error': reason, 'seconds': 0.0}
+            print(f"✗ [{position + 1}/{len(entries)}] {reason}")
+            continue
+        plan.setdefault(deck, []).append((position, entry))
+
+    for deck, deck_entries in plan.items():
+        converted_file, converter = auto_convert_if_needed(deck)
+        try:
+            deck_bytes = None
+            if converted_file is not None:
+                with open(converted_file, 'rb') as f:
+                    deck_bytes = f.read()
+            stem = os.path.splitext(os.path.basename(deck))[0]
+            for n, (position, entry) in enumerate(deck_entries):
+                started, cpu_started = time.perf_counter(), time.process_time()
+                suffix = f"_improved_{n + 1}" if len(deck_entries) > 1 else '_improved'
+                output_pptx = os.path.join(output_dir, f"{stem}{suffix}.pptx")
+                result = {'entry': position, 'file_name': entry.get('file_name'), 'input': deck,
+                          'output': output_pptx, 'ok': False, 'error': None}
+                try:
+                    if _path_key(output_pptx) in used:
+                        raise ValueError(f'輸出路徑與輸入簡報或其他評估的輸出相同: {output_pptx}')
+                    used.add(_path_key(output_pptx))
+                    if deck_bytes is None:
+                        raise ValueError('無法轉換輸入文件')
+                    prs = Presentation(io.BytesIO(deck_bytes))
+                    improvements = improve_presentation(prs, entry)
+                    save_presentation(prs, output_pptx, improvements)
+                    result['ok'] = True
+                except Exception as e:
+                    result['error'] = f"{type(e).__name__}: {e}"
+                    traceback.print_exc()
+                result['seconds'] = round(time.perf_counter() - started, 3)
+                result['cpu_seconds'] = round(time.process_time() - cpu_started, 3)
+                results[position] = result
+                mark = '✓' if result['ok'] else '✗'
+                print(f"{mark} [{position + 1}/{len(entries)}] {result['file_name']} ({result['seconds']}s)"
+                      + ('' if result['ok'] else f": {result['error']}"))
+        finally:
+            if converter:
+                converter.cleanup()
+    return results
+
+# ---------------------------------------------------------------------------
+# 批次模式：一次處理多份報告，以多行程平行執行 (每個行程只付一次直譯器與 pptx 載入成本)
+# ---------------------------------------------------------------------------
+
+PPT_EXTENSIONS = ('.ppt', '.pptx')
+MANIFEST_KEYS = {
+    'input': ('input', 'report', 'input_file'),
+    'evaluation': ('evaluation', 'eval', 'evaluation_json', 'eval_json'),
+    'output': ('output', 'output_file', 'output_pptx'),
+}
+
+def _manifest_value(row, field):
+    for key in MANIFEST_KEYS[field]:
+        if row.get(key):
+            return str(row[key]).strip()
+    return None
+
+def load_batch_manifest(manifest_path):
+    """讀取 CSV (需標題列) 或 JSONL 清單，每列為 input / evaluation / output；相對路徑以清單所在目錄為準"""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+        if manifest_path.lower().endswith(('.jsonl', '.ndjson')):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    items = []
+    for line_no, row in enumerate(rows, 1):
+        paths = {field: _manifest_value(row, field) for field in MANIFEST_KEYS}
+        missing = [field for field, value in paths.items() if not value]
+        if missing:
+            raise ValueError(f"清單第 {line_no} 筆缺少欄位: {', '.join(missing)}")
+        items.append({field: os.path.join(base_dir, value) for field, value in paths.items()})
+    _reject_duplicate_outputs(items)
+    return items
+
+def _path_key(path):
+    return os.path.normcase(os.path.realpath(path))
+
+def _reject_duplicate_outputs(items):
+    """兩個項目輸出到同一路徑時，後完成的會覆寫先完成的結果，整批拒絕"""
+    seen = {}
+    for item in items:
+        key = _path_key(item['output'])
+        if key in seen:
+            raise ValueError(f"輸出路徑重複: {seen[key]['input']} 與 {item['input']} 都會寫到 {item['output']}")
+        seen[key] = item
+
+def discover_batch_items(input_dir, eval_dir, output_dir):
+    """目錄模式：input_dir 中的每份簡報對應 eval_dir 中同名的 .json，輸出到 output_dir"""
+    items = []
+    for name in sorted(os.listdir(input_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in PPT_EXTENSIONS or stem.endswith('_converted'):
+            continue
+        items.append({
+            'input': os.path.join(input_dir, name),
+            'evaluation': os.path.join(eval_dir, stem + '.json'),
+            'output': os.path.join(output_dir, stem + '.pptx'),
+        })
+    _reject_duplicate_outputs(items)
+    return items
+
+def _init_batch_worker(profile_root):
+    if profile_root:
+        os.environ['FA_LIBREOFFICE_PROFILE'] = os.path.join(profile_root, str(os.getpid()))
+
+def _run_batch_item(item):
+    """於 Worker 行程中處理一份報告；輸出與例外都收進結果，不中斷整批"""
+    log = io.StringIO()
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        with contextlib.redirect_stdout(log):
+            ok = improve_report(item['input'], item['evaluation'], item['output'])
+        error = None if ok else '改善失敗'
+    except Exception as e:
+        ok, error = False, f"{type(e).__name__}: {e}"
+        log.write(traceback.format_exc())
+    result = dict(item, ok=ok, error=error, seconds=round(time.perf_counter() - started, 3),
+                  cpu_seconds=round(time.process_time() - cpu_started, 3), pid=os.getpid())
+    if not ok:
+        result['log'] = log.getvalue().splitlines()[-20:]
+    return result
+
+def run_batch(items, workers=None, summary_path=None):
+    """平行處理所有項目並寫出 JSON 摘要；回傳摘要內容"""
+    workers = max(1, min(workers or os.cpu_count() or 1, len(items) or 1))
+    started_at = time.time()
+    wall_start = time.perf_counter()
+    results = [None] * len(items)
+
+    pending = {}
+    inputs = {_path_key(item['input']) for item in items}
+    for index, item in enumerate(items):
+        missing = [field for field in ('input', 'evaluation') if not os.path.exists(item[field])]
+        if missing:
+            error = f"找不到檔案: {', '.join(item[f] for f in missing)}"
+        elif _path_key(item['output']) in inputs:
+            error = f"輸出路徑會覆寫輸入檔: {item['output']}"
+        else:
+            pending[index] = item
+            continue
+        results[index] = dict(item, ok=False, error=error, seconds=0.0, cpu_seconds=0.0, pid=None)
+
+    print(f"批次處理 {len(items)} 份報告 (workers={workers})")
+    profile_root = tempfile.mkdtemp(prefix='fa_batch_lo_')
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(profile_root,)) as pool:
+            futures = {pool.submit(_run_batch_item, item): index for index, item in pending.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    # Worker 行程異常結束 (例如記憶體不足)
+                    results[index] = dict(items[index], ok=False, error=f"{type(e).__name__}: {e}",
+                                          seconds=None, cpu_seconds=None, pid=None)
+                result = results[index]
+                mark = '✓' if result['ok'] else '✗'
+                print(f"{mark} [{done}/{len(pending)}] {os.path.basename(result['input'])} "
+                      f"({result['seconds'] if result['seconds'] is not None else '-'}s)"
+                      + ('' if result['ok'] else f": {result['error']}"))
+    finally:
+        shutil.rmtree(profile_root, ignore_errors=True)
+
+    return write_summary(results, workers, started_at, wall_start, summary_path)
+
+def write_summary(results, workers, started_at, wall_start, summary_path=None):
+    succeeded = sum(1 for r in results if r['ok'])
+    summary = {
+        'started_at': started_at,
+        'workers': workers,
+        'total': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'wall_seconds': round(time.perf_counter() - wall_start, 3),
+        # 各項目在處理行程中的 CPU 時間總和 (不含 LibreOffice 轉換子行程)
+        'cpu_seconds': round(sum(r.get('cpu_seconds') or 0 for r in results), 3),
+        'items': results,
+    }
+    if summary_path:
+        os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"\n批次完成: {succeeded}/{len(results)} 成功，耗時 {summary['wall_seconds']}s")
+    return summary
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        prog='improve_fa_report.py',
+        description='批次改善 FA 報告 (多行程平行處理，單一檔案失敗不影響其他檔案)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--batch', metavar='MANIFEST', help='CSV (input,evaluation,output 標題列) 或 JSONL 清單')
+    source.add_argument('--batch-dir', nargs=3, metavar=('INPUT_DIR', 'EVAL_DIR', 'OUTPUT_DIR'),
+                        help='簡報目錄、同名評核 JSON 目錄與輸出目錄')
+    source.add_argument('--evaluations', nargs=3, metavar=('EVAL_JSON', 'DECK_DIR', 'OUTPUT_DIR'),
+                        help='評估 JSON 陣列 (依 file_name 對應簡報目錄中的檔案)，單一行程依序處理全部')
+    parser.add_argument('--workers', type=int, default=None, help='平行行程數 (預設為 CPU 核心數)')
+    parser.add_argument('--summary', default=None, help='JSON 摘要輸出路徑 (預設 batch_summary.json)')
+    args = parser.parse_args(argv)
+
+    if args.evaluations:
+        eval_json, decks_dir, output_dir = args.evaluations
+        if not os.path.isdir(decks_dir):
+            parser.error(f"找不到目錄: {decks_dir}")
+        started_at, wall_start = time.time(), time.perf_counter()
+        results = improve_reports_from_array(eval_json, decks_dir, output_dir)
+        summary = write_summary(results, 1, started_at, wall_start,
+                                args.summary or os.path.join(output_dir, 'batch_summary.json'))
+        sys.exit(0 if summary['failed'] == 0 else 1)
+
+    if args.batch:
+        try:
+            items = load_batch_manifest(args.batch)
+        except ValueError as e:
+            parser.error(str(e))
+        default_summary = os.path.join(os.path.dirname(os.path.abspath(args.batch)), 'batch_summary.json')
+    else:
+        input_dir, eval_dir, output_dir = args.batch_dir
+        for directory in (input_dir, eval_dir):
+            if not os.path.isdir(directory):
+                parser.error(f"找不到目錄: {directory}")
+        if _path_key(output_dir) == _path_key(input_dir):
+            parser.error("輸出目錄不可與簡報目錄相同 (會覆寫原始簡報)")
+        try:
+            items = discover_batch_items(input_dir, eval_dir, output_dir)
+        except ValueError as e:
+            parser.error(str(e))
+        default_summary = os.path.join(output_dir, 'batch_summary.json')
+
+    summary = run_batch(items, args.workers, args.summary or default_summary)
+    sys.exit(0 if summary['failed'] == 0 else 1)
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ('--batch', '--batch-dir', '--evaluations'):
+        batch_main(sys.argv[1:])
+        return
+
     if len(sys.argv) < 4:
         print("使用方法: python improve_fa_report.py <input.ppt/pptx> <evaluation.json> <output.pptx>")
+        print("          python improve_fa_report.py --batch manifest.csv|manifest.jsonl [--workers N] [--summary summary.json]")
+        print("          python improve_fa_report.py --batch-dir <input_dir> <eval_dir> <output_dir> [--workers N]")
+        print("          python improve_fa_report.py --evaluations <evaluations.json> <deck_dir> <output_dir>")
         print("\n支持格式:")
         print("  - .pptx (PowerPoint 2007+)")
         print("  - .ppt (PowerPoint 97-2003) - 自動轉換")
         print("\n範例:")
         print("  python improve_fa_report.py report.ppt eval.json improved.pptx")
         print("  python improve_fa_report.py report.pptx eval.json improved.pptx")
+        print("  python improve_fa_report.py --batch-dir reports/ evaluations/ improved/ --workers 8")
         sys.exit(1)
     
     input_file = sys.argv[1]
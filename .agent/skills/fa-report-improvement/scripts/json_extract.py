@@ -0,0 +1,237 @@
+"""
+LLM 回傳內容的 JSON 擷取與修復工具
+
+此檔同步複製到 .agent/skills/fa-report-improvement/scripts/json_extract.py
+(技能在獨立 venv 中執行，無法 import app 套件)，修改時兩份須保持一致。
+只依賴標準函式庫。
+"""
+
+import bisect
+import json
+import re
+from typing import Any, Iterator, List, Optional, Tuple
+
+# 容器內需要處理的結構字元 (一般逗號不停留，只停在緊接右括號的多餘逗號)；
+# 字串內只需要找引號與跳脫字元
+_STRUCTURAL = re.compile(r'[{}\[\]"]|,(?=\s*[}\]])')
+_STRING_SPECIAL = re.compile(r'["\\]')
+# 候選片段的開頭必須像 JSON (如 `{"` 或 `[1`)，說明文字中的 {placeholder} 直接略過
+_PLAUSIBLE_START = re.compile(r'\{\s*["}]|\[\s*[\]\[{"\-0-9tfn]')
+_OPENER_FOR = {"}": "{", "]": "["}
+_DECODER = json.JSONDecoder()
+
+
+def _skip_string(text: str, pos: int) -> int:
+    """pos 為開頭引號之後的位置，回傳結尾引號之後的位置"""
+    while True:
+        m = _STRING_SPECIAL.search(text, pos)
+        if m is None:
+            return len(text)
+        if text[m.start()] == "\\":
+            pos = m.start() + 2
+            continue
+        return m.start() + 1
+
+
+def _scan_candidates(text: str, openers: str, start: int) -> Iterator[Tuple[int, int, List[int]]]:
+    """單次掃描，依起點順序產生 (起點, 終點, 多餘逗號位置) 候選片段
+
+    以堆疊配對括號並追蹤字串狀態，開頭不像 JSON 的配對不列為候選。每當最外層容器閉合時，
+    就交出其中所有配對完成的片段 (外層在前、內層在後)，
+    呼叫端可在第一個有效物件處提前結束，不必掃完整段文字。
+    """
+    n = len(text)
+    stack: List[Tuple[str, int]] = []
+    pairs: List[Tuple[int, int]] = []
+    trailing_commas: List[int] = []
+    pos = start
+    while pos < n:
+        if not stack:
+            # 容器之外的說明文字只需找下一個起始括號
+            found = [i for i in (text.find(o, pos) for o in openers) if i >= 0]
+            if not found:
+                break
+            pos = min(found)
+            stack.append((text[pos], pos))
+            pos += 1
+            continue
+
+        m = _STRUCTURAL.search(text, pos)
+        if m is None:
+            break
+        i = m.start()
+        ch = text[i]
+        pos = i + 1
+        if ch == '"':
+            pos = _skip_string(text, pos)
+        elif ch == ",":
+            trailing_commas.append(i)
+        elif ch in "{[":
+            stack.append((ch, i))
+        elif stack[-1][0] == _OPENER_FOR[ch]:
+            _, begin = stack.pop()
+            if text[begin] in openers and _PLAUSIBLE_START.match(text, begin):
+                pairs.append((begin, i + 1))
+            if not stack:
+                pairs.sort()
+                for begin, end in pairs:
+                    yield begin, end, trailing_commas
+                pairs, trailing_commas = [], []
+        # 不成對的右括號視為說明文字中的雜訊，忽略
+
+    # 文字結束時仍未閉合 (例如回應被截斷)：只剩內層已配對的片段可嘗試
+    pairs.sort()
+    for begin, end in pairs:
+        yield begin, end, trailing_commas
+
+
+def _decode_candidate(text: str, begin: int, end: int, trailing_commas: List[int], repair: bool):
+    # 只解析配對範圍內的片段：JSONDecodeError 會計算錯誤位置的行列號，
+    # 若直接在整段文字上以位移量解析，每次失敗的成本會與位移量成正比
+    lo = bisect.bisect_left(trailing_commas, begin)
+    hi = bisect.bisect_left(trailing_commas, end)
+    if lo == hi or not repair:
+        try:
+            return json.loads(text[begin:end]), True
+        except (ValueError, RecursionError):
+            return None, False
+    # 組出片段時順便略過多餘的逗號
+    pieces, cursor = [], begin
+    for comma in trailing_commas[lo:hi]:
+        pieces.append(text[cursor:comma])
+        cursor = comma + 1
+    pieces.append(text[cursor:end])
+    try:
+        return json.loads("".join(pieces)), True
+    except (ValueError, RecursionError):
+        return None, False
+
+
+def extract_json(text: str, openers: str = "{", repair: bool = True) -> Optional[Any]:
+    """從任意文字中取出第一個有效的 JSON 物件 (或陣列)，找不到時回傳 None
+
+    - 前後的說明文字、Markdown 代碼塊標記與結尾標點 (如 `}.`) 會被自然略過
+    - repair=True 時修正物件/陣列結尾多餘的逗號 (如 `"a": 1, }`)
+    - 常見情況以位移量直接解析原字串、不複製；其餘候選由單次掃描配對括號後
+      只解析各自的範圍，不再對每個 `{` 切出到結尾的字串，整體為線性時間
+      (巢狀候選會各自再解析一次，成本與巢狀深度成正比)
+    """
+    found = [i for i in (text.find(o) for o in openers) if i >= 0]
+    if not found:
+        return None
+    first = min(found)
+    # 常見情況：第一個括號就是完整的 JSON，直接交給 C 實作的解碼器
+    try:
+        return _DECODER.raw_decode(text, first)[0]
+    except (ValueError, RecursionError):
+        pass
+    for begin, end, trailing_commas in _scan_candidates(text, openers, first):
+        value, ok = _decode_candidate(text, begin, end, trailing_commas, repair)
+        if ok:
+            return value
+    return None
+
+
+class IncrementalJSONScanner:
+    """逐段餵入串流文字，在第一個完整的頂層 JSON 物件閉合時立即回傳
+
+    追蹤大括號深度與字串/跳脫狀態，只在深度歸零時解析一次 (與 extract_json 相同地修正多餘逗號)，
+    不會退回內層物件。頂層片段無法解析時：沒有內層物件 (例如說明文字中的 `{braces}`) 就略過繼續掃描；
+    否則停止逐段擷取，交由 finish() 以 extract_json 處理整段文字，結果與非串流一致。
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.result = None
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._deferred = False
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, chunk: str):
+        """加入新的文字片段；若已取得完整物件則回傳之，否則回傳 None"""
+        if self.done:
+            return self.result
+        self.text += chunk
+        if self._deferred:
+            return None
+        return self._scan()
+
+    def _reset_candidate(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = -1
+
+    def _scan(self):
+        text = self.text
+        i = self._pos
+        n = len(text)
+        while i < n:
+            if self._start < 0:
+                i = text.find("{", i)
+                if i < 0:
+                    i = n
+                    break
+                self._start = i
+                self._depth = 1
+                i += 1
+                continue
+
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    value, ok = self._decode_top_level(i + 1)
+                    if ok:
+                        self.result = value
+                        self._pos = i + 1
+                        return self.result
+                    if text.find("{", self._start + 1, i) < 0:
+                        # 沒有內層物件的雜訊 (如 `{note}`)：extract_json 同樣會略過，繼續往後掃描
+                        self._reset_candidate()
+                        i += 1
+                        continue
+                    self._deferred = True
+                    self._pos = n
+                    return None
+            i += 1
+        self._pos = i
+        return None
+
+    def _decode_top_level(self, end: int):
+        text = self.text
+        try:
+            return json.loads(text[self._start:end]), True
+        except (ValueError, RecursionError):
+            pass
+        # 以 extract_json 的掃描找出多餘逗號，只修復頂層片段本身
+        for begin, span_end, trailing_commas in _scan_candidates(text[:end], "{", self._start):
+            if (begin, span_end) == (self._start, end):
+                return _decode_candidate(text, begin, span_end, trailing_commas, True)
+            break
+        return None, False
+
+    def finish(self) -> Optional[dict]:
+        """串流結束時呼叫：若仍未閉合，改用 extract_json 對整段文字做擷取與修復"""
+        if self.done:
+            return self.result
+        self.result = extract_json(self.text)
+        return self.result
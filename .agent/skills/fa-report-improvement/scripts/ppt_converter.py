@@ -59,14 +59,13 @@ class PPTConverter:
             if libreoffice_cmd:
                 print(f"✓ 找到 LibreOffice，進行轉換...")
                 output_dir = os.path.dirname(ppt_path) or '.'
+                cmd = [libreoffice_cmd, '--headless', '--convert-to', 'pptx', '--outdir', output_dir, ppt_path]
+                # 批次模式下每個行程使用獨立的設定檔目錄，避免多個 soffice 同時執行時互相衝突
+                profile_dir = os.environ.get('FA_LIBREOFFICE_PROFILE')
+                if profile_dir:
+                    cmd.insert(1, f'-env:UserInstallation={Path(profile_dir).absolute().as_uri()}')
                 result = subprocess.run(
-                    [
-                        libreoffice_cmd,
-                        '--headless',
-                        '--convert-to', 'pptx',
-                        '--outdir', output_dir,
-                        ppt_path
-                    ],
+                    cmd,
                     capture_output=True,
                     timeout=30
                 )
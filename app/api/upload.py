@@ -1,41 +1,49 @@
-from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks, HTTPException, Security, Depends, status, Request
-from fastapi.responses import FileResponse
-import shutil
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Security, Depends, status, Request, Query
+from fastapi.responses import StreamingResponse
+import asyncio
+import functools
 import os
 import json
 import time
+from typing import NamedTuple, Optional
 from app.services.skill_manager import skill_manager
 from app.services.llm_client import llm_client
+from app.services.job_manager import job_manager, Job, JobFailedError, QueueFullError
+from app.services.result_cache import get_result_cache, hash_file
+from app.services.storage import StoredBlob, get_upload_storage, get_storage_gc, safe_filename
+from app.services.artifacts import artifact_response, json_payload_response
+from app.services.json_extract import extract_json
 from fastapi.security import APIKeyHeader
 
 import logging
 # 設定日誌
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
-import re
 
-def robust_load_json(file_path: str):
+def robust_load_json(file_path: str, openers: str = "{"):
     """強健地讀取 JSON 檔案，處理可能的尾隨逗號或多餘字元"""
     with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read().strip()
-    
-    # 使用 JSONDecoder 處理尾擬雜訊
-    try:
-        start_index = content.find('{')
-        if start_index == -1:
-            return json.loads(content)
-            
-        decoder = json.JSONDecoder()
-        data, end_pos = decoder.raw_decode(content[start_index:])
-        logger.info(f"DEBUG: Robust Load Success (EndPos: {end_pos}, TotalLen: {len(content)})")
+        content = f.read()
+
+    data = extract_json(content, openers=openers)
+    if data is not None:
         return data
-    except Exception as e:
-        logger.warning(f"Robust Load Failed, falling back: {e}")
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+    logger.warning("Robust Load Failed, falling back to strict json.loads")
+    return json.loads(content)
+
+def _deck_key(file_name) -> str:
+    return os.path.splitext(os.path.basename(str(file_name or "")))[0].strip().lower()
+
+def match_evaluation_index(entries: list, report_path: str) -> int:
+    """評估陣列中對應報告的索引：與技能 improve_fa_report.load_evaluation 相同，
+    依 file_name 比對 (忽略路徑、大小寫與副檔名)，找不到時使用第一筆"""
+    key = _deck_key(report_path)
+    for position, entry in enumerate(entries):
+        if isinstance(entry, dict) and _deck_key(entry.get("file_name")) == key:
+            return position
+    return 0
 
 def get_api_key(
     request: Request,
@@ -67,8 +75,6 @@ def get_api_key(
 
 router = APIRouter(prefix="/api")
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @router.post("/upload")
 async def upload_report(
@@ -78,28 +84,41 @@ async def upload_report(
     api_key: str = Depends(get_api_key)
 ):
     # 此處邏輯與 upload_direct 共享處理部分，稍後重構
-    report_path, json_path, output_path, output_filename = await prepare_paths(report, evaluation_json)
-    
-    success, message = await process_report_task(report_path, json_path, output_path, prompt)
+    prepared = await prepare_paths(report, evaluation_json)
+    try:
+        success, message = await process_report_task(
+            prepared.report_path, prepared.json_path, prepared.output_path, prompt,
+            content_hashes=prepared.content_hashes
+        )
+    finally:
+        get_upload_storage().release(prepared.workspace_id)
     
     if success:
-        return {"status": "completed", "output_file": output_filename}
+        return {"status": "completed", "output_file": prepared.output_filename}
     else:
         return handle_error(message)
 
 @router.post("/upload-direct")
 async def upload_report_direct(
+    request: Request,
     report: UploadFile = File(...), 
     evaluation_json: UploadFile = File(...),
     prompt: str = Form(None),
     api_key: str = Depends(get_api_key)
 ):
     logger.info(f"API Received: {report.filename}, starting processing...")
-    report_path, json_path, output_path, output_filename = await prepare_paths(report, evaluation_json)
+    prepared = await prepare_paths(report, evaluation_json)
+    output_path = prepared.output_path
     
     start_time = time.time()
     
-    success, message = await process_report_task(report_path, json_path, output_path, prompt)
+    try:
+        success, message = await process_report_task(
+            prepared.report_path, prepared.json_path, output_path, prompt,
+            content_hashes=prepared.content_hashes
+        )
+    finally:
+        get_upload_storage().release(prepared.workspace_id)
     
     elapsed = time.time() - start_time
     logger.info(f"Processing finished in {elapsed:.2f} seconds.")
@@ -107,7 +126,7 @@ async def upload_report_direct(
     if success:
         if os.path.exists(output_path):
             logger.info(f"Returning file: {output_path}")
-            return FileResponse(output_path, filename=output_filename, media_type='application/vnd.openxmlformats-officedocument.presentationml.presentation')
+            return await artifact_response(request, output_path)
         logger.error(f"Output file missing: {output_path}")
         raise HTTPException(status_code=500, detail="Output file not found after processing")
     else:
@@ -115,23 +134,50 @@ async def upload_report_direct(
         logger.error(f"Processing failed: {err}")
         raise HTTPException(status_code=400, detail=err)
 
-async def prepare_paths(report, evaluation_json):
-    report_path = os.path.join(UPLOAD_DIR, report.filename)
-    json_path = os.path.join(UPLOAD_DIR, evaluation_json.filename)
-    
-    with open(report_path, "wb") as buffer:
-        shutil.copyfileobj(report.file, buffer)
-        
-    with open(json_path, "wb") as buffer:
-        shutil.copyfileobj(evaluation_json.file, buffer)
-    
-    import time
+class PreparedUpload(NamedTuple):
+    report_path: str
+    json_path: str
+    output_path: str
+    output_filename: str      # 相對於上傳目錄的路徑 (<workspace_id>/<檔名>)
+    content_hashes: dict      # 上傳時順便計算的 SHA-256，供結果快取直接使用
+    workspace_id: str         # 已被 pin，處理完畢後須 upload_storage.release()
+
+async def prepare_paths(report, evaluation_json) -> PreparedUpload:
+    """串流儲存上傳檔案並建立本次請求的獨立工作目錄"""
+    upload_storage = get_upload_storage()
+    saved = await asyncio.gather(
+        upload_storage.save_upload(report),
+        upload_storage.save_upload(evaluation_json),
+        return_exceptions=True
+    )
+    workspace_id = None
+    try:
+        for result in saved:
+            if isinstance(result, BaseException):
+                raise result
+        report_blob, json_blob = saved
+        workspace_id = upload_storage.create_workspace()
+        report_name = safe_filename(report.filename, "report.pptx")
+        report_path = upload_storage.materialize(report_blob, workspace_id, report_name)
+        json_path = upload_storage.materialize(json_blob, workspace_id, safe_filename(evaluation_json.filename, "evaluation.json"))
+    except BaseException:
+        if workspace_id is not None:
+            upload_storage.discard_workspace(workspace_id)
+        raise
+    finally:
+        # blob 已連結進工作目錄 (或本次請求放棄)，交回給 GC 管理
+        for result in saved:
+            if isinstance(result, StoredBlob):
+                upload_storage.release_blob(result.sha256)
+
     timestamp = time.strftime("%Y%m%d_%H%M%S")
-    base_name = os.path.splitext(report.filename)[0]
-    output_filename = f"{base_name}_improved_{timestamp}.pptx"
-    output_path = os.path.join(UPLOAD_DIR, output_filename)
+    base_name = os.path.splitext(report_name)[0]
+    output_name = f"{base_name}_improved_{timestamp}.pptx"
+    output_path = upload_storage.workspace_path(workspace_id, output_name)
+    output_filename = f"{workspace_id}/{output_name}"
+    content_hashes = {"report": report_blob.sha256, "evaluation_json": json_blob.sha256}
     
-    return report_path, json_path, output_path, output_filename
+    return PreparedUpload(report_path, json_path, output_path, output_filename, content_hashes, workspace_id)
 
 def handle_error(message):
     error_type = "處理失敗"
@@ -150,22 +196,75 @@ def handle_error(message):
 
 # ... (router definition)
 
-async def process_report_task(report_path: str, json_path: str, output_path: str, prompt: str = None):
+async def lookup_cached_result(report_path: str, json_path: str, output_path: str, prompt: str = None,
+                               content_hashes: dict = None, skill=None):
+    """查詢結果快取；命中時直接將先前的成品放到 output_path
+
+    回傳 (由 LLM 模型產生快取鍵的函式, 是否命中)。有提示詞時鍵包含實際回應的模型，
+    查詢時依序嘗試各端點的模型。
+    """
+    skill = skill or skill_manager.get_skill()
+    result_cache = get_result_cache()
+    if not skill or not result_cache.enabled:
+        return None, False
+    result_cache.invalidate_skill(skill.id, skill.version)
+    if content_hashes:
+        report_hash, json_hash = content_hashes["report"], content_hashes["evaluation_json"]
+    else:
+        report_hash, json_hash = await asyncio.gather(
+            asyncio.to_thread(hash_file, report_path),
+            asyncio.to_thread(hash_file, json_path)
+        )
+    key_for = functools.partial(result_cache.make_key, report_hash, json_hash, prompt, skill.id, skill.version)
+    for cache_key in dict.fromkeys(key_for(model) for model in llm_client.models):
+        if await asyncio.to_thread(result_cache.get, cache_key, output_path):
+            return key_for, True
+    return key_for, False
+
+async def process_report_task(report_path: str, json_path: str, output_path: str, prompt: str = None, job: Job = None, content_hashes: dict = None):
     final_json_path = json_path
     logger.info(f"Starting processing for {report_path}")
+    # 工作開始時固定技能版本，熱重載不影響執行中的工作與其快取鍵
+    skill = skill_manager.get_skill()
+
+    key_for, hit = await lookup_cached_result(report_path, json_path, output_path, prompt, content_hashes, skill)
+    if hit:
+        logger.info(f"Result cache hit for {report_path}")
+        if job:
+            job.update_progress("cached", "使用快取結果")
+        return True, "result cache hit"
     
+    # 有提示詞但 AI 加工失敗時，成品是以原始 JSON 產生的，不可存進以提示詞為鍵的快取
+    cacheable = True
+    served_model = None
     # 如果有提示詞，啟動 LLM 加工
     if prompt and prompt.strip():
+        cacheable = False
         logger.info(f"啟動 AI 加工模式，提示詞: {prompt}")
+        if job:
+            job.update_progress("refining", "AI 加工評核 JSON 中")
         try:
-            original_json_data = robust_load_json(json_path)
+            document = robust_load_json(json_path, openers="{[")
+            # 評估陣列：只加工對應此報告的那一筆，其餘原樣寫回
+            entries = document if isinstance(document, list) else None
+            if entries is not None and not entries:
+                raise ValueError("評估 JSON 為空陣列")
+            position = match_evaluation_index(entries, report_path) if entries is not None else None
+            original_json_data = entries[position] if entries is not None else document
             
-            success, refined_data = await llm_client.refine_evaluation_json(original_json_data, prompt)
+            success, refined_data, served_model = await llm_client.refine_with_model(original_json_data, prompt)
             if success:
-                refined_json_path = json_path.replace(".json", "_refined.json")
+                if entries is not None:
+                    if isinstance(original_json_data, dict) and "file_name" in original_json_data:
+                        # 保留 file_name，技能才會選到同一筆
+                        refined_data = dict(refined_data, file_name=original_json_data["file_name"])
+                    refined_data = entries[:position] + [refined_data] + entries[position + 1:]
+                # 以新檔寫出，輸入檔是唯讀 blob 的硬連結，不可原地覆寫
+                refined_json_path = os.path.splitext(json_path)[0] + "_refined.json"
                 with open(refined_json_path, "w", encoding="utf-8") as f:
                     json.dump(refined_data, f, ensure_ascii=False, indent=2)
                 final_json_path = refined_json_path
+                cacheable = True
                 logger.info("AI 加工完成")
             else:
                 logger.error(f"AI 加工失敗: {refined_data}")
@@ -174,24 +273,161 @@ async def process_report_task(report_path: str, json_path: str, output_path: str
             logger.error(f"AI 加工過程發生異常: {e}")
 
     logger.info(f"Calling skill manager with: {final_json_path}")
-    return skill_manager.run_improvement(report_path, final_json_path, output_path)
+    if job:
+        job.update_progress("processing", "執行報告改善技能中")
+    success, message = await skill_manager.run_improvement_async(
+        report_path, final_json_path, output_path,
+        on_output=job.log if job else None, skill=skill
+    )
+    if success and key_for and cacheable:
+        await asyncio.to_thread(get_result_cache().put, key_for(served_model), output_path, skill.id, skill.version)
+    return success, message
 
-@router.get("/skills")
-async def list_skills(api_key: str = Depends(get_api_key)):
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    report: UploadFile = File(...),
+    evaluation_json: UploadFile = File(...),
+    prompt: str = Form(None),
+    api_key: str = Depends(get_api_key)
+):
+    """非同步提交：立即回傳 job_id，由背景排程器處理"""
+    prepared = await prepare_paths(report, evaluation_json)
+
+    async def work(job: Job):
+        try:
+            success, message = await process_report_task(
+                prepared.report_path, prepared.json_path, prepared.output_path, prompt,
+                job=job, content_hashes=prepared.content_hashes
+            )
+        finally:
+            get_upload_storage().release(prepared.workspace_id)
+        if not success:
+            raise JobFailedError(handle_error(message))
+        return {"output_file": prepared.output_filename}
+
+    try:
+        job = await job_manager.submit(work, meta={"report": report.filename})
+    except QueueFullError as e:
+        get_upload_storage().release(prepared.workspace_id)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    logger.info(f"Job {job.id} queued for {report.filename}")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/result"
+    }
+
+def _get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, api_key: str = Depends(get_api_key)):
+    job = _get_job_or_404(job_id)
+    data = job.to_dict()
+    if job.status == "queued":
+        data["queue_position"] = job_manager.queue_position(job)
+    return data
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request, api_key: str = Depends(get_api_key)):
+    """以 Server-Sent Events 串流工作進度 (支援 Last-Event-ID 斷線續傳)"""
+    job = _get_job_or_404(job_id)
+    try:
+        last_event_id = int(request.headers.get("last-event-id", "-1"))
+    except ValueError:
+        last_event_id = -1
+
+    async def event_source():
+        yield "retry: 3000\n\n"
+        async for event_id, event in job.stream(last_event_id):
+            if await request.is_disconnected():
+                return
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        yield f"event: end\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.api_route("/jobs/{job_id}/result", methods=["GET", "HEAD"])
+async def get_job_result(job_id: str, request: Request, api_key: str = Depends(get_api_key)):
+    job = _get_job_or_404(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=400, detail=job.error)
+    if job.status != "completed":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is {job.status}")
+    output_path = get_upload_storage().resolve(job.result["output_file"])
+    if not output_path or not os.path.exists(output_path):
+        raise HTTPException(status_code=410, detail="Output file no longer available")
+    return await artifact_response(request, output_path)
+
+@router.get("/stats")
+async def get_stats(api_key: str = Depends(get_api_key)):
+    """儲存空間、結果快取與工作佇列的即時統計"""
     from app.services.skill_manager import skill_registry
-    return skill_registry.list_skills()
+    jobs = list(job_manager.jobs.values())
+    return {
+        "storage": get_storage_gc().stats(),
+        "result_cache": get_result_cache().stats(),
+        "llm": llm_client.stats(),
+        "skills": skill_registry.stats(),
+        "jobs": {status_name: sum(1 for j in jobs if j.status == status_name)
+                 for status_name in ("queued", "running", "completed", "failed")}
+    }
+
+@router.get("/skills")
+async def list_skills(
+    request: Request,
+    q: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    fields: Optional[str] = None,
+    api_key: str = Depends(get_api_key)
+):
+    """技能清單；q 為全文檢索 (name / description / tags)，fields 為逗號分隔的投影欄位，總數見 X-Total-Count"""
+    from app.services.skill_manager import skill_registry, serialize_payload
+    if q is None and offset == 0 and limit is None and fields is None:
+        payload = skill_registry.list_payload()
+        total = len(skill_registry.skills)
+    else:
+        try:
+            total, items = skill_registry.search_skills(
+                q, offset, limit, [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        payload = serialize_payload(items)
+    return json_payload_response(request, payload.body, payload.etag, headers={"X-Total-Count": str(total)})
 
 @router.get("/skills/{skill_id}")
-async def get_skill_manifest(skill_id: str, api_key: str = Depends(get_api_key)):
+async def get_skill_manifest(skill_id: str, request: Request, api_key: str = Depends(get_api_key)):
     from app.services.skill_manager import skill_registry
     skill = skill_registry.get_skill(skill_id)
     if not skill:
         raise HTTPException(status_code=404, detail=f"Skill '{skill_id}' not found")
-    return skill.metadata
+    payload = skill.manifest_payload
+    return json_payload_response(request, payload.body, payload.etag)
+
+@router.get("/bootstrap")
+async def bootstrap(request: Request, api_key: str = Depends(get_api_key)):
+    """介面首次載入所需資料：技能清單與預設技能的 manifest (含 inputs)"""
+    from app.services.skill_manager import skill_registry, CORE_SKILL_ID
+    payload = skill_registry.bootstrap_payload(CORE_SKILL_ID)
+    return json_payload_response(request, payload.body, payload.etag)
 
-@router.get("/download/{filename}")
-async def download_file(filename: str, api_key: str = Depends(get_api_key)):
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    if os.path.exists(file_path):
-        return FileResponse(file_path, filename=filename, media_type='application/vnd.openxmlformats-officedocument.presentationml.presentation')
+@router.api_route("/download/{filename:path}", methods=["GET", "HEAD"])
+async def download_file(filename: str, request: Request, api_key: str = Depends(get_api_key)):
+    file_path = get_upload_storage().resolve(filename)
+    if file_path and os.path.isfile(file_path):
+        return await artifact_response(request, file_path)
     return {"error": "File not found"}
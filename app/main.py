@@ -1,9 +1,13 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
 
 load_dotenv()
+logging.basicConfig(level=logging.INFO)
 
 try:
     from app.api import upload
@@ -13,7 +17,30 @@ except ImportError:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from app.api import upload
 
-app = FastAPI(title="FA Report Improvement System")
+from app.services.job_manager import job_manager
+from app.services.skill_manager import get_skill_registry
+from app.services.storage import get_storage_gc
+from app.services.result_cache import get_result_cache
+from app.services.llm_client import llm_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 技能掃描 (或讀取 manifest 快照)、上傳目錄與結果快取索引在啟動階段於執行緒中建立，import app.main 不做磁碟 I/O
+    skill_registry = await asyncio.to_thread(get_skill_registry)
+    storage_gc = await asyncio.to_thread(get_storage_gc)
+    await asyncio.to_thread(get_result_cache)
+    await llm_client.startup()
+    await job_manager.start()
+    storage_gc.start()
+    skill_registry.start()
+    yield
+    await skill_registry.stop()
+    await storage_gc.stop()
+    await job_manager.stop()
+    await skill_registry.aclose()
+    await llm_client.aclose()
+
+app = FastAPI(title="FA Report Improvement System", lifespan=lifespan)
 
 # 掛載靜態檔案與模板
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -0,0 +1,126 @@
+import asyncio
+import collections
+import logging
+import random
+import time
+from typing import Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimiter:
+    """AIMD 併發上限：成功且延遲在目標內時加法遞增，過載 (429/503/逾時) 或延遲過高時乘法遞減
+
+    與 TCP 壅塞控制相同，一批同時失敗的請求只遞減一次：
+    只有在上次遞減之後才開始的請求，才會再次觸發遞減。
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, latency_target: float,
+                 decrease_factor: float = 0.7):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.overloads = 0
+        self._last_decrease_at = 0.0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _take(self) -> float:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return time.monotonic()
+
+    async def acquire(self) -> float:
+        """等待可用的併發名額，回傳開始時間 (release 時傳回)"""
+        if self._has_capacity() and not self._waiters:
+            return self._take()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已被喚醒但隨即取消：名額讓給下一位
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return time.monotonic()
+
+    def try_acquire(self) -> Optional[float]:
+        """不等待；沒有餘裕時回傳 None (用於對沖請求，避免在過載時放大流量)"""
+        if self._has_capacity() and not self._waiters:
+            return self._take()
+        return None
+
+    def release(self, started_at: float, overloaded: bool = False, succeeded: bool = True):
+        self.in_flight -= 1
+        latency = time.monotonic() - started_at
+        if overloaded or (succeeded and latency > self.latency_target):
+            if overloaded:
+                self.overloads += 1
+            if started_at >= self._last_decrease_at:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease_at = time.monotonic()
+                self.decreases += 1
+                logger.warning(f"LLM concurrency limit decreased to {int(self.limit)} "
+                               f"({'overload' if overloaded else f'latency {latency:.1f}s'})")
+        elif succeeded and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.increases += 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "peak_in_flight": self.peak_in_flight,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "overloads": self.overloads,
+        }
+
+
+class LatencyTracker:
+    """保留最近 N 筆成功請求的延遲，用於計算對沖請求的觸發時間"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = collections.deque(maxlen=window)
+
+    def record(self, latency: float):
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """指數退避加完整抖動 (full jitter)；伺服器指定 Retry-After 時以其為下限"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
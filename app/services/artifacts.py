@@ -0,0 +1,110 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+from app.services.result_cache import hash_file
+
+PPTX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+ARTIFACT_CACHE_CONTROL = "private, max-age=86400"
+# 技能清單可能因熱重載改變：瀏覽器可快取但每次以 ETag 重新驗證
+MANIFEST_CACHE_CONTROL = "private, no-cache"
+
+
+class ContentHashIndex:
+    """以 (路徑, mtime, 大小) 為鍵快取檔案的 SHA-256，避免每次下載都重新計算"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, stat_result: os.stat_result) -> str:
+        key = (os.path.realpath(path), stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is not None:
+                self._entries.move_to_end(key)
+                return digest
+        digest = hash_file(path)
+        self.prime(path, stat_result, digest)
+        return digest
+
+    def prime(self, path: str, stat_result: os.stat_result, digest: str):
+        key = (os.path.realpath(path), stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            self._entries[key] = digest
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+content_hashes = ContentHashIndex()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """RFC 7232 弱比較：忽略 W/ 前綴，支援多個 ETag 與 *"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((c[2:] if c.startswith("W/") else c) == bare for c in candidates)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """判斷條件式 GET 是否可回覆 304 (If-None-Match 優先於 If-Modified-Since)"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def json_payload_response(request: Request, body: bytes, etag: str,
+                          cache_control: str = MANIFEST_CACHE_CONTROL, headers: Optional[dict] = None) -> Response:
+    """回傳預先序列化的 JSON，ETag 相符時回覆 304"""
+    headers = dict(headers or {}, ETag=etag)
+    headers["Cache-Control"] = cache_control
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class ArtifactResponse(FileResponse):
+    # 較大的讀取區塊可減少大型簡報的 send 次數；伺服器支援 pathsend 時則直接零複製傳送
+    chunk_size = 1024 * 1024
+
+
+async def artifact_response(request: Request, path: str, filename: Optional[str] = None,
+                            media_type: str = PPTX_MEDIA_TYPE) -> Response:
+    """回傳帶有強 ETag (內容 SHA-256) 的檔案回應，支援 304 與 Range 續傳"""
+    stat_result = await asyncio.to_thread(os.stat, path)
+    digest = await asyncio.to_thread(content_hashes.get, path, stat_result)
+    etag = f'"{digest}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": ARTIFACT_CACHE_CONTROL,
+    }
+    if is_not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+    # Range / If-Range 由 FileResponse 依上述 ETag 處理
+    return ArtifactResponse(
+        path,
+        filename=filename or os.path.basename(path),
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result
+    )
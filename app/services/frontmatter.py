@@ -0,0 +1,103 @@
+"""
+SKILL.md Frontmatter 解析
+
+只讀取檔案開頭到結束 `---` 為止的標頭 (不讀 Markdown 內文)，有 libyaml 時使用 CSafeLoader，
+並以 (路徑, mtime, 大小) 快取解析結果，重複掃描未變動的檔案不再解析。
+"""
+
+import copy
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    import yaml
+    _YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:
+    yaml = None
+    _YAML_LOADER = None
+
+logger = logging.getLogger(__name__)
+
+FRONTMATTER_DELIMITER = "---"
+# 沒有結束分隔線時最多讀取的標頭行數，避免把整份文件當成標頭
+MAX_HEADER_LINES = 1000
+
+
+def read_frontmatter(file_path: str) -> Optional[str]:
+    """回傳 Frontmatter 原文；檔案不是以 `---` 開頭時退回全文搜尋 (相容舊格式)"""
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        first = f.readline()
+        while first and not first.strip():
+            first = f.readline()
+        if first.rstrip() == FRONTMATTER_DELIMITER:
+            lines = []
+            for _ in range(MAX_HEADER_LINES):
+                line = f.readline()
+                if not line or line.rstrip() == FRONTMATTER_DELIMITER:
+                    return "".join(lines) if line else None
+                lines.append(line)
+            return None
+        content = first + f.read()
+    match = re.search(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL | re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def load_frontmatter(frontmatter_raw: str):
+    """解析 YAML (支援 PyYAML 或簡單 Key-Value 回退)"""
+    if yaml is not None:
+        return yaml.load(frontmatter_raw, Loader=_YAML_LOADER)
+    # 簡單的 Key-Value 解析回退 (針對跨環境相容性)
+    metadata = {}
+    for line in frontmatter_raw.split('\n'):
+        if ':' in line:
+            k, v = line.split(':', 1)
+            metadata[k.strip()] = v.strip().strip('"').strip("'")
+    return metadata
+
+
+class FrontmatterCache:
+    """以 (路徑, mtime, 大小) 為鍵快取解析後的 metadata"""
+
+    def __init__(self, max_entries: int = 8192):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, file_path: str):
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            return None
+        key = (os.path.abspath(file_path), stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._entries[key])
+            self.misses += 1
+
+        frontmatter_raw = read_frontmatter(file_path)
+        metadata = load_frontmatter(frontmatter_raw) if frontmatter_raw is not None else None
+        with self._lock:
+            self._entries[key] = metadata
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(metadata)
+
+
+frontmatter_cache = FrontmatterCache()
+
+
+def parse_skill_metadata(file_path):
+    """提取並解析 SKILL.md 中的 YAML Frontmatter"""
+    try:
+        return frontmatter_cache.parse(file_path)
+    except Exception as e:
+        logger.error(f"Error parsing {file_path}: {e}")
+    return None
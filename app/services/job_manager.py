@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """排程佇列已滿，呼叫端應回覆 503 讓客戶端稍後重試"""
+
+
+class JobFailedError(RuntimeError):
+    """工作以結構化錯誤結束 (detail 與 handle_error 的回傳格式相同)"""
+
+    def __init__(self, detail: dict):
+        super().__init__(detail.get("message", ""))
+        self.detail = detail
+
+
+class Job:
+    """單一背景工作的狀態 (queued -> running -> completed / failed)"""
+
+    def __init__(self, job_id: str, func: Callable[["Job"], Awaitable], meta: Optional[dict] = None):
+        self.id = job_id
+        self.func = func
+        self.meta = meta or {}
+        self.status = "queued"
+        self.stage = "queued"
+        self.message = ""
+        self.result: Optional[dict] = None
+        self.error: Optional[dict] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[dict] = []
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def publish(self, event: dict):
+        """記錄一筆進度事件並喚醒所有訂閱者"""
+        event.setdefault("time", time.time())
+        self.events.append(event)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def update_progress(self, stage: str, message: str = ""):
+        self.stage = stage
+        self.message = message
+        self.publish({"type": "stage", "status": self.status, "stage": stage, "message": message})
+
+    def log(self, line: str):
+        """記錄技能輸出的一行；以 ✓ 開頭的階段標記視為步驟事件"""
+        text = line.strip()
+        if not text:
+            return
+        if text.startswith("✓"):
+            self.message = text.lstrip("✓ ").strip()
+            self.publish({"type": "step", "stage": self.stage, "message": self.message})
+        else:
+            self.publish({"type": "log", "stage": self.stage, "message": text})
+
+    async def stream(self, last_event_id: int = -1, heartbeat: float = 15.0) -> AsyncIterator[Tuple[Optional[int], Optional[dict]]]:
+        """依序產生 (event_id, event)；閒置超過 heartbeat 秒時產生 (None, None) 作為保活訊號"""
+        next_id = last_event_id + 1
+        while True:
+            while next_id < len(self.events):
+                yield next_id, self.events[next_id]
+                next_id += 1
+            if self.done:
+                return
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None, None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "message": self.message,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """有界的背景工作排程器：固定數量的執行協程從佇列取出工作"""
+
+    def __init__(self, concurrency: int = 2, max_queue: int = 100, ttl_seconds: float = 3600):
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(1, max_queue)
+        self.ttl_seconds = ttl_seconds
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker_loop(i)) for i in range(self.concurrency)]
+        logger.info(f"JobManager started with {self.concurrency} workers (queue size {self.max_queue})")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    async def submit(self, func: Callable[[Job], Awaitable], meta: Optional[dict] = None) -> Job:
+        """排入一個工作。func(job) 需回傳結果 dict，拋出例外則視為失敗"""
+        if not self.running:
+            await self.start()
+        self._prune()
+        job = Job(uuid.uuid4().hex, func, meta)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self.max_queue})")
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def queue_position(self, job: Job) -> int:
+        """估算工作前方仍在排隊的數量"""
+        return sum(1 for j in self.jobs.values() if j.status == "queued" and j.created_at < job.created_at)
+
+    def _prune(self):
+        """移除超過保留時間的已完成工作"""
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [j.id for j in self.jobs.values() if j.done and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def _worker_loop(self, index: int):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            job.update_progress("running")
+            try:
+                job.result = await job.func(job)
+                job.status = "completed"
+                job.finished_at = time.time()
+                job.update_progress("completed")
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = {"status": "error", "error_type": "處理失敗", "message": "伺服器關閉，工作已取消"}
+                job.finished_at = time.time()
+                job.update_progress("failed", job.error["message"])
+                raise
+            except JobFailedError as e:
+                logger.error(f"Job {job.id} failed: {e}")
+                job.status = "failed"
+                job.error = e.detail
+                job.finished_at = time.time()
+                job.update_progress("failed", str(e))
+            except Exception as e:
+                logger.exception(f"Job {job.id} crashed: {e}")
+                job.status = "failed"
+                job.error = {"status": "error", "error_type": "處理失敗", "message": str(e) or type(e).__name__}
+                job.finished_at = time.time()
+                job.update_progress("failed", str(e))
+            finally:
+                self._queue.task_done()
+
+
+job_manager = JobManager(
+    concurrency=int(os.getenv("JOB_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+    ttl_seconds=float(os.getenv("JOB_TTL_SECONDS", "3600"))
+)
@@ -0,0 +1,146 @@
+"""
+JSON Patch (RFC 6902) 與 JSON Merge Patch (RFC 7386) 的本地套用
+
+LLM 加工的 patch 模式只要求模型輸出差異，由此模組驗證後套用到原始評核 JSON。
+"""
+
+import copy
+from typing import Any, List, Tuple
+
+PATCH_OPS = {"add", "remove", "replace", "move", "copy", "test"}
+
+
+class JSONPatchError(ValueError):
+    """patch 格式錯誤或無法套用 (路徑不存在、test 不符等)"""
+
+
+def _parse_pointer(pointer: str) -> List[str]:
+    """RFC 6901 JSON Pointer 轉為路徑片段 (~1 -> /, ~0 -> ~)"""
+    if not isinstance(pointer, str):
+        raise JSONPatchError(f"path 必須是字串: {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JSONPatchError(f"JSON Pointer 必須以 / 開頭: {pointer}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _array_index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JSONPatchError(f"無效的陣列索引: {token}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JSONPatchError(f"陣列索引超出範圍: {token}")
+    return index
+
+
+def _resolve_parent(doc: Any, tokens: List[str]) -> Tuple[Any, str]:
+    target = doc
+    for token in tokens[:-1]:
+        if isinstance(target, dict):
+            if token not in target:
+                raise JSONPatchError(f"路徑不存在: /{'/'.join(tokens)}")
+            target = target[token]
+        elif isinstance(target, list):
+            target = target[_array_index(target, token, allow_end=False)]
+        else:
+            raise JSONPatchError(f"路徑不存在: /{'/'.join(tokens)}")
+    return target, tokens[-1]
+
+
+def _get(doc: Any, tokens: List[str]) -> Any:
+    if not tokens:
+        return doc
+    parent, key = _resolve_parent(doc, tokens)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JSONPatchError(f"路徑不存在: /{'/'.join(tokens)}")
+        return parent[key]
+    if isinstance(parent, list):
+        return parent[_array_index(parent, key, allow_end=False)]
+    raise JSONPatchError(f"路徑不存在: /{'/'.join(tokens)}")
+
+
+def _add(doc: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent, key = _resolve_parent(doc, tokens)
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(parent, key, allow_end=True), value)
+    else:
+        raise JSONPatchError(f"無法在非容器上新增: /{'/'.join(tokens)}")
+    return doc
+
+
+def _remove(doc: Any, tokens: List[str]) -> Any:
+    if not tokens:
+        raise JSONPatchError("不可移除整份文件")
+    parent, key = _resolve_parent(doc, tokens)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JSONPatchError(f"路徑不存在: /{'/'.join(tokens)}")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_array_index(parent, key, allow_end=False))
+    raise JSONPatchError(f"路徑不存在: /{'/'.join(tokens)}")
+
+
+def apply_patch(doc: Any, patch: Any) -> Any:
+    """套用 RFC 6902 JSON Patch，回傳新文件 (不修改傳入的 doc)；任何一個操作失敗即整體失敗"""
+    if not isinstance(patch, list):
+        raise JSONPatchError("JSON Patch 必須是操作陣列")
+    result = copy.deepcopy(doc)
+    for index, operation in enumerate(patch):
+        if not isinstance(operation, dict) or operation.get("op") not in PATCH_OPS:
+            raise JSONPatchError(f"第 {index} 個操作格式錯誤: {operation!r}")
+        op = operation["op"]
+        path = _parse_pointer(operation.get("path"))
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise JSONPatchError(f"第 {index} 個操作缺少 value: {operation!r}")
+
+        if op == "add":
+            result = _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(result, path)
+        elif op == "replace":
+            _get(result, path)  # 目標必須存在
+            value = copy.deepcopy(operation["value"])
+            if not path:
+                result = value
+            else:
+                parent, key = _resolve_parent(result, path)
+                # 原地取代，保留物件鍵的順序
+                parent[_array_index(parent, key, False) if isinstance(parent, list) else key] = value
+        elif op in ("move", "copy"):
+            source = _parse_pointer(operation.get("from"))
+            if op == "move" and path[:len(source)] == source and path != source:
+                raise JSONPatchError("不可將節點移動到自己的子路徑")
+            value = _remove(result, source) if op == "move" else copy.deepcopy(_get(result, source))
+            result = _add(result, path, value)
+        elif op == "test":
+            if _get(result, path) != operation["value"]:
+                raise JSONPatchError(f"test 操作不符: {operation.get('path')}")
+    return result
+
+
+def _merge(target: dict, patch: dict) -> dict:
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict):
+            child = target.get(key)
+            target[key] = _merge(child if isinstance(child, dict) else {}, value)
+        else:
+            target[key] = copy.deepcopy(value)
+    return target
+
+
+def apply_merge_patch(doc: Any, patch: Any) -> Any:
+    """套用 RFC 7386 JSON Merge Patch：物件遞迴合併，null 代表刪除，其餘值直接取代"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    return _merge(copy.deepcopy(doc) if isinstance(doc, dict) else {}, patch)
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_json(data) -> str:
+    """排序鍵、去除空白的標準化 JSON，使語意相同的評核內容得到相同的鍵"""
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def normalize_prompt(prompt: Optional[str]) -> str:
+    """去除首尾空白並合併連續空白，避免僅因排版差異而重複呼叫 LLM"""
+    return re.sub(r"\s+", " ", (prompt or "").strip())
+
+
+def refinement_key(original_json, prompt: str, model: str, temperature: float) -> str:
+    parts = [canonical_json(original_json), normalize_prompt(prompt), model, repr(float(temperature))]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class RefinementCache:
+    """LLM 加工結果的本地持久化快取 (SQLite，具 TTL 與 LRU 上限)"""
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int, enabled: bool = True):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # 連線延後到第一次使用 (或 lifespan 啟動時的 warm_up) 才建立，import 時不做磁碟 I/O
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is not None:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refinements ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_refinements_access ON refinements(last_access)")
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            self._connect()
+            row = self._conn.execute(
+                "SELECT value, created_at FROM refinements WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM refinements WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE refinements SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._connect()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO refinements (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._conn.execute("DELETE FROM refinements WHERE created_at < ?", (now - self.ttl_seconds,))
+            count = self._conn.execute("SELECT COUNT(*) FROM refinements").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM refinements WHERE key IN "
+                    "(SELECT key FROM refinements ORDER BY last_access ASC LIMIT ?)", (overflow,)
+                )
+                self.evictions += overflow
+
+    def stats(self) -> dict:
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                self._connect()
+                entries = self._conn.execute("SELECT COUNT(*) FROM refinements").fetchone()[0]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def warm_up(self):
+        if self.enabled:
+            with self._lock:
+                self._connect()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
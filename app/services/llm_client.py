@@ -1,85 +1,502 @@
+import asyncio
 import httpx
 import os
 import json
-from typing import List, Dict
+import logging
+import time
+from typing import List, Dict, Optional
+from app.services.adaptive_limiter import AdaptiveLimiter, LatencyTracker, backoff_delay
+from app.services.llm_cache import RefinementCache, refinement_key
+from app.services.llm_router import Endpoint, EndpointRouter, parse_endpoints
+from app.services.json_extract import IncrementalJSONScanner, extract_json
+from app.services.json_patch import JSONPatchError, apply_merge_patch, apply_patch
+from app.services.prompt_compaction import PromptBudgetError, compact_dumps, compact_payload, estimate_tokens
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# 可重試的狀態碼；其中 429/503 代表後端過載，會讓併發上限遞減
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+OVERLOAD_STATUS_CODES = {429, 503}
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    if isinstance(error, httpx.HTTPStatusError):
+        return _retry_after_seconds(error.response)
+    return None
+
+FULL_REFINE_PROMPT = (
+    "你是一位半導體失效分析 (FA) 專家。使用者會提供一份 8D 評核 JSON 與一段指示。\n"
+    "請根據指示修改該 JSON 中的 'total_score', 'dimensions' 或是相關具體建議內容。\n"
+    "你必須僅輸出修改後的完整 JSON 字串，不要包含任何開場白或解釋性文字。"
+)
+
+PATCH_REFINE_PROMPT = (
+    "你是一位半導體失效分析 (FA) 專家。使用者會提供一份 8D 評核 JSON 與一段指示。\n"
+    "請根據指示修改該 JSON 中的 'total_score', 'dimensions' 或是相關具體建議內容。\n"
+    "不要輸出完整 JSON，只輸出一個 RFC 6902 JSON Patch 陣列描述需要的修改，例如：\n"
+    '[{"op": "replace", "path": "/total_score", "value": 85}]\n'
+    "path 使用 JSON Pointer，不要包含任何開場白或解釋性文字。"
+)
+
+def _refine_messages(system_prompt: str, document, user_prompt: str) -> List[Dict[str, str]]:
+    user_content = (
+        f"原始 JSON 內容：\n{compact_dumps(document)}\n\n"
+        f"使用者優化指示：\n{user_prompt}"
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content}
+    ]
+
+def _http2_available() -> bool:
+    """HTTP/2 需要額外安裝 h2 套件 (httpx[http2])，未安裝時回退 HTTP/1.1"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
 
 class LLMClient:
-    def __init__(self, api_key: str = None, base_url: str = None):
+    def __init__(self, api_key: str = None, base_url: str = None, transport: httpx.AsyncBaseTransport = None,
+                 cache: RefinementCache = None, endpoints: str = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY", "your-api-key")
-        self.base_url = base_url or os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
-        self.model = os.getenv("OPENAI_MODEL", "gpt-oss-20b")
+        default_model = os.getenv("OPENAI_MODEL", "gpt-oss-20b")
+        # 多個推論副本：LLM_ENDPOINTS="http://a:8000/v1,http://b:8000/v1|其他模型"；未設定時沿用 OPENAI_API_BASE
+        if endpoints is None:
+            endpoints = base_url or os.getenv("LLM_ENDPOINTS") or os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+        self.router = EndpointRouter(
+            parse_endpoints(endpoints, default_model),
+            eject_after=int(os.getenv("LLM_ENDPOINT_EJECT_AFTER", "3")),
+            eject_seconds=float(os.getenv("LLM_ENDPOINT_EJECT_SECONDS", "30"))
+        )
+        # 主要端點 (日誌使用)；快取鍵以實際回應的端點模型為準，查詢時依序嘗試各模型
+        self.base_url = self.router.endpoints[0].base_url
+        self.model = self.router.endpoints[0].model
+        self.models = list(dict.fromkeys(e.model for e in self.router.endpoints))
+        self.temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+        self.stream = os.getenv("LLM_STREAM", "0") == "1"
+        self.inflight = SingleFlight()
+        # full: 模型輸出完整 JSON；patch: 模型輸出 JSON Patch / Merge Patch 後於本地套用
+        self.refine_mode = os.getenv("LLM_REFINE_MODE", "full")
+        # 送出前的評核 JSON 壓縮：只送可修改欄位，整體提示詞不超過此 token 預算
+        self.prompt_token_budget = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "8000"))
+        self.editable_fields = [f.strip() for f in os.getenv("LLM_EDITABLE_FIELDS", "").split(",") if f.strip()]
+        self.compaction_stats = {"requests": 0, "original_tokens": 0, "sent_tokens": 0, "rejected": 0}
+        self.patch_stats = {
+            "attempts": 0, "applied": 0, "fallbacks": 0,
+            "output_tokens": 0, "full_tokens_estimate": 0, "saved_tokens": 0, "saved_seconds_estimate": 0.0,
+        }
+        self.cache = cache or RefinementCache(
+            path=os.getenv("LLM_CACHE_PATH", os.path.join("cache", "llm_refinements.sqlite3")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+            enabled=os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+        )
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+        )
+        self.timeout = httpx.Timeout(float(os.getenv("LLM_TIMEOUT", "300")), connect=10.0)
+        self.http2 = os.getenv("LLM_HTTP2") == "1"
+        if self.http2 and not _http2_available():
+            logger.warning("LLM_HTTP2=1 but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+            self.http2 = False
+        self.limiter = AdaptiveLimiter(
+            initial=int(os.getenv("LLM_CONCURRENCY_INITIAL", "4")),
+            min_limit=int(os.getenv("LLM_CONCURRENCY_MIN", "1")),
+            max_limit=int(os.getenv("LLM_CONCURRENCY_MAX", "16")),
+            latency_target=float(os.getenv("LLM_LATENCY_TARGET", "120"))
+        )
+        self.latencies = LatencyTracker()
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.retry_backoff = float(os.getenv("LLM_RETRY_BACKOFF", "1.0"))
+        self.retry_backoff_cap = float(os.getenv("LLM_RETRY_BACKOFF_CAP", "30"))
+        self.hedge = os.getenv("LLM_HEDGE") == "1"
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._transport = transport
+        self._client = None
+        self._client_loop = None
 
-    async def chat_completion(self, messages: List[Dict[str, str]]) -> str:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2,
+            transport=self._transport
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """取得共用連線池；未經 lifespan 啟動 (CLI / 測試) 時於目前事件迴圈延遲建立"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = self._build_client()
+            self._client_loop = loop
+        return self._client
+
+    async def startup(self):
+        """於 FastAPI lifespan 啟動時建立共用連線池並開啟加工結果快取"""
+        self._get_client()
+        await asyncio.to_thread(self.cache.warm_up)
+        logger.info(f"LLM client pool ready (max_connections={self.limits.max_connections}, http2={self.http2})")
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
+    def _completion_payload(self, messages: List[Dict[str, str]], stream: bool = False) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def _with_retries(self, attempt_fn):
+        """連線錯誤、逾時與 429/5xx 時以指數退避 (含抖動) 重試"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await attempt_fn()
+            except (httpx.HTTPStatusError, httpx.TransportError) as e:
+                retryable = (isinstance(e, httpx.TransportError)
+                             or e.response.status_code in RETRY_STATUS_CODES)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.retry_backoff, self.retry_backoff_cap, _retry_after(e))
+                self.retries += 1
+                logger.warning(f"LLM request failed ({type(e).__name__}: {e}), retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _post_routed(self, payload: dict, stream: bool = False, avoid: Optional[set] = None):
+        """送往延遲最佳的健康端點；連線錯誤、429 或 5xx 時依序改送其他端點，回傳 (端點, 回應)
+
+        avoid 為同一次呼叫中其他請求 (對沖) 正在使用的端點，有其他選擇時會避開。
+        所有端點都失敗時，回傳最後一個錯誤回應或拋出最後一個連線錯誤。
+        """
+        client = self._get_client()
+        tried: List[Endpoint] = []
+        failure = None
+        endpoint = None
+        while True:
+            endpoint = self.router.choose(exclude=tried + list(avoid or ())) or self.router.choose(exclude=tried)
+            if endpoint is None:
+                break
+            if tried:
+                self.router.failovers += 1
+                reason = f"HTTP {failure.status_code}" if isinstance(failure, httpx.Response) else type(failure).__name__
+                logger.warning(f"LLM failover to {endpoint.name} ({reason})")
+            tried.append(endpoint)
+            if avoid is not None:
+                avoid.add(endpoint)
+            request = client.build_request(
+                "POST",
+                f"{endpoint.base_url}/chat/completions",
                 headers={"Authorization": f"Bearer {self.api_key}"},
-                json={
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": 0.7
-                },
-                timeout=300.0
+                json=dict(payload, model=endpoint.model)
             )
+            started_at = self.router.begin(endpoint)
+            try:
+                response = await client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                self.router.record_failure(endpoint, started_at)
+                failure = e
+                continue
+            except BaseException:
+                self.router.release(endpoint)
+                raise
+            if response.status_code == 429:
+                self.router.record_overload(endpoint, started_at, _retry_after_seconds(response))
+            elif response.status_code < 500:
+                self.router.record_success(endpoint, started_at)
+                return endpoint, response
+            else:
+                self.router.record_failure(endpoint, started_at)
+            await response.aread()
+            failure = response
+        if isinstance(failure, httpx.Response):
+            return tried[-1], failure
+        raise failure
+
+    async def _send(self, payload: dict, started_at: float, avoid: Optional[set] = None):
+        """送出一次請求，回傳 (回應的模型, 回應 JSON)；呼叫前須已取得併發名額，結束時依結果回報給限流器"""
+        overloaded = succeeded = False
+        try:
+            endpoint, response = await self._post_routed(payload, avoid=avoid)
+            overloaded = response.status_code in OVERLOAD_STATUS_CODES
             response.raise_for_status()
-            resp_json = response.json()
-            
-            if "choices" not in resp_json or not resp_json["choices"]:
-                raise ValueError(f"LLM 回傳格式錯誤: {resp_json}")
-                
-            content = resp_json["choices"][0]["message"].get("content", "")
-            return content
+            succeeded = True
+            self.latencies.record(time.monotonic() - started_at)
+            return endpoint.model, response.json()
+        except httpx.TimeoutException:
+            overloaded = True
+            raise
+        finally:
+            self.limiter.release(started_at, overloaded=overloaded, succeeded=succeeded)
 
-    async def refine_evaluation_json(self, original_json: dict, user_prompt: str):
-        """根據使用者提示詞優化評核 JSON"""
-        system_prompt = (
-            "你是一位半導體失效分析 (FA) 專家。使用者會提供一份 8D 評核 JSON 與一段指示。\n"
-            "請根據指示修改該 JSON 中的 'total_score', 'dimensions' 或是相關具體建議內容。\n"
-            "你必須僅輸出修改後的完整 JSON 字串，不要包含任何開場白或解釋性文字。"
-        )
+    async def _hedged_send(self, payload: dict):
+        """超過近期 p95 延遲仍未回應時，在限流器有餘裕的情況下送出第二個相同請求，取先完成者
+
+        對沖請求會優先送往與原請求不同的端點。
+        """
+        hedge_delay = self.latencies.percentile(0.95) if self.hedge else None
+        in_use = set()
+
+        def spawn(started_at):
+            # 任務在第一次執行前就被取消時 _send 的 finally 不會執行，改由 done callback 歸還名額
+            entered = []
+
+            async def run():
+                entered.append(True)
+                return await self._send(payload, started_at, in_use)
+
+            task = asyncio.ensure_future(run())
+            task.add_done_callback(
+                lambda _: entered or self.limiter.release(started_at, succeeded=False))
+            return task
+
+        primary = spawn(await self.limiter.acquire())
+        tasks = {primary}
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                hedge_started = None if done else self.limiter.try_acquire()
+                if hedge_started is not None:
+                    self.hedges += 1
+                    logger.info(f"LLM request exceeded p95 ({hedge_delay:.2f}s), sending hedged request")
+                    tasks.add(spawn(hedge_started))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _complete(self, messages: List[Dict[str, str]]):
+        """回傳 (回應的模型, 回應 JSON)"""
+        payload = self._completion_payload(messages)
+        model, resp_json = await self._with_retries(lambda: self._hedged_send(payload))
         
-        user_content = (
-            f"原始 JSON 內容：\n{json.dumps(original_json, ensure_ascii=False)}\n\n"
-            f"使用者優化指示：\n{user_prompt}"
+        if "choices" not in resp_json or not resp_json["choices"]:
+            raise ValueError(f"LLM 回傳格式錯誤: {resp_json}")
+        return model, resp_json
+
+    async def chat_completion(self, messages: List[Dict[str, str]]) -> str:
+        _, resp_json = await self._complete(messages)
+        content = resp_json["choices"][0]["message"].get("content", "")
+        return content
+
+    async def chat_completion_stream(self, messages: List[Dict[str, str]]):
+        """以串流模式 (stream: true) 呼叫 LLM，第一個完整 JSON 物件閉合後立即中斷連線
+
+        回傳 (已接收的文字, 解析出的物件或 None, 回應的模型)。
+        """
+        payload = self._completion_payload(messages, stream=True)
+        return await self._with_retries(lambda: self._stream_once(payload))
+
+    async def _stream_once(self, payload: dict):
+        scanner = IncrementalJSONScanner()
+        started_at = await self.limiter.acquire()
+        overloaded = succeeded = False
+        try:
+            endpoint, response = await self._post_routed(payload, stream=True)
+            try:
+                overloaded = response.status_code in OVERLOAD_STATUS_CODES
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta and scanner.feed(delta) is not None:
+                        # 關閉回應即中斷連線，伺服器端停止產生後續 token
+                        logger.info(f"LLM stream closed early after {len(scanner.text)} chars (JSON complete)")
+                        break
+            finally:
+                await response.aclose()
+            succeeded = True
+        except httpx.TimeoutException:
+            overloaded = True
+            raise
+        finally:
+            self.limiter.release(started_at, overloaded=overloaded, succeeded=succeeded)
+        return scanner.text, scanner.finish(), endpoint.model
+
+    def stats(self) -> dict:
+        p95 = self.latencies.percentile(0.95)
+        return {
+            "refinement_cache": self.cache.stats(),
+            "inflight": self.inflight.stats(),
+            "endpoints": self.router.stats(),
+            "failovers": self.router.failovers,
+            "refine_mode": self.refine_mode,
+            "compaction": dict(self.compaction_stats, token_budget=self.prompt_token_budget),
+            "patch_mode": dict(self.patch_stats, saved_seconds_estimate=round(self.patch_stats["saved_seconds_estimate"], 3)),
+            "limiter": {
+                **self.limiter.stats(),
+                "retries": self.retries,
+                "hedging": self.hedge,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "latency_p95": round(p95, 3) if p95 is not None else None,
+            },
+        }
+
+    async def refine_evaluation_json(self, original_json: dict, user_prompt: str):
+        """根據使用者提示詞優化評核 JSON
+
+        相同內容與提示詞直接取用快取結果；同時進行中的相同請求只呼叫 LLM 一次。
+        """
+        success, result, _ = await self.refine_with_model(original_json, user_prompt)
+        return success, result
+
+    async def refine_with_model(self, original_json: dict, user_prompt: str):
+        """同 refine_evaluation_json，另外回傳產生結果的模型 (失敗時為 None)"""
+        for model in self.models:
+            cached = await asyncio.to_thread(
+                self.cache.get, refinement_key(original_json, user_prompt, model, self.temperature))
+            if cached is not None:
+                logger.info(f"LLM refinement cache hit ({model})")
+                return True, cached, model
+
+        # 合併同時進行的相同請求 (與實際由哪個模型回應無關)
+        inflight_key = refinement_key(original_json, user_prompt, self.model, self.temperature)
+        return await self.inflight.do(
+            inflight_key, lambda: self._refine_and_store(original_json, user_prompt)
         )
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_content}
-        ]
+    async def _refine_and_store(self, original_json: dict, user_prompt: str):
+        success, result, model = await self._refine_uncached(original_json, user_prompt)
+        if success:
+            cache_key = refinement_key(original_json, user_prompt, model, self.temperature)
+            await asyncio.to_thread(self.cache.put, cache_key, result)
+        return success, result, model
 
+    async def _refine_uncached(self, original_json: dict, user_prompt: str):
+        # 兩種模式的提示詞取較長者估算，確保退回完整模式時也不超過預算
+        reserved = max(estimate_tokens(FULL_REFINE_PROMPT), estimate_tokens(PATCH_REFINE_PROMPT)) \
+            + estimate_tokens(user_prompt or "")
         try:
-            raw_response = await self.chat_completion(messages)
+            compacted = compact_payload(original_json, reserved, self.prompt_token_budget, self.editable_fields)
+        except PromptBudgetError as e:
+            self.compaction_stats["rejected"] += 1
+            return False, f"提示詞超過 token 預算: {e}", None
+        self.compaction_stats["requests"] += 1
+        self.compaction_stats["original_tokens"] += compacted.original_tokens
+        self.compaction_stats["sent_tokens"] += compacted.tokens
+        logger.info(f"Prompt compacted: ~{compacted.original_tokens} -> ~{compacted.tokens} tokens "
+                    f"(kept local: {compacted.frozen}, truncated: {len(compacted.truncated)})")
+
+        success, result, model = await self._refine_document(compacted.document, user_prompt)
+        if success:
+            result = compacted.merge(result)
+        return success, result, model
+
+    async def _refine_document(self, document, user_prompt: str):
+        if self.refine_mode == "patch" and isinstance(document, dict):
+            try:
+                success, result, model = await self._refine_patch(document, user_prompt)
+            except httpx.HTTPStatusError as e:
+                return False, f"LLM API 錯誤 (HTTP {e.response.status_code}): {e.response.text[:100]}", None
+            except Exception as e:
+                error_msg = str(e) or type(e).__name__
+                return False, f"LLM 處理異常: {error_msg}", None
+            if success:
+                return True, result, model
+            self.patch_stats["fallbacks"] += 1
+            logger.warning(f"JSON Patch 模式失敗，改用完整 JSON 模式: {result}")
+        return await self._refine_full(document, user_prompt)
+
+    async def _refine_patch(self, original_json: dict, user_prompt: str):
+        """只要求模型輸出差異 (RFC 6902 JSON Patch 或 RFC 7386 Merge Patch)，於本地驗證並套用"""
+        messages = _refine_messages(PATCH_REFINE_PROMPT, original_json, user_prompt)
+
+        self.patch_stats["attempts"] += 1
+        started_at = time.monotonic()
+        model, resp_json = await self._complete(messages)
+        elapsed = time.monotonic() - started_at
+        content = (resp_json["choices"][0]["message"].get("content") or "").strip()
+
+        patch = extract_json(content, openers="[{")
+        if patch is None:
+            return False, f"找不到 JSON Patch。內容片段: {content[:100]}", None
+        try:
+            # 陣列為 RFC 6902 操作清單；物件視為 Merge Patch
+            refined = apply_patch(original_json, patch) if isinstance(patch, list) else apply_merge_patch(original_json, patch)
+        except JSONPatchError as e:
+            return False, f"JSON Patch 無法套用: {e}", None
+        if not isinstance(refined, dict):
+            return False, "套用 JSON Patch 後不是 JSON 物件", None
+
+        # 以完整文件的估計輸出量對比，換算節省的 token 與生成時間
+        output_tokens = (resp_json.get("usage") or {}).get("completion_tokens") or estimate_tokens(content)
+        full_tokens = estimate_tokens(json.dumps(refined, ensure_ascii=False))
+        saved_tokens = max(0, full_tokens - output_tokens)
+        saved_seconds = saved_tokens * elapsed / max(output_tokens, 1)
+        self.patch_stats["applied"] += 1
+        self.patch_stats["output_tokens"] += output_tokens
+        self.patch_stats["full_tokens_estimate"] += full_tokens
+        self.patch_stats["saved_tokens"] += saved_tokens
+        self.patch_stats["saved_seconds_estimate"] += saved_seconds
+        logger.info(f"JSON Patch 已套用: 輸出 {output_tokens} tokens (完整 JSON 約 {full_tokens})，"
+                    f"約節省 {saved_tokens} tokens / {saved_seconds:.1f}s")
+        return True, refined, model
+
+    async def _refine_full(self, original_json: dict, user_prompt: str):
+        messages = _refine_messages(FULL_REFINE_PROMPT, original_json, user_prompt)
+
+        try:
+            if self.stream:
+                raw_response, streamed_data, model = await self.chat_completion_stream(messages)
+                if streamed_data is not None:
+                    return True, streamed_data, model
+            else:
+                model, resp_json = await self._complete(messages)
+                raw_response = resp_json["choices"][0]["message"].get("content", "")
             content = raw_response.strip() if raw_response else ""
             
             if not content:
-                return False, "LLM 回傳內容為空 (Empty Content)"
+                return False, "LLM 回傳內容為空 (Empty Content)", None
 
-            # 輔助偵錯日誌
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info(f"DEBUG: AI 原始回傳長度: {len(content)}")
-            
-            import re
-            decoder = json.JSONDecoder()
-            all_starts = [m.start() for m in re.finditer('{', content)]
-            
-            if not all_starts:
-                return False, f"回傳內容中找不到 '{{'。前 100 字: {content[:100]}"
-
-            for start_index in all_starts:
-                try:
-                    refined_data, end_pos = decoder.raw_decode(content[start_index:])
-                    return True, refined_data
-                except json.JSONDecodeError:
-                    continue
-            
-            return False, f"解析失敗。嘗試點數: {len(all_starts)}。內容片段: {content[:100]}"
+
+            if "{" not in content:
+                return False, f"回傳內容中找不到 '{{'。前 100 字: {content[:100]}", None
+
+            refined_data = extract_json(content)
+            if refined_data is None:
+                return False, f"解析失敗。內容片段: {content[:100]}", None
+            return True, refined_data, model
                 
         except httpx.HTTPStatusError as e:
-            return False, f"LLM API 錯誤 (HTTP {e.response.status_code}): {e.response.text[:100]}"
+            return False, f"LLM API 錯誤 (HTTP {e.response.status_code}): {e.response.text[:100]}", None
         except Exception as e:
             error_msg = str(e) or type(e).__name__
-            return False, f"LLM 處理異常: {error_msg}"
+            return False, f"LLM 處理異常: {error_msg}", None
 
 llm_client = LLMClient()
@@ -0,0 +1,122 @@
+import logging
+import time
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """一個 OpenAI 相容的推論端點 (base_url + 模型)，記錄近期延遲 (EWMA) 與健康狀態"""
+
+    def __init__(self, base_url: str, model: str, alpha: float = 0.3):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.alpha = alpha
+        self.ewma_latency: Optional[float] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.base_url}|{self.model}"
+
+    def score(self) -> float:
+        """預期等待時間：EWMA 延遲 × (進行中請求 + 1)；尚無樣本時為 0，讓新端點先被試用"""
+        if self.ewma_latency is None:
+            return 0.0
+        return self.ewma_latency * (self.in_flight + 1)
+
+    def stats(self, now: float) -> dict:
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "healthy": self.ejected_until <= now,
+            "ewma_latency": round(self.ewma_latency, 4) if self.ewma_latency is not None else None,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+
+def parse_endpoints(spec: str, default_model: str) -> List[Endpoint]:
+    """解析 LLM_ENDPOINTS：逗號分隔的 base_url，可用 `|模型` 指定該端點的模型"""
+    endpoints = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        base_url, _, model = item.partition("|")
+        endpoints.append(Endpoint(base_url.strip(), model.strip() or default_model))
+    return endpoints
+
+
+class EndpointRouter:
+    """依延遲與健康狀態挑選端點；連續失敗達門檻的端點暫時剔除一段時間"""
+
+    def __init__(self, endpoints: List[Endpoint], eject_after: int = 3, eject_seconds: float = 30):
+        if not endpoints:
+            raise ValueError("至少需要一個 LLM 端點")
+        self.endpoints = endpoints
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.failovers = 0
+
+    def choose(self, exclude: Iterable[Endpoint] = ()) -> Optional[Endpoint]:
+        """挑選分數最低的健康端點；全部不健康時仍挑最早恢復者，避免完全無法服務"""
+        excluded = set(exclude)
+        candidates = [e for e in self.endpoints if e not in excluded]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        healthy = [e for e in candidates if e.ejected_until <= now]
+        if healthy:
+            return min(healthy, key=lambda e: e.score())
+        return min(candidates, key=lambda e: e.ejected_until)
+
+    def begin(self, endpoint: Endpoint) -> float:
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        return time.monotonic()
+
+    def record_success(self, endpoint: Endpoint, started_at: float):
+        endpoint.in_flight -= 1
+        latency = time.monotonic() - started_at
+        endpoint.successes += 1
+        endpoint.consecutive_failures = 0
+        endpoint.ejected_until = 0.0
+        if endpoint.ewma_latency is None:
+            endpoint.ewma_latency = latency
+        else:
+            endpoint.ewma_latency += endpoint.alpha * (latency - endpoint.ewma_latency)
+
+    def record_failure(self, endpoint: Endpoint, started_at: float):
+        endpoint.in_flight -= 1
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        # 失敗也計入延遲，讓逾時的端點分數變差
+        latency = time.monotonic() - started_at
+        if endpoint.ewma_latency is not None:
+            endpoint.ewma_latency += endpoint.alpha * (max(latency, endpoint.ewma_latency) - endpoint.ewma_latency)
+        if endpoint.consecutive_failures >= self.eject_after:
+            endpoint.ejected_until = time.monotonic() + self.eject_seconds
+            logger.warning(f"LLM endpoint {endpoint.name} ejected for {self.eject_seconds:.0f}s "
+                           f"after {endpoint.consecutive_failures} consecutive failures")
+
+    def record_overload(self, endpoint: Endpoint, started_at: float, retry_after: Optional[float] = None):
+        """429：端點過載，視同失敗 (不以快速拒絕的延遲拉低 EWMA)，並依 Retry-After 暫停派送"""
+        self.record_failure(endpoint, started_at)
+        if retry_after and retry_after > 0:
+            endpoint.ejected_until = max(endpoint.ejected_until, time.monotonic() + retry_after)
+
+    def release(self, endpoint: Endpoint):
+        """請求被取消 (例如對沖落敗)：不計成功或失敗"""
+        endpoint.in_flight -= 1
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        return [e.stats(now) for e in self.endpoints]
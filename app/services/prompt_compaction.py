@@ -0,0 +1,159 @@
+"""
+LLM 加工前的評核 JSON 壓縮與 token 預算控管
+
+只把模型可能修改的欄位 (分數、維度、建議類文字) 送出，其餘欄位 (檔名、人員等) 保留在本地，
+模型輸出後再合併回去；超過預算時依序截斷長文字、移除次要欄位，仍超過則拒絕送出。
+"""
+
+import copy
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 一律送出的核心欄位
+CORE_FIELDS = ("total_score", "grade", "dimensions")
+# 鍵名包含以下字樣的欄位視為建議類內容，也交給模型修改
+EDITABLE_HINTS = ("suggest", "recommend", "improve", "comment", "feedback", "建議", "改善", "評語", "意見")
+# 超過預算時逐步收緊的長文字截斷長度
+TRUNCATE_STEPS = (2000, 1000, 500, 300, 200, 120)
+TRUNCATED_MARKER = "…(已截斷)"
+# 訊息格式 (role、分隔符號等) 的固定開銷
+MESSAGE_OVERHEAD_TOKENS = 16
+
+
+class PromptBudgetError(ValueError):
+    """即使壓縮後仍超過 token 預算"""
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估 token 數：CJK 字元約 1 token/字，其餘約 4 字元/token (API 未回傳 usage 時使用)"""
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def compact_dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def is_editable(key: str, extra_fields: Iterable[str] = ()) -> bool:
+    lowered = key.lower()
+    return key in CORE_FIELDS or key in extra_fields or any(hint in lowered for hint in EDITABLE_HINTS)
+
+
+def _truncate_strings(value: Any, limit: int, path: Tuple, truncated: Dict[Tuple, str]) -> Any:
+    if isinstance(value, str):
+        if len(value) > limit:
+            truncated[path] = value
+            return value[:limit] + TRUNCATED_MARKER
+        return value
+    if isinstance(value, dict):
+        return {k: _truncate_strings(v, limit, path + (k,), truncated) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_truncate_strings(v, limit, path + (i,), truncated) for i, v in enumerate(value)]
+    return value
+
+
+def _get_path(data: Any, path: Tuple):
+    for token in path:
+        if isinstance(data, dict) and token in data:
+            data = data[token]
+        elif isinstance(data, list) and isinstance(token, int) and token < len(data):
+            data = data[token]
+        else:
+            return None
+    return data
+
+
+def _set_path(data: Any, path: Tuple, value: Any):
+    for token in path[:-1]:
+        data = data[token]
+    data[path[-1]] = value
+
+
+class CompactedPayload:
+    """送給模型的精簡文件，以及合併回完整文件所需的資訊"""
+
+    def __init__(self, original: Any, document: Any, frozen: List[str], truncated: Dict[Tuple, str],
+                 original_tokens: int, tokens: int):
+        self.original = original
+        self.document = document
+        self.frozen = frozen
+        self.truncated = truncated
+        self.original_tokens = original_tokens
+        self.tokens = tokens
+
+    def merge(self, refined: Any) -> Any:
+        """把模型輸出合併回完整文件：未送出的欄位沿用原值，未被修改的截斷文字還原為全文"""
+        if not isinstance(self.original, dict) or not isinstance(refined, dict):
+            return refined
+        merged = copy.deepcopy(refined)
+        for path, full_text in self.truncated.items():
+            current = _get_path(merged, path)
+            if isinstance(current, str) and current.endswith(TRUNCATED_MARKER):
+                _set_path(merged, path, full_text)
+        result = {}
+        for key, value in self.original.items():
+            if key in self.frozen or key not in merged:
+                result[key] = copy.deepcopy(value)
+            else:
+                result[key] = merged[key]
+        for key, value in merged.items():
+            # 模型新增的建議類欄位保留
+            if key not in result:
+                result[key] = value
+        return result
+
+
+def compact_payload(original: Any, reserved_tokens: int, budget: int,
+                    extra_fields: Iterable[str] = ()) -> CompactedPayload:
+    """產生不超過 budget 的精簡文件；reserved_tokens 為系統提示詞與使用者指示的估計 token 數"""
+    full_text = compact_dumps(original)
+    original_tokens = reserved_tokens + estimate_tokens(full_text) + MESSAGE_OVERHEAD_TOKENS
+    available = budget - reserved_tokens - MESSAGE_OVERHEAD_TOKENS
+    if available <= 0:
+        raise PromptBudgetError(f"提示詞本身約 {reserved_tokens} tokens，已超過預算 {budget}")
+
+    if not isinstance(original, dict):
+        tokens = estimate_tokens(full_text)
+        if tokens > available:
+            raise PromptBudgetError(f"評核內容約 {tokens} tokens，超過可用預算 {available}")
+        return CompactedPayload(original, original, [], {}, original_tokens,
+                                reserved_tokens + tokens + MESSAGE_OVERHEAD_TOKENS)
+
+    extra_fields = tuple(extra_fields)
+    frozen = [k for k in original if not is_editable(k, extra_fields)]
+    document = {k: v for k, v in original.items() if k not in frozen}
+
+    def fits(doc) -> Optional[int]:
+        tokens = estimate_tokens(compact_dumps(doc))
+        return tokens if tokens <= available else None
+
+    truncated: Dict[Tuple, str] = {}
+    tokens = fits(document)
+    for limit in TRUNCATE_STEPS:
+        if tokens is not None:
+            break
+        truncated = {}
+        candidate = _truncate_strings(document, limit, (), truncated)
+        tokens = fits(candidate)
+        if tokens is not None:
+            document = candidate
+
+    if tokens is None:
+        # 仍超過：由大到小移除非核心欄位 (合併時沿用原值)
+        shortest = TRUNCATE_STEPS[-1]
+        truncated = {}
+        document = _truncate_strings(document, shortest, (), truncated)
+        optional = sorted((k for k in document if k not in CORE_FIELDS),
+                          key=lambda k: len(compact_dumps(document[k])), reverse=True)
+        for key in optional:
+            document.pop(key)
+            frozen.append(key)
+            truncated = {p: t for p, t in truncated.items() if p[0] != key}
+            tokens = fits(document)
+            if tokens is not None:
+                break
+        if tokens is None:
+            raise PromptBudgetError(f"壓縮後的評核內容仍超過 token 預算 {budget}")
+
+    return CompactedPayload(original, document, frozen, truncated, original_tokens,
+                            reserved_tokens + tokens + MESSAGE_OVERHEAD_TOKENS)
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """以 SHA-256 計算檔案內容雜湊 (分塊讀取，避免一次載入大型簡報)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(src: str, dst: str):
+    """優先使用硬連結 (零複製)，跨檔案系統時退回一般複製"""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class ResultCache:
+    """以內容雜湊為鍵的改善結果快取 (LRU 淘汰，技能版本變更時自動失效)
+
+    每筆快取包含 `<key>.pptx` 與描述檔 `<key>.json`，重啟後由描述檔重建索引。
+    """
+
+    def __init__(self, root: str, max_bytes: int, enabled: bool = True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+            self._load_index()
+
+    @staticmethod
+    def make_key(report_hash: str, evaluation_hash: str, prompt: Optional[str],
+                 skill_id: str, skill_version: str, model: Optional[str]) -> str:
+        """組合快取鍵：報告、評核 JSON、提示詞、技能版本與 (有提示詞時) LLM 模型"""
+        prompt = (prompt or "").strip()
+        parts = [report_hash, evaluation_hash, prompt, skill_id, str(skill_version), model if prompt else ""]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        return os.path.join(self.root, f"{key}.pptx"), os.path.join(self.root, f"{key}.json")
+
+    def _load_index(self):
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            data_path, meta_path = self._paths(key)
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                meta["size"] = os.path.getsize(data_path)
+                meta["last_access"] = os.path.getmtime(meta_path)
+                self.entries[key] = meta
+            except (OSError, ValueError):
+                self._remove(key)
+        logger.info(f"Result cache loaded {len(self.entries)} entries from {self.root}")
+
+    def _remove(self, key: str):
+        self.entries.pop(key, None)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def invalidate_skill(self, skill_id: str, current_version: str):
+        """移除同一技能但版本不同的舊結果"""
+        with self._lock:
+            stale = [k for k, m in self.entries.items()
+                     if m.get("skill_id") == skill_id and m.get("skill_version") != str(current_version)]
+            for key in stale:
+                self._remove(key)
+        if stale:
+            logger.info(f"Result cache invalidated {len(stale)} entries for '{skill_id}' (now v{current_version})")
+
+    def get(self, key: str, dest_path: str) -> bool:
+        """命中時將結果放到 dest_path 並回傳 True"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            meta = self.entries.get(key)
+            if meta is None:
+                self.misses += 1
+                return False
+            data_path, meta_path = self._paths(key)
+            try:
+                _link_or_copy(data_path, dest_path)
+                # 以描述檔的 mtime 記錄最近存取時間，重啟後 LRU 順序仍然有效
+                os.utime(meta_path)
+            except OSError as e:
+                logger.warning(f"Result cache entry {key} unreadable, dropping: {e}")
+                self._remove(key)
+                self.misses += 1
+                return False
+            meta["last_access"] = time.time()
+            self.hits += 1
+            return True
+
+    def put(self, key: str, src_path: str, skill_id: str, skill_version: str):
+        if not self.enabled or not os.path.exists(src_path):
+            return
+        with self._lock:
+            data_path, meta_path = self._paths(key)
+            # 寫入時複製一份，確保快取檔案不與任何工作輸出共用 inode
+            shutil.copyfile(src_path, data_path)
+            meta = {
+                "skill_id": skill_id,
+                "skill_version": str(skill_version),
+                "created_at": time.time(),
+                "last_access": time.time(),
+            }
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            meta["size"] = os.path.getsize(data_path)
+            self.entries[key] = meta
+            self._evict()
+
+    def _evict(self):
+        total = sum(m["size"] for m in self.entries.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.entries[key]["size"]
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self.entries),
+                "bytes": sum(m["size"] for m in self.entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> ResultCache:
+    """第一次使用時才建立 (會建立目錄並掃描快取索引)，import 時不碰磁碟"""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    root=os.getenv("RESULT_CACHE_DIR", os.path.join("cache", "results")),
+                    max_bytes=int(os.getenv("RESULT_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+                    enabled=os.getenv("RESULT_CACHE_ENABLED", "1") != "0"
+                )
+    return _result_cache
+
+def __getattr__(name):
+    # PEP 562：相容 `from app.services.result_cache import result_cache`
+    if name == "result_cache":
+        return get_result_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
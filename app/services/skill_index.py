@@ -0,0 +1,151 @@
+"""
+技能目錄的全文檢索 (倒排索引)
+
+name / description / tags 切成詞彙後建立 詞彙 -> 技能 id 的索引；英數字以單字為單位，
+CJK 以單字與相鄰二字為單位。查詢的每個詞都必須命中 (AND)，英數字詞支援前綴比對 (輸入中即時搜尋)。
+索引依命中欄位權重分層存放技能 id 集合，查詢以集合交集計算各分數層，只排序需要的最高幾層。
+索引隨註冊表掃描增量更新，查詢與更新以鎖保護 (掃描在背景執行緒進行)。
+"""
+
+import bisect
+import heapq
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD = re.compile(r"[0-9a-z]+|[\u2e80-\u9fff\uf900-\ufaff]+")
+_CJK = re.compile(r"[\u2e80-\u9fff\uf900-\ufaff]")
+
+# 命中欄位的權重：名稱 > 標籤 > 描述
+FIELD_WEIGHTS = {"name": 3, "tags": 2, "description": 1}
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if _CJK.match(word):
+            tokens.extend(word)
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def _query_terms(query: str) -> List[str]:
+    terms = []
+    for word in _WORD.findall(query.lower()):
+        if _CJK.match(word):
+            # 查詢的 CJK 以二字詞比對 (單一字時以單字比對)
+            terms.extend([word] if len(word) == 1 else [word[i:i + 2] for i in range(len(word) - 1)])
+        else:
+            terms.append(word)
+    return list(dict.fromkeys(terms))
+
+
+def skill_tags(metadata: dict) -> List[str]:
+    tags = metadata.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return [str(tag).strip() for tag in tags if str(tag).strip()]
+
+
+class SkillSearchIndex:
+    def __init__(self):
+        # 詞彙 -> {命中欄位權重: 技能 id 集合}
+        self._postings: Dict[str, Dict[int, Set[str]]] = {}
+        # 已排序的英數字詞彙，供前綴查詢二分搜尋
+        self._vocabulary: List[str] = []
+        # 技能 id -> {詞彙: 權重} (移除時使用)
+        self._documents: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, skill_id: str, name: str, description: str, tags: Iterable[str] = ()):
+        weights: Dict[str, int] = {}
+        for field, text in (("name", f"{skill_id} {name}"), ("tags", " ".join(tags)), ("description", description)):
+            for token in tokenize(text or ""):
+                weights[token] = max(weights.get(token, 0), FIELD_WEIGHTS[field])
+        with self._lock:
+            self._remove(skill_id)
+            self._documents[skill_id] = weights
+            for token, weight in weights.items():
+                tiers = self._postings.get(token)
+                if tiers is None:
+                    tiers = self._postings[token] = {}
+                    if not _CJK.match(token):
+                        bisect.insort(self._vocabulary, token)
+                tiers.setdefault(weight, set()).add(skill_id)
+
+    def remove(self, skill_id: str):
+        with self._lock:
+            self._remove(skill_id)
+
+    def _remove(self, skill_id: str):
+        for token, weight in self._documents.pop(skill_id, {}).items():
+            tiers = self._postings[token]
+            tiers[weight].discard(skill_id)
+            if not tiers[weight]:
+                del tiers[weight]
+            if not tiers:
+                del self._postings[token]
+                if not _CJK.match(token):
+                    del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    def _term_levels(self, term: str) -> Dict[int, Set[str]]:
+        """查詢詞的 {分數: 技能 id 集合}，每個技能只出現在最高分那層；分數 = 欄位權重 x (完整詞 2 / 前綴 1)"""
+        if _CJK.match(term):
+            tokens = [(term, 2)] if term in self._postings else []
+        else:
+            start = bisect.bisect_left(self._vocabulary, term)
+            end = bisect.bisect_left(self._vocabulary, term + "\uffff", start)
+            tokens = [(token, 2 if token == term else 1) for token in self._vocabulary[start:end]]
+        if len(tokens) == 1:
+            # 單一詞彙的各權重層本就互斥，直接引用索引內的集合 (呼叫端不得修改)
+            token, factor = tokens[0]
+            return {weight * factor: ids for weight, ids in self._postings[token].items()}
+
+        levels: Dict[int, Set[str]] = {}
+        for token, factor in tokens:
+            for weight, ids in self._postings[token].items():
+                score = weight * factor
+                levels[score] = levels[score] | ids if score in levels else ids
+        seen: Set[str] = set()
+        for score in sorted(levels, reverse=True):
+            level = levels[score] - seen
+            seen |= level
+            levels[score] = level
+        return {score: ids for score, ids in levels.items() if ids}
+
+    def search(self, query: str, limit: Optional[int] = None) -> Tuple[int, List[str]]:
+        """回傳 (符合所有查詢詞的技能數, 依分數排序的技能 id)；limit 只取前幾名，只排序需要的分數層"""
+        terms = _query_terms(query)
+        if not terms:
+            return 0, []
+        top: List[str] = []
+        with self._lock:
+            # 由命中最少的詞開始，逐詞將各分數層兩兩取交集並累加分數
+            matches = sorted((self._term_levels(term) for term in terms),
+                             key=lambda levels: sum(len(ids) for ids in levels.values()))
+            buckets = matches[0]
+            for levels in matches[1:]:
+                merged: Dict[int, Set[str]] = {}
+                for score, ids in buckets.items():
+                    for bonus, hits in levels.items():
+                        common = ids & hits
+                        if common:
+                            total = score + bonus
+                            merged[total] = merged[total] | common if total in merged else common
+                buckets = merged
+                if not buckets:
+                    break
+            total = sum(len(ids) for ids in buckets.values())
+            # 分數由高至低，同分依 id 排序；取滿 limit 即停止
+            for score in sorted(buckets, reverse=True):
+                need = None if limit is None else limit - len(top)
+                if need is not None and need <= 0:
+                    break
+                ids = buckets[score]
+                top.extend(sorted(ids) if need is None or len(ids) <= need else heapq.nsmallest(need, ids))
+        return total, top
@@ -1,41 +1,29 @@
+import asyncio
 import subprocess
 import os
 import platform
 import sys
-import re
 import json
+import hashlib
 import logging
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from app.services.frontmatter import parse_skill_metadata, read_frontmatter
+from app.services.skill_index import SkillSearchIndex, skill_tags
+from app.services.worker_pool import SkillWorkerPool, WorkerUnavailableError
 
 # 設定日誌
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def parse_skill_metadata(file_path):
-    """提取並解析 SKILL.md 中的 YAML Frontmatter (支援 PyYAML 或簡單 Regex 回退)"""
-    if not os.path.exists(file_path):
-        return None
-        
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        match = re.search(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL | re.MULTILINE)
-        if match:
-            frontmatter_raw = match.group(1)
-            try:
-                import yaml
-                return yaml.safe_load(frontmatter_raw)
-            except ImportError:
-                # 簡單的 Key-Value 解析回退 (針對跨環境相容性)
-                metadata = {}
-                for line in frontmatter_raw.split('\n'):
-                    if ':' in line:
-                        k, v = line.split(':', 1)
-                        metadata[k.strip()] = v.strip().strip('"').strip("'")
-                return metadata
-    except Exception as e:
-        logger.error(f"Error parsing {file_path}: {e}")
-    return None
+class JSONPayload(NamedTuple):
+    """預先序列化的 JSON 回應內容與其強 ETag"""
+    body: bytes
+    etag: str
+
+def serialize_payload(data) -> JSONPayload:
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    return JSONPayload(body, f'"{hashlib.sha256(body).hexdigest()}"')
 
 class Skill:
     def __init__(self, skill_id: str, path: str, metadata: dict):
@@ -46,7 +34,65 @@ class Skill:
         self.description = metadata.get('description', '')
         self.version = metadata.get('version', '0.0.0')
         self.entrypoint = metadata.get('entrypoint', os.path.join("scripts", "improve_fa_report.py"))
-        self.python_executable = self._get_python_executable()
+        self.max_concurrency = self._get_max_concurrency(metadata)
+        self.worker_config = metadata.get('worker') if isinstance(metadata.get('worker'), dict) else None
+        self._python_executable = None
+        self._semaphore = None
+        self._semaphore_loop = None
+        self._worker_pool = None
+        self._worker_pool_loop = None
+        # 熱重載：被新版本取代後標記為 retired，最後一個執行中的工作結束時才關閉 Worker
+        self._active = 0
+        self._retired = False
+        self._manifest_payload: Optional[JSONPayload] = None
+
+    @staticmethod
+    def _get_max_concurrency(metadata: dict) -> int:
+        """決定同一技能可同時執行的子行程數量 (Frontmatter > 環境變數 > CPU 核心數)"""
+        value = metadata.get('max_concurrency') or os.getenv("SKILL_MAX_CONCURRENCY")
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return os.cpu_count() or 1
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """取得綁定於目前事件迴圈的併發上限號誌"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _get_worker_pool(self):
+        """取得常駐 Worker 池 (僅在 SKILL.md 宣告 worker 區塊時啟用)"""
+        if not self.worker_config or os.getenv("SKILL_WORKERS_DISABLED") == "1":
+            return None
+        loop = asyncio.get_running_loop()
+        if self._worker_pool is None or self._worker_pool_loop is not loop:
+            self._worker_pool = SkillWorkerPool(
+                self.id,
+                self.python_executable,
+                os.path.join(self.path, self.entrypoint),
+                self.worker_config.get('function', 'main'),
+                size=int(self.worker_config.get('pool_size', 1)),
+                max_jobs=int(self.worker_config.get('max_jobs', 100))
+            )
+            self._worker_pool_loop = loop
+        return self._worker_pool
+
+    @property
+    def manifest_payload(self) -> JSONPayload:
+        """序列化後的 manifest (Skill 物件不可變，熱重載會建立新物件，因此可永久快取)"""
+        if self._manifest_payload is None:
+            self._manifest_payload = serialize_payload(self.metadata)
+        return self._manifest_payload
+
+    @property
+    def python_executable(self) -> str:
+        """第一次執行時才偵測虛擬環境，載入大量技能時不逐一 stat venv"""
+        if self._python_executable is None:
+            self._python_executable = self._get_python_executable()
+        return self._python_executable
 
     def _get_python_executable(self):
         """偵測並返回該技能虛擬環境中的 Python 執行檔路徑 (跨平台)"""
@@ -82,54 +128,424 @@ class Skill:
             logger.error(f"Stderr: {e.stderr}")
             return False, error_msg
 
+    async def run_async(self, *args, on_output=None):
+        """以非阻塞方式執行該技能 (優先使用常駐 Worker，否則啟動一次性子行程)
+
+        on_output: 選填的回呼函式，技能每輸出一行 stdout 即被呼叫一次 (用於進度串流)
+        """
+        self._active += 1
+        try:
+            async with self._get_semaphore():
+                pool = self._get_worker_pool()
+                if pool is not None and not pool.broken:
+                    try:
+                        return await pool.run(*args, on_output=on_output)
+                    except WorkerUnavailableError as e:
+                        logger.warning(f"Worker unavailable for '{self.id}', falling back to one-shot run: {e}")
+                return await self._run_oneshot_async(*args, on_output=on_output)
+        finally:
+            self._active -= 1
+            if self._retired and self._active == 0:
+                await self.aclose()
+
+    async def _run_oneshot_async(self, *args, on_output=None):
+        """一次性 asyncio 子行程執行 (原始模式，亦為 Worker 失效時的回退)"""
+        script_full_path = os.path.join(self.path, self.entrypoint)
+        cmd = [self.python_executable, script_full_path] + list(args)
+        # 關閉子行程的輸出緩衝，進度訊息才能逐行送達
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+
+        logger.info(f"Executing skill '{self.id}' (async) with: {script_full_path}")
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env
+        )
+
+        async def read_stdout():
+            lines = []
+            async for raw in process.stdout:
+                line = raw.decode('utf-8', errors='replace')
+                lines.append(line)
+                if on_output:
+                    on_output(line.rstrip("\r\n"))
+            return "".join(lines)
+
+        try:
+            stdout, stderr_bytes = await asyncio.gather(read_stdout(), process.stderr.read())
+            await process.wait()
+        except asyncio.CancelledError:
+            # 請求被取消時一併終止子行程，避免殭屍行程佔用併發名額
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+        stderr = stderr_bytes.decode('utf-8', errors='replace')
+        if process.returncode != 0:
+            error_msg = f"技能執行失敗 ({self.id})。\n[錯誤詳情]: {stderr}"
+            logger.error(f"Stdout: {stdout}")
+            logger.error(f"Stderr: {stderr}")
+            return False, error_msg
+        return True, stdout
+
+    async def warm_up(self):
+        """預先啟動常駐 Worker (若有宣告)"""
+        pool = self._get_worker_pool()
+        if pool is not None and not pool.broken:
+            try:
+                await pool.warm_up()
+            except WorkerUnavailableError as e:
+                pool.broken = True
+                logger.warning(f"Worker warm-up failed for '{self.id}': {e}")
+
+    async def aclose(self):
+        """關閉常駐 Worker"""
+        if self._worker_pool is not None:
+            await self._worker_pool.close()
+            self._worker_pool = None
+
+    async def retire(self):
+        """已被新版本取代：沒有執行中的工作就立即關閉，否則等最後一個工作結束"""
+        self._retired = True
+        if self._active == 0:
+            await self.aclose()
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def _watchfiles_available() -> bool:
+    """檔案監看需要額外安裝 watchfiles 套件，未安裝時改用定期 stat"""
+    try:
+        import watchfiles  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+MANIFEST_FORMAT = 2
+
+# /api/skills 可投影的欄位
+SKILL_FIELDS: Dict[str, Callable[["Skill"], object]] = {
+    "id": lambda s: s.id,
+    "name": lambda s: s.name,
+    "description": lambda s: s.description,
+    "version": lambda s: s.version,
+    "tags": lambda s: skill_tags(s.metadata),
+    "entrypoint": lambda s: s.entrypoint,
+}
+LIST_FIELDS = ("id", "name", "description", "version")
+
 class SkillRegistry:
-    def __init__(self, skills_root: str):
+    """技能註冊表
+
+    以 SKILL.md 與進入點腳本的 (mtime, 大小, inode) 建立索引，重新掃描時只解析有變動的技能目錄；
+    簽章變動時只讀取 Frontmatter 標頭並比對其雜湊，內文或 mtime 的變動不會重建 Skill。
+    新的技能表建好後一次替換，執行中的工作繼續使用原本的 Skill 物件，新工作取得新版本。
+    索引連同解析後的 metadata 會寫入 manifest 快照，下次啟動只需讀一個檔案並 stat 各技能目錄。
+    """
+
+    def __init__(self, skills_root: str, reload_interval: float = 0, manifest_path: Optional[str] = None):
         self.skills_root = os.path.abspath(skills_root)
-        self.skills = {}
+        self.skills: Dict[str, Skill] = {}
+        self.reload_interval = reload_interval
+        self.manifest_path = manifest_path
+        self.reloads = 0
+        self.last_reload_at: Optional[float] = None
+        self.watcher: Optional[str] = None
+        self.snapshot_hits = 0
+        # 技能表替換時一併作廢的序列化回應快取
+        self._payloads: Dict[str, JSONPayload] = {}
+        self._payloads_for: Optional[dict] = None
+        self.search_index = SkillSearchIndex()
+        # 目錄名稱 -> {"signature", "digest", "skill_id", "metadata"}
+        self._index: Dict[str, dict] = self._load_manifest()
+        self._task: Optional[asyncio.Task] = None
         self.scan_skills()
 
-    def scan_skills(self):
-        """掃描目錄並加載所有有效的技能包"""
+    def _signature(self, skill_dir: str, entrypoint: str) -> tuple:
+        return (_file_signature(os.path.join(skill_dir, "SKILL.md")),
+                _file_signature(os.path.join(skill_dir, entrypoint)))
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        """讀取 manifest 快照；不存在、格式不符或屬於其他技能目錄時回傳空索引"""
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != MANIFEST_FORMAT or data.get("skills_root") != self.skills_root:
+                return {}
+            index = {}
+            for name, entry in data["skills"].items():
+                entry["signature"] = tuple(tuple(sig) if sig else None for sig in entry["signature"])
+                index[name] = entry
+            return index
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring skill manifest {self.manifest_path}: {e}")
+            return {}
+
+    def _save_manifest(self, index: Dict[str, dict]):
+        if not self.manifest_path:
+            return
+        data = {"format": MANIFEST_FORMAT, "skills_root": self.skills_root, "skills": index}
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        try:
+            if os.path.dirname(self.manifest_path):
+                os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.warning(f"Failed to write skill manifest {self.manifest_path}: {e}")
+
+    def scan_skills(self) -> Tuple[dict, List[Skill]]:
+        """增量掃描並替換技能表，回傳 (變動摘要, 被取代或移除的舊 Skill)"""
+        changes = {"added": [], "updated": [], "removed": []}
         if not os.path.exists(self.skills_root):
             logger.error(f"Skills directory not found: {self.skills_root}")
-            return
+            return changes, []
 
-        logger.info(f"Scanning skills in: {self.skills_root}")
-        for item in os.listdir(self.skills_root):
-            item_path = os.path.join(self.skills_root, item)
-            
-            if os.path.isdir(item_path):
-                skill_file = os.path.join(item_path, "SKILL.md")
-                metadata = parse_skill_metadata(skill_file)
-                
-                if metadata:
-                    skill_id = metadata.get('name', item)
-                    self.skills[skill_id] = Skill(skill_id, item_path, metadata)
-                    logger.info(f"  [+] Loaded Skill: {skill_id} (v{self.skills[skill_id].version})")
+        old_skills = self.skills
+        old_by_dir = {os.path.basename(s.path): s for s in old_skills.values()}
+        new_skills: Dict[str, Skill] = {}
+        new_index: Dict[str, dict] = {}
+        dirty = False
+
+        for entry in sorted(os.scandir(self.skills_root), key=lambda e: e.name):
+            if not entry.is_dir():
+                continue
+            previous = self._index.get(entry.name)
+            old_skill = old_by_dir.get(entry.name)
+            if old_skill:
+                entrypoint = old_skill.entrypoint
+            elif previous:
+                entrypoint = previous["metadata"].get("entrypoint", os.path.join("scripts", "improve_fa_report.py"))
+            else:
+                entrypoint = os.path.join("scripts", "improve_fa_report.py")
+            signature = self._signature(entry.path, entrypoint)
+            if signature[0] is None:
+                continue  # 沒有 SKILL.md
+
+            skill = None
+            if previous and previous["signature"] == signature:
+                skill = old_skill or Skill(previous["skill_id"], entry.path, previous["metadata"])
+                new_index[entry.name] = previous
+            else:
+                skill_file = os.path.join(entry.path, "SKILL.md")
+                try:
+                    frontmatter_raw = read_frontmatter(skill_file)
+                except (OSError, ValueError):
+                    continue
+                # Skill 只使用 Frontmatter，內文不必讀取或雜湊
+                digest = hashlib.sha256((frontmatter_raw or "").encode("utf-8")).hexdigest()
+                dirty = True
+                if (previous and previous["digest"] == digest
+                        and previous["signature"][1] == signature[1]):
+                    # Frontmatter 與進入點都沒變 (touch 或只改內文)，沿用原物件
+                    skill = old_skill or Skill(previous["skill_id"], entry.path, previous["metadata"])
+                    new_index[entry.name] = dict(previous, signature=signature)
+                else:
+                    metadata = parse_skill_metadata(skill_file)
+                    if not metadata:
+                        continue
+                    skill = Skill(metadata.get('name', entry.name), entry.path, metadata)
+                    new_index[entry.name] = {
+                        "signature": self._signature(entry.path, skill.entrypoint),
+                        "digest": digest,
+                        "skill_id": skill.id,
+                        "metadata": metadata,
+                    }
+
+            new_skills[skill.id] = skill
+            if old_skill is None:
+                changes["added"].append(skill.id)
+                if previous is not None and new_index[entry.name] is previous:
+                    self.snapshot_hits += 1
+                logger.info(f"  [+] Loaded Skill: {skill.id} (v{skill.version})")
+            elif skill is not old_skill:
+                changes["updated"].append(skill.id)
+                logger.info(f"  [~] Reloaded Skill: {skill.id} (v{old_skill.version} -> v{skill.version})")
+
+        kept = {id(s) for s in new_skills.values()}
+        retired = [s for s in old_skills.values() if id(s) not in kept]
+        for skill in retired:
+            if skill.id not in new_skills:
+                changes["removed"].append(skill.id)
+                logger.info(f"  [-] Removed Skill: {skill.id}")
+
+        dirty = dirty or set(new_index) != set(self._index)
+        # 一次替換整個技能表與索引 (讀取端不會看到半更新的狀態)；沒有變動時保留原表，序列化快取仍有效
+        if any(changes.values()) or not self.skills:
+            self.skills = new_skills
+            # 搜尋索引只更新有變動的技能
+            for skill_id in changes["removed"]:
+                self.search_index.remove(skill_id)
+            for skill_id in changes["added"] + changes["updated"]:
+                skill = new_skills[skill_id]
+                self.search_index.add(skill.id, skill.name, skill.description, skill_tags(skill.metadata))
+        self._index = new_index
+        if dirty:
+            self._save_manifest(new_index)
+        return changes, retired
+
+    async def reload(self) -> dict:
+        """重新掃描 (磁碟 I/O 在執行緒中進行)，並讓被取代的舊版本在工作結束後關閉"""
+        changes, retired = await asyncio.to_thread(self.scan_skills)
+        for skill in retired:
+            await skill.retire()
+        if any(changes.values()):
+            self.reloads += 1
+            self.last_reload_at = time.time()
+        return changes
+
+    async def _watch_loop(self):
+        if self.watcher == "watchfiles":
+            import watchfiles
+            async for _ in watchfiles.awatch(self.skills_root):
+                try:
+                    await self.reload()
+                except Exception as e:
+                    logger.error(f"Skill reload failed: {e}")
+        else:
+            while True:
+                await asyncio.sleep(self.reload_interval)
+                try:
+                    await self.reload()
+                except Exception as e:
+                    logger.error(f"Skill reload failed: {e}")
+
+    def start(self):
+        """啟動熱重載 (reload_interval <= 0 時停用)"""
+        if self._task is None and self.reload_interval > 0:
+            self.watcher = "watchfiles" if _watchfiles_available() and os.getenv("SKILL_WATCHFILES", "1") != "0" else "poll"
+            self._task = asyncio.create_task(self._watch_loop())
+            logger.info(f"Skill hot reload enabled ({self.watcher})")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
 
     def get_skill(self, skill_id: str) -> Skill:
         return self.skills.get(skill_id)
 
+    async def aclose(self):
+        """關閉所有技能的常駐 Worker"""
+        for skill in self.skills.values():
+            await skill.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "skills": len(self.skills),
+            "watcher": self.watcher,
+            "reload_interval": self.reload_interval,
+            "reloads": self.reloads,
+            "snapshot_hits": self.snapshot_hits,
+            "last_reload_at": self.last_reload_at,
+        }
+
     def list_skills(self):
-        return [
-            {"id": s.id, "name": s.name, "description": s.description, "version": s.version}
-            for s in self.skills.values()
-        ]
+        return [self._project(s, LIST_FIELDS) for s in self.skills.values()]
+
+    @staticmethod
+    def _project(skill: Skill, fields) -> dict:
+        return {field: SKILL_FIELDS[field](skill) for field in fields}
+
+    def search_skills(self, query: Optional[str] = None, offset: int = 0, limit: Optional[int] = None,
+                      fields: Optional[List[str]] = None) -> Tuple[int, List[dict]]:
+        """全文檢索 (name / description / tags) 並分頁，回傳 (符合總數, 該頁內容)"""
+        fields = fields or list(LIST_FIELDS)
+        unknown = [f for f in fields if f not in SKILL_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown skill fields: {', '.join(unknown)} (available: {', '.join(SKILL_FIELDS)})")
+        skills = self.skills
+        end = offset + limit if limit is not None else None
+        if query and query.strip():
+            total, ranked = self.search_index.search(query, end)
+            page = [skills[skill_id] for skill_id in ranked[offset:] if skill_id in skills]
+        else:
+            total, page = len(skills), list(skills.values())[offset:end]
+        return total, [self._project(s, fields) for s in page]
+
+    def _cached_payload(self, key: str, build: Callable[[dict], object]) -> JSONPayload:
+        skills = self.skills
+        if self._payloads_for is not skills:
+            self._payloads, self._payloads_for = {}, skills
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = self._payloads[key] = serialize_payload(build(skills))
+        return payload
+
+    def list_payload(self) -> JSONPayload:
+        """/api/skills 的序列化結果，技能表未變動前重複使用"""
+        return self._cached_payload("list", lambda skills: self.list_skills())
+
+    def bootstrap_payload(self, default_skill_id: str) -> JSONPayload:
+        """技能清單 + 預設技能 manifest，讓介面首次載入只需一個請求"""
+        def build(skills):
+            default = skills.get(default_skill_id) or next(iter(skills.values()), None)
+            return {
+                "skills": self.list_skills(),
+                "default_skill": default.id if default else None,
+                "manifest": default.metadata if default else None,
+            }
+        return self._cached_payload(f"bootstrap:{default_skill_id}", build)
 
-# 初始化全域註冊表
 current_dir = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_SKILLS_ROOT = os.path.abspath(os.path.join(current_dir, "../../.agent/skills"))
 skills_root = os.getenv("SKILLS_ROOT", DEFAULT_SKILLS_ROOT)
 
-skill_registry = SkillRegistry(skills_root)
+# 全域註冊表延後到第一次使用 (通常是 lifespan 啟動) 才掃描，import 本模組不做磁碟 I/O
+_skill_registry: Optional[SkillRegistry] = None
+_skill_registry_lock = threading.Lock()
+
+def get_skill_registry() -> SkillRegistry:
+    global _skill_registry
+    if _skill_registry is None:
+        with _skill_registry_lock:
+            if _skill_registry is None:
+                _skill_registry = SkillRegistry(
+                    skills_root,
+                    reload_interval=float(os.getenv("SKILL_RELOAD_INTERVAL", "5")),
+                    manifest_path=os.getenv("SKILL_MANIFEST_PATH", os.path.join("cache", "skills_manifest.json")) or None,
+                )
+    return _skill_registry
+
+def __getattr__(name):
+    # PEP 562：`from app.services.skill_manager import skill_registry` 時才建立註冊表
+    if name == "skill_registry":
+        return get_skill_registry()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+CORE_SKILL_ID = "fa-report-improvement"
 
 # 為了保持向後相容，我們保留一個簡單的介面來調用之前的特定技能
 class LegacySkillManager:
+    def get_skill(self) -> Skill:
+        return get_skill_registry().get_skill(CORE_SKILL_ID)
+
     def run_improvement(self, input_file: str, eval_json: str, output_file: str):
         # 預設調用 fa-report-improvement
-        skill = skill_registry.get_skill("fa-report-improvement")
+        skill = self.get_skill()
         if not skill:
             return False, "找不到核心技能 'fa-report-improvement'"
         return skill.run(input_file, eval_json, output_file)
 
+    async def run_improvement_async(self, input_file: str, eval_json: str, output_file: str, on_output=None,
+                                    skill: Skill = None):
+        """run_improvement 的非阻塞版本，供 async 路由使用
+
+        skill: 工作開始時取得的技能版本 (熱重載期間仍以同一版本執行並寫入結果快取)
+        """
+        skill = skill or self.get_skill()
+        if not skill:
+            return False, "找不到核心技能 'fa-report-improvement'"
+        return await skill.run_async(input_file, eval_json, output_file, on_output=on_output)
+
 skill_manager = LegacySkillManager()
@@ -0,0 +1,113 @@
+"""
+常駐技能 Worker (由技能虛擬環境中的 Python 執行)
+
+用法: python skill_worker.py <entrypoint 腳本路徑> <函式名稱>
+
+啟動時預先載入技能模組 (python-pptx / lxml 等只匯入一次)，之後由 stdin
+逐行讀取 JSON 工作，並以 JSON 行回傳結果至 stdout。此檔案僅依賴標準函式庫，
+因為它執行於技能自身的 venv 中，無法匯入 app 套件。
+
+協定:
+    啟動完成 -> {"ready": true} 或 {"ready": false, "error": "..."}
+    請求     <- {"id": 1, "args": ["in.pptx", "eval.json", "out.pptx"]}
+    進度     -> {"id": 1, "log": "✓ 添加基本資訊投影片"}   (每印出一行即送出)
+    回應     -> {"id": 1, "ok": true, "stdout": "...", "error": ""}
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import traceback
+
+
+def _write(stream, payload):
+    stream.write((json.dumps(payload) + "\n").encode("ascii"))
+    stream.flush()
+
+
+def load_entry_function(script_path, function_name):
+    """以檔案路徑載入技能模組並取得入口函式"""
+    script_dir = os.path.dirname(os.path.abspath(script_path))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    module_name = os.path.splitext(os.path.basename(script_path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return getattr(module, function_name)
+
+
+class LineForwarder(io.TextIOBase):
+    """擷取工作輸出，並在每個完整行寫出時即時送出進度訊息"""
+
+    def __init__(self, stream, job_id):
+        self.stream = stream
+        self.job_id = job_id
+        self.captured = io.StringIO()
+        self._pending = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.captured.write(text)
+        self._pending += text
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            _write(self.stream, {"id": self.job_id, "log": line})
+        return len(text)
+
+    def close_pending(self):
+        if self._pending:
+            _write(self.stream, {"id": self.job_id, "log": self._pending})
+            self._pending = ""
+
+
+def run_job(func, args, forwarder):
+    """執行單一工作並擷取其 stdout 輸出"""
+    ok, error = True, ""
+    try:
+        with contextlib.redirect_stdout(forwarder):
+            result = func(*args)
+        ok = result is not False
+    except SystemExit as e:
+        ok = e.code in (0, None)
+        error = "" if ok else f"SystemExit({e.code})"
+    except Exception:
+        ok = False
+        error = traceback.format_exc()
+    forwarder.close_pending()
+    return ok, forwarder.captured.getvalue(), error
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.stderr.write("usage: skill_worker.py <script_path> <function>\n")
+        sys.exit(2)
+
+    # 保留原始 stdout 作為協定通道，其餘 print 一律導向 stderr，避免污染協定
+    protocol_out = sys.stdout.buffer
+    sys.stdout = sys.stderr
+
+    try:
+        func = load_entry_function(sys.argv[1], sys.argv[2])
+    except Exception:
+        _write(protocol_out, {"ready": False, "error": traceback.format_exc()})
+        sys.exit(1)
+    _write(protocol_out, {"ready": True})
+
+    for raw in sys.stdin.buffer:
+        if not raw.strip():
+            continue
+        request = json.loads(raw.decode("utf-8"))
+        forwarder = LineForwarder(protocol_out, request.get("id"))
+        ok, stdout, error = run_job(func, request.get("args", []), forwarder)
+        _write(protocol_out, {"id": request.get("id"), "ok": ok, "stdout": stdout, "error": error})
+
+
+if __name__ == "__main__":
+    main()
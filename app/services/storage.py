@@ -0,0 +1,373 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class StoredBlob:
+    """已寫入內容定址儲存區的上傳檔案"""
+
+    def __init__(self, path: str, sha256: str, size: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+
+def safe_filename(filename: Optional[str], default: str = "upload") -> str:
+    """只保留檔名本身，避免客戶端以 ../ 等路徑跳出工作目錄"""
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if name in ("", ".", ".."):
+        return default
+    return name
+
+
+class UploadStorage:
+    """上傳檔案儲存層
+
+    - blobs/<sha[:2]>/<sha>: 以 SHA-256 定址的唯讀原始檔 (相同內容只存一份)
+    - <workspace_id>/: 每個請求獨立的工作目錄，放置輸入的硬連結、加工 JSON 與輸出檔
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.tmp_dir = os.path.join(root, "blobs", "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._pins: Dict[str, int] = {}
+        self._blob_pins: Dict[str, int] = {}
+        self._pins_lock = threading.Lock()
+
+    def pin(self, workspace_id: str):
+        """標記工作目錄仍被進行中的工作使用，GC 不會刪除"""
+        with self._pins_lock:
+            self._pins[workspace_id] = self._pins.get(workspace_id, 0) + 1
+
+    def release(self, workspace_id: str):
+        """解除 pin，並更新存取時間讓 LRU 從此刻起計算"""
+        with self._pins_lock:
+            count = self._pins.get(workspace_id, 0) - 1
+            if count > 0:
+                self._pins[workspace_id] = count
+            else:
+                self._pins.pop(workspace_id, None)
+        self.touch(workspace_id)
+
+    def is_pinned(self, workspace_id: str) -> bool:
+        with self._pins_lock:
+            return workspace_id in self._pins
+
+    def release_blob(self, sha256: str):
+        """解除 save_upload() 對 blob 的 pin (放入工作目錄後呼叫)"""
+        with self._pins_lock:
+            count = self._blob_pins.get(sha256, 0) - 1
+            if count > 0:
+                self._blob_pins[sha256] = count
+            else:
+                self._blob_pins.pop(sha256, None)
+
+    def remove_blob(self, sha256: str) -> bool:
+        """刪除未被 pin 的 blob；與 _commit_blob 共用鎖，避免刪掉剛去重沿用的檔案"""
+        with self._pins_lock:
+            if sha256 in self._blob_pins:
+                return False
+            _remove_tree(self.blob_path(sha256))
+            return True
+
+    def touch(self, workspace_id: str):
+        try:
+            os.utime(self.workspace_path(workspace_id))
+        except OSError:
+            pass
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blobs_dir, sha256[:2], sha256)
+
+    async def save_upload(self, upload) -> StoredBlob:
+        """分塊串流寫入上傳檔案並同時計算 SHA-256 (磁碟 I/O 在執行緒中進行)
+
+        回傳的 blob 已被 pin，放入工作目錄後須呼叫 release_blob()。
+        """
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.remove, tmp_path)
+            raise
+        await asyncio.to_thread(f.close)
+
+        sha256 = digest.hexdigest()
+        path = await asyncio.to_thread(self._commit_blob, tmp_path, sha256)
+        return StoredBlob(path, sha256, size)
+
+    def _commit_blob(self, tmp_path: str, sha256: str) -> str:
+        path = self.blob_path(sha256)
+        with self._pins_lock:
+            self._blob_pins[sha256] = self._blob_pins.get(sha256, 0) + 1
+            if os.path.exists(path):
+                # 內容相同的檔案已存在，直接沿用 (跨使用者去重)
+                os.remove(tmp_path)
+                os.utime(path)
+                return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmp_path, path)
+        return path
+
+    def create_workspace(self) -> str:
+        """建立本次請求專屬的工作目錄並自動 pin，使用完畢須呼叫 release()"""
+        workspace_id = uuid.uuid4().hex
+        self.pin(workspace_id)
+        os.makedirs(os.path.join(self.root, workspace_id))
+        return workspace_id
+
+    def discard_workspace(self, workspace_id: str):
+        """放棄尚未交給工作的工作目錄：解除 pin 並刪除"""
+        self.release(workspace_id)
+        try:
+            _remove_tree(self.workspace_path(workspace_id))
+        except OSError as e:
+            logger.warning(f"Failed to remove workspace {workspace_id}: {e}")
+
+    def workspace_path(self, workspace_id: str, filename: str = "") -> str:
+        return os.path.join(self.root, workspace_id, filename) if filename else os.path.join(self.root, workspace_id)
+
+    def materialize(self, blob: StoredBlob, workspace_id: str, filename: str) -> str:
+        """以原始檔名將 blob 放入工作目錄 (技能依副檔名判斷 .ppt/.pptx)"""
+        path = self.workspace_path(workspace_id, safe_filename(filename))
+        try:
+            os.link(blob.path, path)
+        except OSError:
+            shutil.copyfile(blob.path, path)
+        return path
+
+    def resolve(self, relative_path: str) -> Optional[str]:
+        """將下載路徑解析為儲存區內的實體路徑，拒絕跳出根目錄的請求"""
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, relative_path))
+        if not path.startswith(root + os.sep) or path.startswith(os.path.realpath(self.blobs_dir) + os.sep):
+            return None
+        return path
+
+
+def _remove_tree(path: str):
+    """刪除檔案或目錄 (先解除唯讀屬性，Windows 上唯讀檔無法直接刪除)"""
+    def on_error(func, target, exc_info):
+        os.chmod(target, stat.S_IWRITE | stat.S_IREAD)
+        func(target)
+
+    if os.path.isdir(path):
+        shutil.rmtree(path, onerror=on_error)
+    else:
+        try:
+            os.remove(path)
+        except PermissionError:
+            on_error(os.remove, path, None)
+
+
+class StorageGC:
+    """上傳目錄的背景回收器：超過保存期限或總量超過配額時，依 LRU 刪除未被使用的項目
+
+    回收單位為一個工作目錄、一個 blob 或根目錄下的舊版平面檔案；
+    被 pin 的工作目錄 (進行中的工作) 與尚未放入工作目錄的 blob 永遠不會被刪除。
+    blob 與工作目錄內的輸入檔互為硬連結，用量以 inode 計算，最後一個連結被刪除時才算釋放。
+    """
+
+    def __init__(self, storage: UploadStorage, quota_bytes: int, max_age_seconds: float, interval: float = 300):
+        self.storage = storage
+        self.quota_bytes = quota_bytes
+        self.max_age_seconds = max_age_seconds
+        self.interval = interval
+        self.runs = 0
+        self.last_run_at: Optional[float] = None
+        self.last_usage_bytes = 0
+        self.last_unit_count = 0
+        self.evicted_quota = 0
+        self.evicted_expired = 0
+        self.freed_bytes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _scan(self) -> Tuple[List[dict], Dict[Tuple[int, int], List[int]]]:
+        """列出所有回收單位；回傳 (單位清單, inode -> [大小, 剩餘連結數])，硬連結的檔案只計算一次"""
+        units, inodes = [], {}
+        tmp_cutoff = time.time() - 3600
+
+        def measure(path):
+            total, newest, unit_inodes = 0, 0.0, []
+            files = [path] if os.path.isfile(path) else [
+                os.path.join(d, n) for d, _, names in os.walk(path) for n in names
+            ]
+            for file_path in files:
+                try:
+                    st = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                newest = max(newest, st.st_mtime)
+                inode = (st.st_dev, st.st_ino)
+                inodes.setdefault(inode, [st.st_size, st.st_nlink])
+                unit_inodes.append(inode)
+                total += st.st_size
+            return total, newest, unit_inodes
+
+        root = self.storage.root
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name == "blobs":
+                continue
+            total, newest, unit_inodes = measure(path)
+            last_access = max(newest, os.stat(path).st_mtime)
+            units.append({"path": path, "workspace_id": name if os.path.isdir(path) else None, "blob": None,
+                          "bytes": total, "inodes": unit_inodes, "last_access": last_access})
+
+        for prefix in os.listdir(self.storage.blobs_dir):
+            prefix_dir = os.path.join(self.storage.blobs_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                path = os.path.join(prefix_dir, name)
+                if prefix == "tmp" and os.stat(path).st_mtime > tmp_cutoff:
+                    continue  # 仍在寫入中的上傳暫存檔
+                total, newest, unit_inodes = measure(path)
+                units.append({"path": path, "workspace_id": None, "blob": None if prefix == "tmp" else name,
+                              "bytes": total, "inodes": unit_inodes, "last_access": newest})
+        return units, inodes
+
+    def run_once(self) -> dict:
+        """執行一次回收 (同步，會在執行緒中呼叫)"""
+        units, inodes = self._scan()
+        usage = sum(size for size, _ in inodes.values())
+        now = time.time()
+        evicted = {"expired": 0, "quota": 0, "freed_bytes": 0}
+
+        def evict(unit, reason):
+            nonlocal usage
+            if unit["workspace_id"] and self.storage.is_pinned(unit["workspace_id"]):
+                return False
+            try:
+                if unit["blob"]:
+                    if not self.storage.remove_blob(unit["blob"]):
+                        return False  # 已寫入但尚未放入工作目錄
+                else:
+                    _remove_tree(unit["path"])
+            except OSError as e:
+                logger.warning(f"Storage GC failed to remove {unit['path']}: {e}")
+                return False
+            # 只有最後一個連結被刪除的 inode 才真正釋放空間
+            for inode in unit["inodes"]:
+                entry = inodes[inode]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    usage -= entry[0]
+                    evicted["freed_bytes"] += entry[0]
+            evicted[reason] += 1
+            return True
+
+        remaining = []
+        for unit in sorted(units, key=lambda u: u["last_access"]):
+            if now - unit["last_access"] > self.max_age_seconds and evict(unit, "expired"):
+                continue
+            remaining.append(unit)
+
+        for unit in remaining:
+            if usage <= self.quota_bytes:
+                break
+            evict(unit, "quota")
+
+        self.runs += 1
+        self.last_run_at = now
+        self.last_usage_bytes = usage
+        self.last_unit_count = len(units) - evicted["expired"] - evicted["quota"]
+        self.evicted_expired += evicted["expired"]
+        self.evicted_quota += evicted["quota"]
+        self.freed_bytes += evicted["freed_bytes"]
+        if evicted["expired"] or evicted["quota"]:
+            logger.info(f"Storage GC evicted {evicted['expired']} expired / {evicted['quota']} over-quota items, "
+                        f"freed {evicted['freed_bytes']} bytes (usage now {usage})")
+        return evicted
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error(f"Storage GC run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "usage_bytes": self.last_usage_bytes,
+            "items": self.last_unit_count,
+            "quota_bytes": self.quota_bytes,
+            "max_age_seconds": self.max_age_seconds,
+            "pinned_workspaces": len(self.storage._pins),
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "evicted_expired": self.evicted_expired,
+            "evicted_quota": self.evicted_quota,
+            "freed_bytes": self.freed_bytes,
+        }
+
+
+_upload_storage: Optional[UploadStorage] = None
+_storage_gc: Optional[StorageGC] = None
+_storage_lock = threading.Lock()
+
+def get_upload_storage() -> UploadStorage:
+    """第一次使用時才建立上傳目錄，import 時不碰磁碟"""
+    global _upload_storage
+    if _upload_storage is None:
+        with _storage_lock:
+            if _upload_storage is None:
+                _upload_storage = UploadStorage(os.getenv("UPLOAD_DIR", "uploads"))
+    return _upload_storage
+
+def get_storage_gc() -> StorageGC:
+    global _storage_gc
+    if _storage_gc is None:
+        storage = get_upload_storage()
+        with _storage_lock:
+            if _storage_gc is None:
+                _storage_gc = StorageGC(
+                    storage,
+                    quota_bytes=int(os.getenv("STORAGE_QUOTA_MB", "10240")) * 1024 * 1024,
+                    max_age_seconds=float(os.getenv("STORAGE_MAX_AGE_HOURS", "168")) * 3600,
+                    interval=float(os.getenv("STORAGE_GC_INTERVAL", "300"))
+                )
+    return _storage_gc
+
+def __getattr__(name):
+    # PEP 562：相容 `from app.services.storage import upload_storage, storage_gc`
+    if name == "upload_storage":
+        return get_upload_storage()
+    if name == "storage_gc":
+        return get_storage_gc()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
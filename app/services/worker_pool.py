@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skill_worker.py")
+WORKER_START_TIMEOUT = float(os.getenv("SKILL_WORKER_START_TIMEOUT", "60"))
+# 單行 JSON 回應可能包含完整的 stdout，放寬 StreamReader 的行長上限
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class WorkerUnavailableError(RuntimeError):
+    """Worker 無法啟動或在工作途中崩潰，呼叫端應退回一次性執行模式"""
+
+
+class SkillWorker:
+    """單一常駐 Worker 行程 (以 stdin/stdout JSON 行通訊)"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.jobs_done = 0
+        self._next_id = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    @classmethod
+    async def spawn(cls, python_executable: str, script_path: str, function: str):
+        process = await asyncio.create_subprocess_exec(
+            python_executable, WORKER_SCRIPT, script_path, function,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT
+        )
+        worker = cls(process)
+        try:
+            line = await asyncio.wait_for(process.stdout.readline(), WORKER_START_TIMEOUT)
+            handshake = json.loads(line) if line else {"ready": False, "error": "worker exited during startup"}
+        except (asyncio.TimeoutError, ValueError) as e:
+            handshake = {"ready": False, "error": f"invalid handshake: {e!r}"}
+        if not handshake.get("ready"):
+            await worker.kill()
+            raise WorkerUnavailableError(handshake.get("error", "unknown error"))
+        return worker
+
+    async def call(self, args: List[str], on_output: Optional[Callable[[str], None]] = None):
+        self._next_id += 1
+        request = {"id": self._next_id, "args": list(args)}
+        try:
+            self.process.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+            await self.process.stdin.drain()
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    raise WorkerUnavailableError(f"worker exited (code {self.process.returncode})")
+                message = json.loads(line)
+                if "log" not in message:
+                    break
+                if on_output:
+                    on_output(message["log"])
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise WorkerUnavailableError(f"worker pipe closed: {e}")
+        self.jobs_done += 1
+        return message
+
+    async def kill(self):
+        if self.alive:
+            self.process.kill()
+        await self.process.wait()
+
+    async def stop(self):
+        """關閉 stdin 讓 Worker 正常結束，逾時則強制終止"""
+        if self.alive:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), 5)
+            except (asyncio.TimeoutError, BrokenPipeError, ConnectionResetError):
+                await self.kill()
+
+
+class SkillWorkerPool:
+    """技能的常駐 Worker 池：預載模組、依工作數回收並在崩潰時自動替換"""
+
+    def __init__(self, skill_id: str, python_executable: str, script_path: str,
+                 function: str, size: int = 1, max_jobs: int = 100):
+        self.skill_id = skill_id
+        self.python_executable = python_executable
+        self.script_path = script_path
+        self.function = function
+        self.size = max(1, size)
+        self.max_jobs = max(1, max_jobs)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle: List[SkillWorker] = []
+        self._workers: List[SkillWorker] = []
+        self.broken = False
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        return self._slots
+
+    async def _spawn(self) -> SkillWorker:
+        # 與一次性模式相同，沿用伺服器的工作目錄以正確解析相對路徑
+        worker = await SkillWorker.spawn(self.python_executable, self.script_path, self.function)
+        self._workers.append(worker)
+        logger.info(f"Skill worker started for '{self.skill_id}' (pid {worker.process.pid})")
+        return worker
+
+    async def _retire(self, worker: SkillWorker, graceful: bool = False):
+        if worker in self._workers:
+            self._workers.remove(worker)
+        if graceful:
+            await worker.stop()
+        else:
+            await worker.kill()
+
+    async def warm_up(self):
+        """預先啟動全部 Worker，避免首個請求承擔冷啟動成本"""
+        while len(self._workers) < self.size:
+            self._idle.append(await self._spawn())
+
+    async def run(self, *args, on_output: Optional[Callable[[str], None]] = None):
+        """將工作交給閒置 Worker 執行，回傳 (success, output)；on_output 逐行接收輸出"""
+        if self.broken:
+            raise WorkerUnavailableError("worker pool disabled")
+
+        async with self._get_slots():
+            worker = None
+            while self._idle and worker is None:
+                candidate = self._idle.pop()
+                if candidate.alive:
+                    worker = candidate
+                else:
+                    await self._retire(candidate)
+            if worker is None:
+                try:
+                    worker = await self._spawn()
+                except WorkerUnavailableError as e:
+                    self.broken = True
+                    logger.warning(f"Skill worker for '{self.skill_id}' failed to start, pool disabled: {e}")
+                    raise
+
+            try:
+                response = await worker.call(args, on_output)
+            except WorkerUnavailableError:
+                logger.warning(f"Skill worker for '{self.skill_id}' crashed, recycling (pid {worker.process.pid})")
+                await self._retire(worker)
+                raise
+            except BaseException:
+                # 取消或協定錯誤時 Worker 狀態不明，直接回收
+                await self._retire(worker)
+                raise
+
+            if worker.jobs_done >= self.max_jobs:
+                logger.info(f"Recycling skill worker for '{self.skill_id}' after {worker.jobs_done} jobs")
+                await self._retire(worker, graceful=True)
+            else:
+                self._idle.append(worker)
+
+        if response.get("ok"):
+            return True, response.get("stdout", "")
+        return False, f"技能執行失敗 ({self.skill_id})。\n[錯誤詳情]: {response.get('error', '')}"
+
+    async def close(self):
+        for worker in list(self._workers):
+            await self._retire(worker, graceful=True)
+        self._idle.clear()
@@ -0,0 +1,74 @@
+"""
+SKILL.md 解析效能基準：舊版 (讀全文 + DOTALL regex + 純 Python safe_load) vs 只讀標頭 + CSafeLoader + 快取
+
+執行方式: python -m tests.benchmarks.bench_frontmatter
+"""
+import os
+import re
+import tempfile
+import time
+import yaml
+from app.services.frontmatter import FrontmatterCache
+
+HEADER = """---
+name: skill-{i:05d}
+version: "1.{i}.0"
+description: Synthetic skill {i} for improving failure analysis reports
+entrypoint: scripts/main.py
+max_concurrency: 2
+tags: [report, pptx, quality]
+inputs:
+  - id: report
+    type: file
+    label: 原始報告
+    accept: ".ppt,.pptx"
+    priority: 1
+  - id: prompt
+    type: text
+    label: 額外指示
+    priority: 2
+---
+"""
+BODY = "## 使用說明\n" + "這段是技能的詳細操作說明與範例輸出，用於模擬較長的 Markdown 內文。\n" * 400
+
+
+def legacy_parse(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    match = re.search(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL | re.MULTILINE)
+    return yaml.safe_load(match.group(1)) if match else None
+
+
+def make_catalog(root, count):
+    paths = []
+    for i in range(count):
+        skill_dir = os.path.join(root, f"skill-{i:05d}")
+        os.makedirs(skill_dir)
+        path = os.path.join(skill_dir, "SKILL.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(HEADER.format(i=i) + BODY)
+        paths.append(path)
+    return paths
+
+
+def scan(parse, paths):
+    start = time.perf_counter()
+    results = [parse(path) for path in paths]
+    return time.perf_counter() - start, results
+
+
+def main():
+    for count in (500, 3000):
+        with tempfile.TemporaryDirectory() as root:
+            paths = make_catalog(root, count)
+            legacy, expected = scan(legacy_parse, paths)
+            cache = FrontmatterCache()
+            cold, results = scan(cache.parse, paths)
+            warm, _ = scan(cache.parse, paths)
+            assert results == expected
+            print(f"{count:5d} skills  legacy {legacy * 1000:8.1f} ms  header+CSafeLoader {cold * 1000:8.1f} ms"
+                  f"  cached {warm * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
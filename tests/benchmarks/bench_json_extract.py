@@ -0,0 +1,61 @@
+"""
+JSON 擷取效能基準：比較舊版「每個 { 切片後 raw_decode」與 extract_json
+
+執行方式: python -m tests.benchmarks.bench_json_extract
+"""
+import json
+import re
+import time
+from app.services.json_extract import extract_json
+
+PAYLOAD = json.dumps({"total_score": 88, "dimensions": {"d%d" % i: {"score": i, "note": "x" * 40} for i in range(200)}})
+
+
+def legacy_extract(content):
+    decoder = json.JSONDecoder()
+    for start_index in [m.start() for m in re.finditer('{', content)]:
+        try:
+            return decoder.raw_decode(content[start_index:])[0]
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def brace_noise(size):
+    # 大量說明文字中的 {placeholder}，有效 JSON 在最後
+    return "請參考 {欄位} 說明。" * (size // 12) + PAYLOAD
+
+
+def unclosed_noise(size):
+    # 被截斷、永不閉合的括號後才出現有效 JSON
+    return "{ 草稿 " * (size // 5) + PAYLOAD
+
+
+def trailing_commas(size):
+    items = ", ".join('{"k": %d, "v": [1, 2, 3, ], }' % i for i in range(size // 30))
+    return "```json\n{\"total_score\": 1, \"items\": [%s, ], }\n```." % items
+
+
+def timed(fn, text):
+    start = time.perf_counter()
+    result = fn(text)
+    return time.perf_counter() - start, result
+
+
+def main():
+    cases = [("brace noise", brace_noise), ("unclosed braces", unclosed_noise), ("trailing commas", trailing_commas)]
+    for name, build in cases:
+        for size in (50_000, 500_000, 4_000_000):
+            text = build(size)
+            elapsed, result = timed(extract_json, text)
+            assert result is not None, name
+            line = f"{name:16s} {len(text) / 1e6:6.2f} MB  extract_json {elapsed * 1000:9.1f} ms"
+            if size <= 500_000:
+                # 舊版為平方時間，只在小輸入上比較
+                legacy_elapsed, _ = timed(legacy_extract, text)
+                line += f"  legacy {legacy_elapsed * 1000:9.1f} ms"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+技能搜尋效能基準：10k 個合成技能上，倒排索引查詢 vs 逐一掃描子字串比對
+
+執行方式: python -m tests.benchmarks.bench_skill_search
+"""
+import random
+import statistics
+import time
+from app.services.skill_index import SkillSearchIndex
+
+WORDS = ("report pptx pdf excel chart summary failure analysis root cause supplier audit quality "
+         "yield wafer package thermal stress vibration review translate extract classify").split()
+CJK_WORDS = ["失效分析", "根因", "改善對策", "簡報", "品質稽核", "供應商", "良率", "封裝", "翻譯", "摘要"]
+# 目標：10k 個技能上，即使是命中數千筆的廣泛查詢，取前 20 名的中位數也要低於 1 ms
+TARGET_MS = 1.0
+QUERIES = ["report", "wafer yield", "supp", "根因", "品質稽核 audit", "skill-09999", "nomatch"]
+
+
+def make_catalog(count, seed=7):
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(count):
+        words = rng.sample(WORDS, 6) + rng.sample(CJK_WORDS, 2)
+        catalog.append({
+            "id": f"skill-{i:05d}",
+            "name": f"skill-{i:05d} {words[0]}",
+            "description": " ".join(words[1:]) + f" variant{i}",
+            "tags": rng.sample(WORDS, 2),
+        })
+    return catalog
+
+
+def linear_search(catalog, query):
+    terms = query.lower().split()
+    return [s["id"] for s in catalog
+            if all(t in f"{s['name']} {s['description']} {' '.join(s['tags'])}".lower() for t in terms)]
+
+
+def timed(fn, repeat=200):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main():
+    catalog = make_catalog(10_000)
+    start = time.perf_counter()
+    index = SkillSearchIndex()
+    for skill in catalog:
+        index.add(skill["id"], skill["name"], skill["description"], skill["tags"])
+    print(f"indexed {len(index)} skills in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    slow = []
+    for query in QUERIES:
+        # 與 /api/skills?limit=20 相同：只需排名前 20 筆
+        indexed, (total, _) = timed(lambda: index.search(query, 20))
+        linear, _ = timed(lambda: linear_search(catalog, query), repeat=10)
+        print(f"{query!r:22s} hits {total:5d}  index {indexed * 1000:7.3f} ms  linear {linear * 1000:7.2f} ms")
+        if indexed * 1000 >= TARGET_MS:
+            slow.append(f"{query!r} {indexed * 1000:.3f} ms")
+
+    start = time.perf_counter()
+    for skill in catalog[:1000]:
+        index.add(skill["id"], skill["name"] + " updated", skill["description"], skill["tags"])
+    print(f"incremental update: {(time.perf_counter() - start) / 1000 * 1e6:.1f} us per skill")
+    assert not slow, f"search slower than {TARGET_MS} ms target: {', '.join(slow)}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+FA 報告改善效能基準：300 頁簡報上，舊版 (逐形狀重複讀 text_frame.text、每次插入都重建投影片清單)
+vs SlideIndex (形狀文字只讀一次、排序延到存檔前一次套用)
+
+執行方式: python -m tests.benchmarks.bench_slide_index
+"""
+import os
+import sys
+import time
+from pptx import Presentation
+from pptx.util import Inches
+
+sys.path.insert(0, os.path.join(".agent", "skills", "fa-report-improvement", "scripts"))
+from improve_fa_report import SlideIndex  # noqa: E402
+
+SHAPES_PER_SLIDE = 8
+MOVES = (2, 8, -2)
+
+
+def make_deck(slides):
+    prs = Presentation()
+    for i in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = "Summary" if i == slides - 1 else f"Slide {i}"
+        slide.placeholders[1].text = "失效現象描述與量測數據 " * 6
+        for j in range(SHAPES_PER_SLIDE - 2):
+            frame = slide.shapes.add_textbox(Inches(1), Inches(1 + j * 0.5), Inches(4), Inches(0.4)).text_frame
+            for k in range(4):
+                frame.add_paragraph().text = f"量測點 {j}-{k} 數值 {i * k}"
+    return prs
+
+
+def legacy(prs):
+    summary_idx = None
+    for i, slide in enumerate(prs.slides):
+        for shape in slide.shapes:
+            if hasattr(shape, 'text_frame'):
+                if 'Summary' in shape.text_frame.text or '根因' in shape.text_frame.text:
+                    summary_idx = i
+                    break
+        if summary_idx is not None:
+            break
+    slide = prs.slides[summary_idx]
+    for shape in list(slide.shapes):
+        if hasattr(shape, 'text_frame'):
+            text = shape.text_frame.text.strip()
+            if 'Summary' in text and len(text) < 20:
+                continue
+    for position in MOVES:
+        prs.slides.add_slide(prs.slide_layouts[6])
+        xml_slides = prs.slides._sldIdLst
+        slides = list(xml_slides)
+        xml_slides.remove(slides[-1])
+        xml_slides.insert(position, slides[-1])
+
+
+def indexed(prs):
+    index = SlideIndex(prs)
+    entry = index.find('Summary', '根因')
+    for info in entry.shapes:
+        text = info.text.strip()
+        if 'Summary' in text and len(text) < 20:
+            continue
+    for position in MOVES:
+        prs.slides.add_slide(prs.slide_layouts[6])
+        index.place_last_slide(position)
+    index.apply_order()
+
+
+def timed(fn, slides, repeat=5):
+    best = None
+    for _ in range(repeat):
+        prs = make_deck(slides)
+        start = time.perf_counter()
+        fn(prs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, [slide.slide_id for slide in prs.slides]
+
+
+def main():
+    for slides in (30, 300):
+        old, old_order = timed(legacy, slides)
+        new, new_order = timed(indexed, slides)
+        assert old_order == new_order
+        print(f"{slides:4d} slides  legacy {old * 1000:8.1f} ms  slide index {new * 1000:8.1f} ms"
+              f"  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+啟動效能基準：import app.main 的時間，以及含 lifespan 啟動的首個請求時間 (冷啟動 vs manifest 快照)
+
+以合成技能目錄 (每個 SKILL.md 含數 KB 內文) 模擬大型技能庫，每次量測都在新的直譯器中進行。
+執行方式: python -m tests.benchmarks.bench_startup
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    response = client.get("/api/skills")
+    first_request = time.perf_counter()
+assert response.status_code == 200
+print(json.dumps({"import": imported - start, "first_request": first_request - start,
+                  "skills": len(response.json())}))
+"""
+
+
+def make_catalog(root, count):
+    body = "## 說明\n" + "這是技能的詳細使用說明與範例。\n" * 200
+    for i in range(count):
+        skill_dir = os.path.join(root, f"skill-{i:05d}")
+        os.makedirs(os.path.join(skill_dir, "scripts"))
+        with open(os.path.join(skill_dir, "SKILL.md"), "w", encoding="utf-8") as f:
+            f.write(f"---\nname: skill-{i:05d}\ndescription: Synthetic skill number {i}\n"
+                    f"version: \"1.{i}.0\"\nentrypoint: scripts/main.py\n---\n{body}")
+        with open(os.path.join(skill_dir, "scripts", "main.py"), "w", encoding="utf-8") as f:
+            f.write("print('ok')\n")
+
+
+def probe(env):
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    for count in (100, 1000):
+        with tempfile.TemporaryDirectory() as root:
+            skills_dir = os.path.join(root, "skills")
+            make_catalog(skills_dir, count)
+            env = dict(os.environ, SKILLS_ROOT=skills_dir, SKILL_RELOAD_INTERVAL="0",
+                       SKILL_MANIFEST_PATH=os.path.join(root, "skills_manifest.json"),
+                       LLM_CACHE_PATH=os.path.join(root, "llm.sqlite3"))
+            cold = probe(env)
+            warm = probe(env)
+            assert cold["skills"] == warm["skills"] == count
+            for label, timing in (("cold (scan)", cold), ("warm (manifest)", warm)):
+                print(f"{count:5d} skills  {label:16s} import {timing['import'] * 1000:7.1f} ms"
+                      f"  first request {timing['first_request'] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
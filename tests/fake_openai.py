@@ -0,0 +1,64 @@
+"""
+本地的 OpenAI 相容假伺服器 (ASGI)，以 httpx.ASGITransport 掛到 LLMClient 上測試
+
+每個請求依序取用 script 中的 (狀態碼, 延遲秒數, 內容)，用完後回到預設行為；
+429 的內容欄位作為 Retry-After 秒數 (預設 0)。
+多個假伺服器可用 RoutedTransport 依主機名稱分流，模擬多個推論副本。
+"""
+import asyncio
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+import httpx
+
+
+class FakeOpenAI:
+    def __init__(self, content='{"total_score": 90}', delay=0.0, script=None):
+        self.content = content
+        self.delay = delay
+        self.script = list(script or [])
+        self.calls = 0
+        self.models = []
+        self.bodies = []
+        self.active = 0
+        self.peak_active = 0
+        self.completed = 0
+        self.app = Starlette(routes=[Route("/v1/chat/completions", self.chat_completions, methods=["POST"])])
+
+    def transport(self) -> httpx.ASGITransport:
+        return httpx.ASGITransport(app=self.app)
+
+    async def chat_completions(self, request: Request):
+        body = await request.json()
+        self.calls += 1
+        self.models.append(body.get("model"))
+        self.bodies.append(body)
+        status, delay, content = self.script.pop(0) if self.script else (200, self.delay, self.content)
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.active -= 1
+        if status != 200:
+            headers = {"Retry-After": content or "0"} if status == 429 else {}
+            return JSONResponse({"error": {"message": f"fake {status}"}}, status_code=status, headers=headers)
+        self.completed += 1
+        return JSONResponse({
+            "model": body.get("model"),
+            "choices": [{"message": {"role": "assistant", "content": content or self.content}}],
+        })
+
+
+class RoutedTransport(httpx.AsyncBaseTransport):
+    """依請求的主機名稱轉送到對應的假伺服器；未登記的主機模擬連線失敗"""
+
+    def __init__(self, servers):
+        self.transports = {host: server.transport() for host, server in servers.items()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self.transports.get(request.url.host)
+        if transport is None:
+            raise httpx.ConnectError(f"connection refused: {request.url.host}", request=request)
+        return await transport.handle_async_request(request)
@@ -1,37 +1,10 @@
 import os
-import re
 import json
+from app.services.frontmatter import parse_skill_metadata
 
 # 設定技能根目錄 (使用 os.path.join 確保平台相容性)
 SKILLS_DIR = os.path.join(".agent", "skills")
 
-def parse_skill_metadata(file_path):
-    """提取並解析 SKILL.md 中的 YAML Frontmatter (支援 PyYAML 或簡單 Regex 回退)"""
-    if not os.path.exists(file_path):
-        return None
-        
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        match = re.search(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL | re.MULTILINE)
-        if match:
-            frontmatter_raw = match.group(1)
-            try:
-                import yaml
-                return yaml.safe_load(frontmatter_raw)
-            except ImportError:
-                # 簡單的 Key-Value 解析回退 (針對 Prototype)
-                metadata = {}
-                for line in frontmatter_raw.split('\n'):
-                    if ':' in line:
-                        k, v = line.split(':', 1)
-                        metadata[k.strip()] = v.strip().strip('"').strip("'")
-                return metadata
-    except Exception as e:
-        print(f"Error parsing {file_path}: {e}")
-    return None
-
 class SkillRegistryPrototype:
     def __init__(self, base_dir):
         self.base_dir = base_dir
@@ -73,7 +46,7 @@ class SkillRegistryPrototype:
 
 # --- 測試執行 ---
 if __name__ == "__main__":
-    # 注意：在專案根目錄執行此腳本
+    # 注意：在專案根目錄以 python -m tests.prototypes.skill_discovery_test 執行
     registry = SkillRegistryPrototype(SKILLS_DIR)
     registry.scan()
     
@@ -0,0 +1,60 @@
+import hashlib
+import os
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.storage import upload_storage
+
+def make_artifact(data):
+    workspace_id = upload_storage.create_workspace()
+    with open(upload_storage.workspace_path(workspace_id, "artifact.pptx"), "wb") as f:
+        f.write(data)
+    upload_storage.release(workspace_id)
+    return f"{workspace_id}/artifact.pptx"
+
+def test_etag_and_conditional_get():
+    print("Testing artifact ETag / 304...")
+    data = os.urandom(300_000)
+    url = f"/api/download/{make_artifact(data)}"
+    with TestClient(app) as client:
+        response = client.get(url)
+        assert response.status_code == 200 and response.content == data
+        etag = response.headers["etag"]
+        assert etag == f'"{hashlib.sha256(data).hexdigest()}"'
+        assert response.headers["accept-ranges"] == "bytes"
+
+        cached = client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304 and cached.content == b""
+        assert cached.headers["etag"] == etag
+
+        since = client.get(url, headers={"If-Modified-Since": response.headers["last-modified"]})
+        assert since.status_code == 304
+
+        head = client.head(url)
+        assert head.status_code == 200 and head.headers["content-length"] == str(len(data))
+    print("✓ ETag / 304 passed.\n")
+
+def test_range_resume():
+    print("Testing artifact Range requests...")
+    data = os.urandom(300_000)
+    url = f"/api/download/{make_artifact(data)}"
+    with TestClient(app) as client:
+        etag = client.head(url).headers["etag"]
+        partial = client.get(url, headers={"Range": "bytes=1000-"})
+        assert partial.status_code == 206
+        assert partial.headers["content-range"] == f"bytes 1000-{len(data) - 1}/{len(data)}"
+        assert partial.content == data[1000:]
+
+        resumed = client.get(url, headers={"Range": "bytes=0-99", "If-Range": etag})
+        assert resumed.status_code == 206 and resumed.content == data[:100]
+
+        stale = client.get(url, headers={"Range": "bytes=0-99", "If-Range": '"outdated"'})
+        assert stale.status_code == 200 and stale.content == data
+
+        unsatisfiable = client.get(url, headers={"Range": f"bytes={len(data) + 10}-"})
+        assert unsatisfiable.status_code == 416
+    print("✓ Range requests passed.\n")
+
+if __name__ == "__main__":
+    test_etag_and_conditional_get()
+    test_range_resume()
+    print("All artifact download tests passed!")
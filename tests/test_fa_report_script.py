@@ -0,0 +1,226 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pptx import Presentation
+
+SCRIPT = os.path.join(".agent", "skills", "fa-report-improvement", "scripts", "improve_fa_report.py")
+EVALUATION = {"total_score": 60, "grade": "D",
+              "dimensions": {"基本資訊完整性": 50, "根因分析": 60, "改善對策": 70}}
+
+def make_deck(path, slides=6, summary_at=-1):
+    prs = Presentation()
+    for i in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = "Summary" if i == summary_at % max(slides, 1) else f"Slide {i}"
+        slide.placeholders[1].text = "失效現象描述 " * 10
+    prs.save(path)
+
+def load_script():
+    sys.path.insert(0, os.path.dirname(SCRIPT))
+    import improve_fa_report
+    return improve_fa_report
+
+def run_script(*args):
+    return subprocess.run([sys.executable, SCRIPT, *args], capture_output=True, text=True, encoding="utf-8")
+
+def test_batch_manifest():
+    print("Testing batch mode with a CSV / JSONL manifest...")
+    with tempfile.TemporaryDirectory() as root:
+        rows = []
+        for i in range(3):
+            make_deck(os.path.join(root, f"r{i}.pptx"))
+            with open(os.path.join(root, f"r{i}.json"), "w", encoding="utf-8") as f:
+                json.dump(EVALUATION, f, ensure_ascii=False)
+            rows.append({"input": f"r{i}.pptx", "evaluation": f"r{i}.json", "output": f"out/r{i}.pptx"})
+        with open(os.path.join(root, "r1.json"), "w", encoding="utf-8") as f:
+            f.write("not json")
+        rows.append({"input": "missing.pptx", "evaluation": "r0.json", "output": "out/missing.pptx"})
+        rows.append({"input": "r2.pptx", "evaluation": "r2.json", "output": "r0.pptx"})
+
+        manifest = os.path.join(root, "manifest.csv")
+        with open(manifest, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["input", "evaluation", "output"])
+            writer.writeheader()
+            writer.writerows(rows)
+        result = run_script("--batch", manifest, "--workers", "2")
+        assert result.returncode == 1, result.stdout + result.stderr
+
+        with open(os.path.join(root, "batch_summary.json"), encoding="utf-8") as f:
+            summary = json.load(f)
+        assert (summary["total"], summary["succeeded"], summary["failed"]) == (5, 2, 3), summary
+        assert "覆寫輸入檔" in summary["items"][-1]["error"]
+        by_name = {os.path.basename(item["input"]): item for item in summary["items"][:-1]}
+        assert by_name["r0.pptx"]["ok"] and by_name["r0.pptx"]["seconds"] > 0
+        assert 0 < by_name["r0.pptx"]["cpu_seconds"] and summary["cpu_seconds"] == round(
+            sum(item["cpu_seconds"] or 0 for item in summary["items"]), 3)
+        assert "JSON" in by_name["r1.pptx"]["error"] and by_name["r1.pptx"]["log"]
+        assert "找不到檔案" in by_name["missing.pptx"]["error"]
+        assert os.path.exists(os.path.join(root, "out", "r2.pptx"))
+        assert len(Presentation(os.path.join(root, "out", "r0.pptx")).slides) == 9
+
+        jsonl = os.path.join(root, "manifest.jsonl")
+        with open(jsonl, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"report": "r2.pptx", "eval": "r2.json", "output": "jsonl/r2.pptx"}) + "\n")
+        summary_path = os.path.join(root, "summary.json")
+        result = run_script("--batch", jsonl, "--summary", summary_path)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert "✓ [1/1] r2.pptx" in result.stdout
+        with open(summary_path, encoding="utf-8") as f:
+            assert json.load(f)["succeeded"] == 1
+
+        # 兩列寫到同一輸出 (路徑寫法不同)：整批拒絕，不執行任何項目
+        with open(jsonl, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"input": "r0.pptx", "evaluation": "r0.json", "output": "dup/out.pptx"}) + "\n")
+            f.write(json.dumps({"input": "r2.pptx", "evaluation": "r2.json", "output": "dup/../dup/out.pptx"}) + "\n")
+        result = run_script("--batch", jsonl, "--summary", summary_path)
+        assert result.returncode == 2 and "輸出路徑重複" in result.stderr, result.stdout + result.stderr
+        assert not os.path.exists(os.path.join(root, "dup"))
+
+        # 目錄模式：同名的 .ppt 與 .pptx 會輸出到同一個檔案
+        script = load_script()
+        decks = os.path.join(root, "decks")
+        os.makedirs(decks)
+        for name in ("same.ppt", "same.pptx"):
+            open(os.path.join(decks, name), "wb").close()
+        try:
+            script.discover_batch_items(decks, root, os.path.join(root, "dir_out"))
+        except ValueError as e:
+            assert "輸出路徑重複" in str(e)
+        else:
+            raise AssertionError("duplicate directory outputs were accepted")
+    print("✓ Batch manifest passed.\n")
+
+def test_batch_directory_pair():
+    print("Testing batch mode over a directory pair...")
+    with tempfile.TemporaryDirectory() as root:
+        reports, evaluations, output = (os.path.join(root, d) for d in ("reports", "evals", "improved"))
+        os.makedirs(reports)
+        os.makedirs(evaluations)
+        for name in ("a", "b"):
+            make_deck(os.path.join(reports, f"{name}.pptx"))
+            with open(os.path.join(evaluations, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump(EVALUATION, f, ensure_ascii=False)
+        result = run_script("--batch-dir", reports, evaluations, output)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert sorted(os.listdir(output)) == ["a.pptx", "b.pptx", "batch_summary.json"]
+
+        # 輸出目錄與簡報目錄相同時拒絕執行，原始簡報不被覆寫
+        before = {name: os.path.getmtime(os.path.join(reports, name)) for name in os.listdir(reports)}
+        result = run_script("--batch-dir", reports, evaluations, reports + os.sep)
+        assert result.returncode == 2 and "輸出目錄" in result.stderr, result.stdout + result.stderr
+        assert {name: os.path.getmtime(os.path.join(reports, name)) for name in os.listdir(reports)} == before
+    print("✓ Batch directory pair passed.\n")
+
+def test_evaluation_array():
+    print("Testing evaluation arrays matched by file_name...")
+    with tempfile.TemporaryDirectory() as root:
+        decks, output = os.path.join(root, "decks"), os.path.join(root, "improved")
+        os.makedirs(decks)
+        make_deck(os.path.join(decks, "20250213_ACME_Panel.pptx"), slides=6)
+        make_deck(os.path.join(decks, "20250301_Beta_Board.pptx"), slides=4)
+        entries = [
+            dict(EVALUATION, file_name="20250301_Beta_Board.ppt", dimensions={"基本資訊完整性": 90}),
+            dict(EVALUATION, file_name="20250213_ACME_Panel.pptx"),
+            dict(EVALUATION, file_name="missing_report.pptx"),
+        ]
+        eval_json = os.path.join(root, "evaluations.json")
+        with open(eval_json, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+
+        result = run_script("--evaluations", eval_json, decks, output)
+        assert result.returncode == 1, result.stdout + result.stderr
+        with open(os.path.join(output, "batch_summary.json"), encoding="utf-8") as f:
+            items = json.load(f)["items"]
+        assert [item["ok"] for item in items] == [True, True, False], items
+        assert "missing_report.pptx" in items[2]["error"]
+        # 各自依對應的評估改善：Beta 分數達標不加頁，ACME 加入三頁
+        assert len(Presentation(os.path.join(output, "20250301_Beta_Board_improved.pptx")).slides) == 4
+        assert len(Presentation(os.path.join(output, "20250213_ACME_Panel_improved.pptx")).slides) == 9
+
+        # 輸出到簡報目錄本身：單筆評估也加上 _improved，多筆各自編號，既有的輸入簡報不被覆寫
+        make_deck(os.path.join(decks, "20250301_Beta_Board_improved.pptx"), slides=2)
+        entries = [dict(EVALUATION, file_name="20250213_ACME_Panel.pptx"),
+                   dict(EVALUATION, file_name="20250213_ACME_Panel.pptx", dimensions={"基本資訊完整性": 90}),
+                   dict(EVALUATION, file_name="20250301_Beta_Board.pptx")]
+        with open(eval_json, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        result = run_script("--evaluations", eval_json, decks, decks, "--summary", os.path.join(root, "s.json"))
+        assert result.returncode == 1, result.stdout + result.stderr
+        with open(os.path.join(root, "s.json"), encoding="utf-8") as f:
+            items = json.load(f)["items"]
+        assert [item["ok"] for item in items] == [True, True, False], items
+        assert "輸出路徑" in items[2]["error"]
+        assert len(Presentation(os.path.join(decks, "20250213_ACME_Panel.pptx")).slides) == 6
+        assert len(Presentation(os.path.join(decks, "20250213_ACME_Panel_improved_1.pptx")).slides) == 9
+        assert len(Presentation(os.path.join(decks, "20250213_ACME_Panel_improved_2.pptx")).slides) == 6
+        assert len(Presentation(os.path.join(decks, "20250301_Beta_Board_improved.pptx")).slides) == 2
+
+        # 單一檔案模式：陣列中依 file_name 選出對應的評估
+        single = os.path.join(root, "single.pptx")
+        result = run_script(os.path.join(decks, "20250213_ACME_Panel.pptx"), eval_json, single)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert len(Presentation(single).slides) == 9 and "使用第一筆" not in result.stdout
+    print("✓ Evaluation array passed.\n")
+
+def test_slide_order_and_summary():
+    print("Testing batched slide reordering and summary detection...")
+    script = load_script()
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "deck.pptx")
+        make_deck(path, slides=12)
+        prs = Presentation(path)
+        script.improve_presentation(prs, EVALUATION)
+        titles = [slide.shapes.title.text for slide in prs.slides]
+        # 與逐次 remove/insert 相同的最終順序：基本資訊在第 3 頁、統計在第 9 頁、預防措施在倒數第 3 頁
+        expected = [f"Slide {i}" for i in range(11)] + ["Summary"]
+        expected.insert(2, "FA 基本資訊")
+        expected.insert(8, "根因統計驗證分析")
+        expected.insert(-2, "長期預防措施與監測計畫")
+        assert titles == expected, titles
+        # 只在原始投影片中找 Summary，新增的「根因統計驗證分析」不會被清空覆寫
+        stat_slide = prs.slides[8]
+        assert "統計測試方法" in stat_slide.placeholders[1].text_frame.text
+        summary_texts = [shape.text_frame.text for shape in prs.slides[-1].shapes if shape.has_text_frame]
+        assert any("根因確認依據" in text for text in summary_texts), summary_texts
+
+        # Summary 在統計頁之前或之後都改寫真正的 Summary 頁，統計頁保留內容
+        path_early = os.path.join(root, "early.pptx")
+        make_deck(path_early, slides=12, summary_at=4)
+        prs = Presentation(path_early)
+        script.improve_presentation(prs, EVALUATION)
+        titles = [slide.shapes.title.text for slide in prs.slides]
+        assert titles.index("Summary") == 5 and titles.index("根因統計驗證分析") == 8, titles
+        assert "統計測試方法" in prs.slides[8].placeholders[1].text_frame.text
+        summary_texts = [shape.text_frame.text for shape in prs.slides[5].shapes if shape.has_text_frame]
+        assert any("根因確認依據" in text for text in summary_texts), summary_texts
+
+        # 未新增任何投影片時不動原本順序
+        prs = Presentation(path)
+        index = script.SlideIndex(prs)
+        index.apply_order()
+        assert [slide.shapes.title.text for slide in prs.slides][-1] == "Summary"
+        assert index.find("Summary").position == 11
+
+        # 極小的簡報：位置超出範圍時同 list.insert (8 夾到結尾、-2 自結尾倒數)；
+        # 沒有原始 Summary 頁時不改寫任何投影片，新增的統計頁保留內容
+        added = ["FA 基本資訊", "根因統計驗證分析", "長期預防措施與監測計畫"]
+        for slides, expected in ((0, [added[2], added[0], added[1]]),
+                                 (1, ["Summary", added[2], added[0], added[1]])):
+            path = os.path.join(root, f"tiny{slides}.pptx")
+            make_deck(path, slides=slides)
+            prs = Presentation(path)
+            script.improve_presentation(prs, EVALUATION)
+            assert [slide.shapes.title.text for slide in prs.slides] == expected, slides
+            stat_slide = prs.slides[expected.index(added[1])]
+            assert "統計測試方法" in stat_slide.placeholders[1].text_frame.text
+    print("✓ Slide order and summary passed.\n")
+
+if __name__ == "__main__":
+    test_batch_manifest()
+    test_batch_directory_pair()
+    test_evaluation_array()
+    test_slide_order_and_summary()
+    print("All FA report script tests passed!")
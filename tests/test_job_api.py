@@ -0,0 +1,196 @@
+import atexit
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+# 上傳檔與快取寫入暫存目錄，不碰專案內的 uploads/ 與 cache/ (須在 import app 之前設定)
+TEST_ROOT = tempfile.mkdtemp(prefix="job_api_")
+atexit.register(shutil.rmtree, TEST_ROOT, True)
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_ROOT, "uploads")
+os.environ["RESULT_CACHE_DIR"] = os.path.join(TEST_ROOT, "results")
+os.environ["LLM_CACHE_PATH"] = os.path.join(TEST_ROOT, "llm_refinements.sqlite3")
+os.environ["SKILL_MANIFEST_PATH"] = os.path.join(TEST_ROOT, "skills_manifest.json")
+
+from fastapi.testclient import TestClient
+from pptx import Presentation
+from app.main import app
+from app.services.llm_client import llm_client
+
+def build_deck(slide_count=6, tag=None):
+    # 每次產生內容不同的簡報，避免命中結果快取
+    tag = tag or uuid.uuid4().hex
+    prs = Presentation()
+    for i in range(slide_count):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = "Summary" if i == 3 else f"Slide {i} {tag}"
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+EVALUATION = {
+    "file_name": "20250213_ACME_Touch.pptx",
+    "total_score": 55,
+    "dimensions": {"基本資訊完整性": 50, "根因分析": 60, "改善對策": 70}
+}
+
+def wait_for(client, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        data = client.get(f"/api/jobs/{job_id}").json()
+        if data["status"] in ("completed", "failed"):
+            return data
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} did not finish in {timeout}s")
+
+def test_job_lifecycle():
+    print("Testing /api/jobs submit -> poll -> result...")
+    with TestClient(app) as client:
+        files = {
+            "report": ("job_test.pptx", build_deck()),
+            "evaluation_json": ("job_test.json", json.dumps(EVALUATION, ensure_ascii=False).encode("utf-8"))
+        }
+        response = client.post("/api/jobs", files=files)
+        assert response.status_code == 202, response.text
+        job_id = response.json()["job_id"]
+
+        status = wait_for(client, job_id)
+        assert status["status"] == "completed", status
+        result = client.get(f"/api/jobs/{job_id}/result")
+        assert result.status_code == 200
+        assert result.content[:2] == b"PK", "result is not a pptx archive"
+    print("✓ Job lifecycle passed.\n")
+
+def test_job_failure_and_unknown_id():
+    print("Testing /api/jobs failure reporting...")
+    with TestClient(app) as client:
+        files = {
+            "report": ("broken.pptx", b"not a pptx"),
+            "evaluation_json": ("broken.json", b"{}")
+        }
+        job_id = client.post("/api/jobs", files=files).json()["job_id"]
+        status = wait_for(client, job_id)
+        assert status["status"] == "failed"
+        assert status["error"]["status"] == "error"
+        assert client.get(f"/api/jobs/{job_id}/result").status_code == 400
+        assert client.get("/api/jobs/does-not-exist").status_code == 404
+    print("✓ Job failure reporting passed.\n")
+
+def parse_sse(text):
+    events = []
+    for block in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_job_progress_stream():
+    print("Testing /api/jobs/{id}/events progress stream...")
+    with TestClient(app) as client:
+        files = {
+            "report": ("sse_test.pptx", build_deck()),
+            "evaluation_json": ("sse_test.json", json.dumps(EVALUATION, ensure_ascii=False).encode("utf-8"))
+        }
+        job_id = client.post("/api/jobs", files=files).json()["job_id"]
+        with client.stream("GET", f"/api/jobs/{job_id}/events") as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = parse_sse(response.read().decode("utf-8"))
+
+        kinds = [kind for _, kind, _ in events]
+        assert kinds[-1] == "end" and events[-1][2]["status"] == "completed", kinds
+        steps = [data["message"] for _, kind, data in events if kind == "step"]
+        assert any("基本資訊" in step for step in steps), steps
+
+        # Last-Event-ID 續傳時只回傳之後的事件
+        last_id = events[-2][0]
+        with client.stream("GET", f"/api/jobs/{job_id}/events", headers={"Last-Event-ID": last_id}) as response:
+            resumed = parse_sse(response.read().decode("utf-8"))
+        assert [kind for _, kind, _ in resumed] == ["end"], resumed
+    print("✓ Progress stream passed.\n")
+
+def test_resubmission_hits_result_cache():
+    print("Testing result cache on resubmission...")
+    with TestClient(app) as client:
+        deck = build_deck()
+        evaluation = json.dumps(EVALUATION, ensure_ascii=False).encode("utf-8")
+        job_ids = []
+        for _ in range(2):
+            files = {"report": ("cached.pptx", deck), "evaluation_json": ("cached.json", evaluation)}
+            job_ids.append(client.post("/api/jobs", files=files).json()["job_id"])
+            assert wait_for(client, job_ids[-1])["status"] == "completed"
+
+        with client.stream("GET", f"/api/jobs/{job_ids[1]}/events") as response:
+            stages = [data.get("stage") for _, _, data in parse_sse(response.read().decode("utf-8"))]
+        assert "cached" in stages and "processing" not in stages, stages
+        first = client.get(f"/api/jobs/{job_ids[0]}/result").content
+        second = client.get(f"/api/jobs/{job_ids[1]}/result").content
+        assert first == second
+    print("✓ Result cache passed.\n")
+
+def test_failed_refinement_is_not_cached():
+    print("Testing that a failed AI refinement is not cached...")
+    calls = []
+
+    async def failing_refine(data, prompt):
+        calls.append(prompt)
+        return False, "LLM unavailable", None
+
+    original = llm_client.refine_with_model
+    llm_client.refine_with_model = failing_refine
+    try:
+        with TestClient(app) as client:
+            deck = build_deck()
+            evaluation = json.dumps(EVALUATION, ensure_ascii=False).encode("utf-8")
+            job_ids = []
+            for _ in range(2):
+                files = {"report": ("refine.pptx", deck), "evaluation_json": ("refine.json", evaluation)}
+                response = client.post("/api/jobs", files=files, data={"prompt": "請加強根因分析"})
+                job_ids.append(response.json()["job_id"])
+                assert wait_for(client, job_ids[-1])["status"] == "completed"
+            with client.stream("GET", f"/api/jobs/{job_ids[1]}/events") as response:
+                stages = [data.get("stage") for _, _, data in parse_sse(response.read().decode("utf-8"))]
+    finally:
+        llm_client.refine_with_model = original
+    # 第二次仍重新呼叫 LLM，而不是拿到未加工的快取成品
+    assert len(calls) == 2 and "cached" not in stages, (calls, stages)
+    print("✓ Failed refinement not cached passed.\n")
+
+def test_prompt_refines_matching_array_entry():
+    print("Testing AI refinement of the matching entry in an evaluation array...")
+    received = []
+
+    async def fake_refine(data, prompt):
+        received.append(data)
+        # 只把基本資訊分數調低：技能因此多加一頁
+        return True, dict(data, dimensions={"基本資訊完整性": 50}), "fake-model"
+
+    entries = [
+        dict(EVALUATION, file_name="array_other.pptx"),
+        dict(EVALUATION, file_name="array_target.ppt", dimensions={"基本資訊完整性": 90, "根因分析": 90, "改善對策": 90}),
+    ]
+    original = llm_client.refine_with_model
+    llm_client.refine_with_model = fake_refine
+    try:
+        with TestClient(app) as client:
+            files = {"report": ("array_target.pptx", build_deck()),
+                     "evaluation_json": ("array.json", json.dumps(entries, ensure_ascii=False).encode("utf-8"))}
+            job_id = client.post("/api/jobs", files=files, data={"prompt": "基本資訊不足"}).json()["job_id"]
+            assert wait_for(client, job_id)["status"] == "completed"
+            result = client.get(f"/api/jobs/{job_id}/result").content
+    finally:
+        llm_client.refine_with_model = original
+    assert [entry["file_name"] for entry in received] == ["array_target.ppt"], received
+    assert len(Presentation(io.BytesIO(result)).slides) == 7
+    print("✓ Matching array entry refined passed.\n")
+
+if __name__ == "__main__":
+    test_job_lifecycle()
+    test_job_failure_and_unknown_id()
+    test_job_progress_stream()
+    test_resubmission_hits_result_cache()
+    test_failed_refinement_is_not_cached()
+    test_prompt_refines_matching_array_entry()
+    print("All job API tests passed!")
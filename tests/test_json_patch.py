@@ -0,0 +1,85 @@
+import asyncio
+import json
+from app.services.json_patch import JSONPatchError, apply_merge_patch, apply_patch
+from app.services.llm_cache import RefinementCache
+from app.services.llm_client import LLMClient
+from tests.fake_openai import FakeOpenAI
+
+ORIGINAL = {
+    "total_score": 70,
+    "dimensions": {"D4": {"score": 10, "suggestions": ["補充根因"]}, "D5/D6": {"score": 12}},
+    "notes": ["a", "b"],
+}
+
+def test_rfc6902_operations():
+    print("Testing RFC 6902 JSON Patch operations...")
+    patch = [
+        {"op": "test", "path": "/total_score", "value": 70},
+        {"op": "replace", "path": "/total_score", "value": 85},
+        {"op": "add", "path": "/dimensions/D4/suggestions/-", "value": "加入 FTA"},
+        {"op": "replace", "path": "/dimensions/D5~1D6/score", "value": 15},
+        {"op": "remove", "path": "/notes/0"},
+        {"op": "copy", "from": "/dimensions/D4/score", "path": "/d4_score"},
+        {"op": "move", "from": "/d4_score", "path": "/dimensions/D4/previous_score"},
+    ]
+    result = apply_patch(ORIGINAL, patch)
+    assert result["total_score"] == 85
+    assert result["dimensions"]["D4"]["suggestions"] == ["補充根因", "加入 FTA"]
+    assert result["dimensions"]["D5/D6"]["score"] == 15
+    assert result["notes"] == ["b"] and "d4_score" not in result
+    assert result["dimensions"]["D4"]["previous_score"] == 10
+    assert list(result) == list(ORIGINAL), "replace should keep key order"
+    assert ORIGINAL["total_score"] == 70, "original document was mutated"
+
+    for bad in (
+        [{"op": "replace", "path": "/missing", "value": 1}],
+        [{"op": "test", "path": "/total_score", "value": 1}],
+        [{"op": "add", "path": "/notes/9", "value": 1}],
+        [{"op": "jump", "path": "/total_score"}],
+        {"op": "replace", "path": "/total_score", "value": 1},
+    ):
+        try:
+            apply_patch(ORIGINAL, bad)
+            raise AssertionError(f"patch should fail: {bad}")
+        except JSONPatchError:
+            pass
+    print("✓ RFC 6902 passed.\n")
+
+def test_merge_patch():
+    print("Testing RFC 7386 merge patch...")
+    result = apply_merge_patch(ORIGINAL, {"total_score": 90, "dimensions": {"D4": {"score": 14}}, "notes": None})
+    assert result["total_score"] == 90 and "notes" not in result
+    assert result["dimensions"]["D4"] == {"score": 14, "suggestions": ["補充根因"]}
+    assert ORIGINAL["dimensions"]["D4"]["score"] == 10
+    print("✓ Merge patch passed.\n")
+
+def make_llm(fake):
+    llm = LLMClient(api_key="test", base_url="http://fake/v1", transport=fake.transport(),
+                    cache=RefinementCache(":memory:", ttl_seconds=3600, max_entries=100, enabled=False))
+    llm.refine_mode = "patch"
+    return llm
+
+def test_patch_mode_applies_and_falls_back():
+    print("Testing LLM JSON Patch refinement mode...")
+    patch = '```json\n[{"op": "replace", "path": "/total_score", "value": 88}]\n```'
+    fake = FakeOpenAI(content=patch)
+    llm = make_llm(fake)
+    ok, result = asyncio.run(llm.refine_evaluation_json(ORIGINAL, "提高分數"))
+    assert ok and result == dict(ORIGINAL, total_score=88), result
+    stats = llm.stats()["patch_mode"]
+    assert stats["applied"] == 1 and stats["saved_tokens"] > 0, stats
+
+    # 無效的 patch (路徑不存在) 應退回完整 JSON 模式
+    full = json.dumps(dict(ORIGINAL, total_score=60), ensure_ascii=False)
+    fake = FakeOpenAI(script=[(200, 0, '[{"op": "replace", "path": "/nope", "value": 1}]'), (200, 0, full)])
+    llm = make_llm(fake)
+    ok, result = asyncio.run(llm.refine_evaluation_json(ORIGINAL, "降低分數"))
+    assert ok and result["total_score"] == 60 and fake.calls == 2
+    assert llm.stats()["patch_mode"]["fallbacks"] == 1
+    print("✓ Patch mode passed.\n")
+
+if __name__ == "__main__":
+    test_rfc6902_operations()
+    test_merge_patch()
+    test_patch_mode_applies_and_falls_back()
+    print("All JSON Patch tests passed!")
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import time
+import httpx
+from app.services.llm_client import LLMClient
+from app.services.llm_cache import RefinementCache, refinement_key
+from app.services.adaptive_limiter import AdaptiveLimiter
+from tests.fake_openai import FakeOpenAI, RoutedTransport
+
+def completion(content):
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+def make_client(handler, **kwargs):
+    kwargs.setdefault("cache", RefinementCache(":memory:", ttl_seconds=3600, max_entries=100, enabled=False))
+    return LLMClient(api_key="test", base_url="http://llm.test/v1", transport=httpx.MockTransport(handler), **kwargs)
+
+def test_pooled_client_is_reused():
+    print("Testing LLMClient connection pool reuse...")
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json=completion('{"total_score": 90}'))
+
+    llm = make_client(handler)
+
+    async def scenario():
+        await llm.startup()
+        pool = llm._client
+        results = await asyncio.gather(*[llm.chat_completion([{"role": "user", "content": "hi"}]) for _ in range(5)])
+        assert llm._client is pool, "a new client was created per call"
+        await llm.aclose()
+        assert pool.is_closed
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 5 and all(r == '{"total_score": 90}' for r in results)
+    print("✓ Pool reuse passed.\n")
+
+def test_refinement_cache_hits_on_equivalent_input():
+    print("Testing persistent refinement cache...")
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, json=completion('{"total_score": 88, "dimensions": {}}'))
+
+    llm = make_client(handler, cache=RefinementCache(":memory:", ttl_seconds=3600, max_entries=100))
+
+    async def scenario():
+        first = await llm.refine_evaluation_json({"total_score": 50, "dimensions": {"a": 1}}, "加強 根因分析")
+        # 鍵順序與提示詞空白不同，但語意相同
+        second = await llm.refine_evaluation_json({"dimensions": {"a": 1}, "total_score": 50}, "  加強   根因分析\n")
+        third = await llm.refine_evaluation_json({"total_score": 50, "dimensions": {"a": 1}}, "另一個指示")
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first == second == (True, {"total_score": 88, "dimensions": {}})
+    assert third[0] and len(calls) == 2, f"expected 2 LLM calls, got {len(calls)}"
+    stats = llm.stats()["refinement_cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 2, stats
+    print("✓ Refinement cache passed.\n")
+
+def test_refinement_cache_ttl_and_lru():
+    print("Testing refinement cache TTL / LRU bounds...")
+    cache = RefinementCache(":memory:", ttl_seconds=0.2, max_entries=2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # a 成為最近使用
+    cache.put("c", {"v": 3})
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+    time.sleep(0.25)
+    assert cache.get("c") is None, "expired entry was returned"
+    print("✓ TTL / LRU passed.\n")
+
+def sse_chunks(pieces):
+    for piece in pieces:
+        yield f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n".encode("utf-8")
+    yield b"data: [DONE]\n\n"
+
+def test_streaming_stops_at_first_complete_object():
+    print("Testing streaming refinement with early termination...")
+    pieces = ['以下為結果 {note}：', '{"total_score": 9', '0, "items": [{"t": "a}"}]', '}', "\n說明文字" * 50, "{更多}"]
+    sent = []
+
+    async def body():
+        for chunk in sse_chunks(pieces):
+            sent.append(chunk)
+            yield chunk
+
+    llm = make_client(lambda request: httpx.Response(200, content=body()))
+    llm.stream = True
+
+    async def scenario():
+        result = await llm.refine_evaluation_json({"total_score": 80}, "請加強")
+        await llm.aclose()
+        return result
+
+    ok, data = asyncio.run(scenario())
+    assert ok and data == {"total_score": 90, "items": [{"t": "a}"}]}, data
+    assert len(sent) < len(pieces) + 1, "stream was read to the end"
+
+    # 未閉合就結束的串流：回退到既有擷取流程並回報失敗
+    llm = make_client(lambda request: httpx.Response(200, content=b"".join(sse_chunks(['{"total_score": ']))))
+    llm.stream = True
+    ok, _ = asyncio.run(llm.refine_evaluation_json({"total_score": 80}, "請加強"))
+    assert not ok
+    print("✓ Streaming early stop passed.\n")
+
+def test_concurrent_identical_refinements_are_coalesced():
+    print("Testing single-flight coalescing of identical refinements...")
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json=completion('{"total_score": 95, "dimensions": {}}'))
+
+    llm = make_client(handler)
+    original = {"total_score": 80, "dimensions": {}}
+
+    async def scenario():
+        results = await asyncio.gather(*[llm.refine_evaluation_json(original, "請加強 D4") for _ in range(5)])
+        other = await llm.refine_evaluation_json(original, "另一個提示")
+
+        # 第一個呼叫端取消後，其他等待者仍應取得共用結果
+        first = asyncio.create_task(llm.refine_evaluation_json(original, "取消測試"))
+        second = asyncio.create_task(llm.refine_evaluation_json(original, "取消測試"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        survived = await second
+        assert first.cancelled()
+        await llm.aclose()
+        return results, other, survived
+
+    results, other, survived = asyncio.run(scenario())
+    assert all(r == (True, {"total_score": 95, "dimensions": {}}) for r in results)
+    assert other[0] and survived == (True, {"total_score": 95, "dimensions": {}})
+    assert len(calls) == 3, f"expected 3 upstream calls, got {len(calls)}"
+    stats = llm.stats()["inflight"]
+    assert stats["coalesced"] == 5 and stats["in_flight"] == 0, stats
+    print("✓ Single-flight passed.\n")
+
+def make_fake_client(fake, **limiter):
+    llm = LLMClient(api_key="test", base_url="http://fake/v1", transport=fake.transport(),
+                    cache=RefinementCache(":memory:", ttl_seconds=3600, max_entries=100, enabled=False))
+    llm.limiter = AdaptiveLimiter(**{"initial": 2, "min_limit": 1, "max_limit": 2, "latency_target": 5, **limiter})
+    llm.retry_backoff = 0.01
+    return llm
+
+def test_limiter_caps_concurrency_and_retries_overload():
+    print("Testing adaptive limiter and retries against fake server...")
+    fake = FakeOpenAI(delay=0.05, script=[(503, 0, None), (429, 0, None)])
+    llm = make_fake_client(fake)
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def scenario():
+        results = await asyncio.gather(*[llm.chat_completion(messages) for _ in range(8)])
+        await llm.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(r == '{"total_score": 90}' for r in results)
+    assert fake.peak_active <= 2, f"limiter let {fake.peak_active} requests through"
+    stats = llm.stats()["limiter"]
+    assert stats["retries"] == 2 and stats["overloads"] == 2, stats
+    assert stats["decreases"] >= 1 and stats["in_flight"] == 0, stats
+
+    # 重試次數用盡後應回報原始 HTTP 錯誤
+    fake = FakeOpenAI(script=[(503, 0, None)] * 3)
+    llm = make_fake_client(fake)
+    try:
+        asyncio.run(llm.chat_completion(messages))
+        raise AssertionError("expected HTTPStatusError")
+    except httpx.HTTPStatusError as e:
+        assert e.response.status_code == 503 and fake.calls == 3
+    print("✓ Limiter / retries passed.\n")
+
+def test_aimd_adjusts_limit():
+    print("Testing AIMD limit adjustments...")
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=8, latency_target=1.0)
+
+    async def scenario():
+        tokens = [await limiter.acquire() for _ in range(4)]
+        assert limiter.try_acquire() is None
+        for token in tokens:
+            limiter.release(token, overloaded=True)  # 同一批失敗只遞減一次
+        assert int(limiter.limit) == 2 and limiter.decreases == 1
+        for _ in range(20):
+            limiter.release(await limiter.acquire())
+        assert limiter.limit > 4
+
+    asyncio.run(scenario())
+    print("✓ AIMD passed.\n")
+
+def test_hedged_request_trims_tail_latency():
+    print("Testing hedged requests...")
+    fake = FakeOpenAI(delay=0.01, script=[(200, 3.0, '{"total_score": 1}')])
+    llm = make_fake_client(fake)
+    llm.hedge = True
+    for _ in range(llm.latencies.min_samples):
+        llm.latencies.record(0.05)
+
+    async def scenario():
+        start = time.monotonic()
+        result = await llm.chat_completion([{"role": "user", "content": "hi"}])
+        elapsed = time.monotonic() - start
+        await llm.aclose()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(scenario())
+    assert result == '{"total_score": 90}' and elapsed < 1.0, (result, elapsed)
+    stats = llm.stats()["limiter"]
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1 and stats["in_flight"] == 0, stats
+    print("✓ Hedging passed.\n")
+
+def test_cancelled_refinement_releases_limiter():
+    print("Testing limiter slots after cancelled refinements...")
+    fake = FakeOpenAI(delay=0.05)
+    llm = make_fake_client(fake)
+    llm.refine_mode = "patch"  # 走 _complete / _hedged_send
+
+    async def scenario():
+        # 在不同的時間點取消全部工作 (如同關機時)，涵蓋請求任務尚未開始執行就被取消的情況
+        for steps in range(12):
+            asyncio.ensure_future(llm.refine_with_model({"total_score": steps}, "加強"))
+            for _ in range(steps):
+                await asyncio.sleep(0)
+            tasks = asyncio.all_tasks() - {asyncio.current_task()}
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            assert llm.limiter.in_flight == 0, (steps, llm.limiter.stats())
+        await llm.aclose()
+
+    asyncio.run(scenario())
+    print("✓ Cancelled refinement passed.\n")
+
+def make_routed_client(servers, endpoints):
+    llm = LLMClient(api_key="test", transport=RoutedTransport(servers), endpoints=endpoints,
+                    cache=RefinementCache(":memory:", ttl_seconds=3600, max_entries=100, enabled=False))
+    llm.max_retries = 0
+    return llm
+
+def test_failover_and_ejection():
+    print("Testing multi-endpoint failover...")
+    broken, healthy = FakeOpenAI(script=[(502, 0, None)] * 10), FakeOpenAI()
+    llm = make_routed_client({"broken": broken, "healthy": healthy},
+                             "http://down/v1,http://broken/v1|model-b,http://healthy/v1|model-c")
+    llm.router.eject_after = 2
+
+    async def scenario():
+        results = [await llm.chat_completion([{"role": "user", "content": "hi"}]) for _ in range(4)]
+        await llm.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(r == '{"total_score": 90}' for r in results)
+    assert healthy.calls == 4 and healthy.models == ["model-c"] * 4
+    assert broken.calls == 2, "ejected endpoint kept receiving traffic"
+    stats = {e["base_url"]: e for e in llm.stats()["endpoints"]}
+    assert not stats["http://down/v1"]["healthy"] and not stats["http://broken/v1"]["healthy"]
+    assert stats["http://healthy/v1"]["successes"] == 4 and llm.stats()["failovers"] >= 2
+    print("✓ Failover passed.\n")
+
+def test_latency_aware_routing():
+    print("Testing EWMA latency-aware routing...")
+    slow, fast = FakeOpenAI(delay=0.15), FakeOpenAI(delay=0.01)
+    llm = make_routed_client({"slow": slow, "fast": fast}, "http://slow/v1,http://fast/v1")
+
+    async def scenario():
+        for _ in range(10):
+            await llm.chat_completion([{"role": "user", "content": "hi"}])
+        await llm.aclose()
+
+    asyncio.run(scenario())
+    assert slow.calls == 1 and fast.calls == 9, (slow.calls, fast.calls)
+    stats = {e["base_url"]: e for e in llm.stats()["endpoints"]}
+    assert stats["http://slow/v1"]["ewma_latency"] > stats["http://fast/v1"]["ewma_latency"]
+    print("✓ Latency-aware routing passed.\n")
+
+def test_overload_fails_over_and_caches_by_serving_model():
+    print("Testing 429 failover and serving-model cache keys...")
+    busy = FakeOpenAI(script=[(429, 0, "30")])
+    spare = FakeOpenAI(content='{"total_score": 95}')
+    llm = make_routed_client({"busy": busy, "spare": spare}, "http://busy/v1,http://spare/v1|model-spare")
+    llm.cache = RefinementCache(":memory:", ttl_seconds=3600, max_entries=100)
+
+    async def scenario():
+        first = await llm.refine_with_model({"total_score": 80}, "請加強")
+        # busy 依 Retry-After 暫停派送：之後的請求直接送往 spare
+        await llm.chat_completion([{"role": "user", "content": "hi"}])
+        second = await llm.refine_with_model({"total_score": 80}, "請加強")
+        await llm.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == (True, {"total_score": 95}, "model-spare"), (first, second)
+    assert busy.calls == 1 and spare.calls == 2, (busy.calls, spare.calls)
+    stats = {e["base_url"]: e for e in llm.stats()["endpoints"]}
+    assert not stats["http://busy/v1"]["healthy"] and stats["http://busy/v1"]["successes"] == 0
+    assert stats["http://busy/v1"]["ewma_latency"] is None, "429 latency counted as a sample"
+    # 快取鍵是實際回應的模型，不是主要端點的模型
+    assert llm.cache.get(refinement_key({"total_score": 80}, "請加強", "model-spare", llm.temperature))
+    assert llm.cache.get(refinement_key({"total_score": 80}, "請加強", llm.model, llm.temperature)) is None
+    print("✓ Overload failover passed.\n")
+
+if __name__ == "__main__":
+    test_pooled_client_is_reused()
+    test_refinement_cache_hits_on_equivalent_input()
+    test_refinement_cache_ttl_and_lru()
+    test_streaming_stops_at_first_complete_object()
+    test_concurrent_identical_refinements_are_coalesced()
+    test_limiter_caps_concurrency_and_retries_overload()
+    test_aimd_adjusts_limit()
+    test_hedged_request_trims_tail_latency()
+    test_cancelled_refinement_releases_limiter()
+    test_failover_and_ejection()
+    test_latency_aware_routing()
+    test_overload_fails_over_and_caches_by_serving_model()
+    print("All LLM client tests passed!")
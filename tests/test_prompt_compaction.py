@@ -0,0 +1,78 @@
+import asyncio
+import json
+from app.services.llm_cache import RefinementCache
+from app.services.llm_client import LLMClient
+from app.services.prompt_compaction import (
+    TRUNCATED_MARKER, PromptBudgetError, compact_dumps, compact_payload, estimate_tokens
+)
+from tests.fake_openai import FakeOpenAI
+
+EVALUATION = {
+    "file_name": "20250213_ACME_Touch_Panel.pptx",
+    "employee_name": "王小明",
+    "raw_report_text": "原始報告全文。" * 2000,
+    "total_score": 72,
+    "grade": "C",
+    "dimensions": {"基本資訊完整性": 50, "根因分析": 60, "改善對策": 70},
+    "suggestions": ["請補充失效率統計與樣本數說明。" * 40, "加入 FTA 分析"],
+}
+
+def test_strips_fields_and_merges_back():
+    print("Testing payload compaction and merge-back...")
+    compacted = compact_payload(EVALUATION, reserved_tokens=100, budget=8000)
+    assert set(compacted.document) == {"total_score", "grade", "dimensions", "suggestions"}
+    assert set(compacted.frozen) == {"file_name", "employee_name", "raw_report_text"}
+    assert compacted.tokens < compacted.original_tokens // 5, (compacted.tokens, compacted.original_tokens)
+
+    refined = dict(compacted.document, total_score=88)
+    merged = compacted.merge(refined)
+    assert merged["total_score"] == 88 and merged["file_name"] == EVALUATION["file_name"]
+    assert list(merged) == list(EVALUATION), "field order changed"
+    print("✓ Compaction / merge passed.\n")
+
+def test_budget_truncates_and_restores():
+    print("Testing token budget enforcement...")
+    compacted = compact_payload(EVALUATION, reserved_tokens=100, budget=500)
+    assert compacted.tokens <= 500, compacted.tokens
+    truncated = compacted.document["suggestions"][0]
+    assert truncated.endswith(TRUNCATED_MARKER)
+
+    # 模型未修改截斷的文字 -> 還原全文；修改過的文字 -> 採用模型輸出
+    untouched = compacted.merge(json.loads(compact_dumps(compacted.document)))
+    assert untouched["suggestions"][0] == EVALUATION["suggestions"][0]
+    edited = json.loads(compact_dumps(compacted.document))
+    edited["suggestions"][0] = "改寫後的建議"
+    assert compacted.merge(edited)["suggestions"][0] == "改寫後的建議"
+
+    try:
+        compact_payload(EVALUATION, reserved_tokens=100, budget=110)
+        raise AssertionError("expected PromptBudgetError")
+    except PromptBudgetError:
+        pass
+    print("✓ Token budget passed.\n")
+
+def test_refinement_sends_compact_payload():
+    print("Testing refinement request payload...")
+    fake = FakeOpenAI(content='{"total_score": 85, "grade": "B", "dimensions": {"根因分析": 80}}')
+    llm = LLMClient(api_key="test", base_url="http://fake/v1", transport=fake.transport(),
+                    cache=RefinementCache(":memory:", ttl_seconds=3600, max_entries=100, enabled=False))
+    llm.prompt_token_budget = 1500
+
+    ok, result = asyncio.run(llm.refine_evaluation_json(EVALUATION, "提高根因分析分數"))
+    assert ok and result["total_score"] == 85 and result["file_name"] == EVALUATION["file_name"]
+    assert result["suggestions"] == EVALUATION["suggestions"]
+    messages = fake.bodies[0]["messages"]
+    assert "王小明" not in messages[1]["content"] and '", "' not in messages[1]["content"]
+    total = sum(estimate_tokens(m["content"]) for m in messages)
+    assert total <= 1500, total
+
+    llm.prompt_token_budget = 50
+    ok, message = asyncio.run(llm.refine_evaluation_json(EVALUATION, "提高根因分析分數"))
+    assert not ok and "token" in message and fake.calls == 1
+    print("✓ Refinement payload passed.\n")
+
+if __name__ == "__main__":
+    test_strips_fields_and_merges_back()
+    test_budget_truncates_and_restores()
+    test_refinement_sends_compact_payload()
+    print("All prompt compaction tests passed!")
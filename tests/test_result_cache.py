@@ -0,0 +1,46 @@
+import os
+import tempfile
+import time
+from app.services.result_cache import ResultCache
+
+def write(path, size):
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+
+def test_lru_eviction_and_reload():
+    print("Testing ResultCache LRU eviction...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(os.path.join(tmp, "cache"), max_bytes=2500)
+        for name in ("a", "b", "c"):
+            src = os.path.join(tmp, f"{name}.pptx")
+            write(src, 1000)
+            cache.put(name, src, "skill", "1.0.0")
+            time.sleep(0.01)
+            if name == "b":
+                assert cache.get("a", os.path.join(tmp, "a_hit.pptx"))  # a 變成最近使用
+        assert set(cache.entries) == {"a", "c"}, cache.entries.keys()
+        assert cache.stats()["evictions"] == 1
+
+        reloaded = ResultCache(os.path.join(tmp, "cache"), max_bytes=2500)
+        assert set(reloaded.entries) == {"a", "c"}
+    print("✓ LRU eviction passed.\n")
+
+def test_version_invalidation():
+    print("Testing ResultCache invalidation on skill version change...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(os.path.join(tmp, "cache"), max_bytes=10_000)
+        src = os.path.join(tmp, "out.pptx")
+        write(src, 100)
+        key_v1 = ResultCache.make_key("r", "e", "", "skill", "1.0.0", "model")
+        key_v2 = ResultCache.make_key("r", "e", "", "skill", "1.1.0", "model")
+        assert key_v1 != key_v2
+        cache.put(key_v1, src, "skill", "1.0.0")
+        cache.invalidate_skill("skill", "1.1.0")
+        assert not cache.get(key_v1, os.path.join(tmp, "dest.pptx"))
+        assert not os.path.exists(os.path.join(tmp, "cache", f"{key_v1}.pptx"))
+    print("✓ Version invalidation passed.\n")
+
+if __name__ == "__main__":
+    test_lru_eviction_and_reload()
+    test_version_invalidation()
+    print("All result cache tests passed!")
@@ -0,0 +1,63 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.skill_manager import CORE_SKILL_ID
+
+def test_manifest_etags():
+    print("Testing skill manifest ETag / 304...")
+    with TestClient(app) as client:
+        listing = client.get("/api/skills")
+        assert listing.status_code == 200 and listing.headers["cache-control"] == "private, no-cache"
+        assert any(s["id"] == CORE_SKILL_ID for s in listing.json())
+        etag = listing.headers["etag"]
+        cached = client.get("/api/skills", headers={"If-None-Match": etag})
+        assert cached.status_code == 304 and cached.content == b""
+        stale = client.get("/api/skills", headers={"If-None-Match": '"outdated"'})
+        assert stale.status_code == 200 and stale.headers["etag"] == etag
+
+        manifest = client.get(f"/api/skills/{CORE_SKILL_ID}")
+        assert manifest.status_code == 200 and "inputs" in manifest.json()
+        assert client.get(f"/api/skills/{CORE_SKILL_ID}",
+                          headers={"If-None-Match": manifest.headers["etag"]}).status_code == 304
+        assert client.get("/api/skills/not-a-skill").status_code == 404
+    print("✓ Manifest ETag passed.\n")
+
+def test_bootstrap():
+    print("Testing /api/bootstrap...")
+    with TestClient(app) as client:
+        response = client.get("/api/bootstrap")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["default_skill"] == CORE_SKILL_ID
+        assert data["skills"] == client.get("/api/skills").json()
+        assert data["manifest"] == client.get(f"/api/skills/{CORE_SKILL_ID}").json()
+        assert data["manifest"]["inputs"], "bootstrap should embed the default inputs schema"
+        # 重複請求沿用同一份序列化結果
+        again = client.get("/api/bootstrap")
+        assert again.content == response.content and again.headers["etag"] == response.headers["etag"]
+        assert json.loads(again.content) == data
+    print("✓ Bootstrap passed.\n")
+
+def test_search_and_pagination():
+    print("Testing /api/skills search and pagination...")
+    with TestClient(app) as client:
+        everything = client.get("/api/skills")
+        assert everything.headers["x-total-count"] == str(len(everything.json()))
+
+        found = client.get("/api/skills", params={"q": "FA rep", "fields": "id,version"})
+        assert found.status_code == 200 and found.headers["x-total-count"] == "1"
+        assert found.json() == [{"id": CORE_SKILL_ID, "version": everything.json()[0]["version"]}]
+        assert client.get("/api/skills", params={"q": "失效分析"}).json() == []
+
+        page = client.get("/api/skills", params={"offset": 1, "limit": 10})
+        assert page.json() == everything.json()[1:11]
+        assert page.headers["x-total-count"] == everything.headers["x-total-count"]
+        assert client.get("/api/skills", params={"fields": "id,secret"}).status_code == 400
+        assert client.get("/api/skills", params={"limit": 0}).status_code == 422
+    print("✓ Search / pagination passed.\n")
+
+if __name__ == "__main__":
+    test_manifest_etags()
+    test_bootstrap()
+    test_search_and_pagination()
+    print("All skill API tests passed!")
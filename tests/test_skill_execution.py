@@ -0,0 +1,123 @@
+import asyncio
+import os
+import tempfile
+import time
+from app.services.skill_manager import Skill
+
+SLOW_SCRIPT = """import sys, time
+time.sleep(0.5)
+print("done", *sys.argv[1:])
+"""
+
+FAILING_SCRIPT = """import sys
+sys.stderr.write("boom")
+sys.exit(2)
+"""
+
+WORKER_SCRIPT = """import os
+
+def handle(*args):
+    print("pid", os.getpid(), *args)
+    return args[0] != "fail"
+"""
+
+def make_skill(root, script, metadata=None):
+    scripts_dir = os.path.join(root, "scripts")
+    os.makedirs(scripts_dir, exist_ok=True)
+    with open(os.path.join(scripts_dir, "main.py"), "w", encoding="utf-8") as f:
+        f.write(script)
+    meta = {"name": "demo", "entrypoint": "scripts/main.py"}
+    meta.update(metadata or {})
+    return Skill("demo", root, meta)
+
+def test_run_async_does_not_block_loop():
+    print("Testing Skill.run_async keeps the event loop responsive...")
+    with tempfile.TemporaryDirectory() as root:
+        skill = make_skill(root, SLOW_SCRIPT, {"max_concurrency": 2})
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.05)
+                    ticks += 1
+
+            tick_task = asyncio.create_task(ticker())
+            start = time.perf_counter()
+            results = await asyncio.gather(skill.run_async("a"), skill.run_async("b"))
+            elapsed = time.perf_counter() - start
+            tick_task.cancel()
+            return results, elapsed, ticks
+
+        results, elapsed, ticks = asyncio.run(scenario())
+        assert all(ok for ok, _ in results), results
+        assert "done a" in results[0][1]
+        assert ticks >= 5, f"event loop was blocked (ticks={ticks})"
+        assert elapsed < 0.95, f"runs were not concurrent ({elapsed:.2f}s)"
+    print("✓ Non-blocking execution passed.\n")
+
+def test_run_async_respects_max_concurrency():
+    print("Testing Skill.run_async concurrency limit...")
+    with tempfile.TemporaryDirectory() as root:
+        skill = make_skill(root, SLOW_SCRIPT, {"max_concurrency": 1})
+
+        async def scenario():
+            start = time.perf_counter()
+            await asyncio.gather(skill.run_async(), skill.run_async())
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(scenario())
+        assert elapsed >= 1.0, f"max_concurrency=1 was not enforced ({elapsed:.2f}s)"
+    print("✓ Concurrency limit passed.\n")
+
+def test_run_async_reports_failure():
+    print("Testing Skill.run_async error reporting...")
+    with tempfile.TemporaryDirectory() as root:
+        skill = make_skill(root, FAILING_SCRIPT)
+        ok, message = asyncio.run(skill.run_async())
+        assert not ok
+        assert "boom" in message
+    print("✓ Failure reporting passed.\n")
+
+def test_worker_pool_reuses_and_recycles():
+    print("Testing persistent worker pool...")
+    with tempfile.TemporaryDirectory() as root:
+        skill = make_skill(root, WORKER_SCRIPT, {"worker": {"function": "handle", "pool_size": 1, "max_jobs": 2}})
+
+        async def scenario():
+            outputs = [await skill.run_async(str(i)) for i in range(3)]
+            failed = await skill.run_async("fail")
+            await skill.aclose()
+            return outputs, failed
+
+        outputs, failed = asyncio.run(scenario())
+        assert all(ok for ok, _ in outputs), outputs
+        pids = [out.split()[1] for _, out in outputs]
+        assert pids[0] == pids[1], "worker was not reused"
+        assert pids[1] != pids[2], "worker was not recycled after max_jobs"
+        assert failed[0] is False
+    print("✓ Worker pool passed.\n")
+
+def test_worker_pool_falls_back_to_oneshot():
+    print("Testing worker pool fallback...")
+    with tempfile.TemporaryDirectory() as root:
+        skill = make_skill(root, SLOW_SCRIPT, {"worker": {"function": "missing"}})
+
+        async def scenario():
+            result = await skill.run_async("x")
+            await skill.aclose()
+            return result
+
+        ok, output = asyncio.run(scenario())
+        assert ok and "done x" in output, output
+    print("✓ Worker fallback passed.\n")
+
+if __name__ == "__main__":
+    test_run_async_does_not_block_loop()
+    test_run_async_respects_max_concurrency()
+    test_run_async_reports_failure()
+    test_worker_pool_reuses_and_recycles()
+    test_worker_pool_falls_back_to_oneshot()
+    print("All skill execution tests passed!")
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+from app.services import skill_manager
+from app.services.frontmatter import FrontmatterCache
+from app.services.skill_manager import SkillRegistry
+
+SCRIPT = """import sys, time
+time.sleep(float(sys.argv[1]))
+print("version", "{version}")
+"""
+
+def write_skill(root, name, version, script=SCRIPT):
+    skill_dir = os.path.join(root, name)
+    os.makedirs(os.path.join(skill_dir, "scripts"), exist_ok=True)
+    with open(os.path.join(skill_dir, "SKILL.md"), "w", encoding="utf-8") as f:
+        f.write(f"---\nname: {name}\nversion: \"{version}\"\nentrypoint: scripts/main.py\n---\n# {name}\n")
+    with open(os.path.join(skill_dir, "scripts", "main.py"), "w", encoding="utf-8") as f:
+        f.write(script.replace("{version}", version))
+    # 確保 mtime 變動可被偵測 (部分檔案系統的時間解析度較粗)
+    bump = os.stat(os.path.join(skill_dir, "SKILL.md")).st_mtime + 1
+    os.utime(os.path.join(skill_dir, "SKILL.md"), (bump, bump))
+
+def test_incremental_rescan():
+    print("Testing incremental skill rescans...")
+    with tempfile.TemporaryDirectory() as root:
+        write_skill(root, "alpha", "1.0")
+        write_skill(root, "beta", "1.0")
+        registry = SkillRegistry(root)
+        alpha, beta = registry.get_skill("alpha"), registry.get_skill("beta")
+        listing = registry.list_payload()
+
+        with mock.patch.object(skill_manager, "parse_skill_metadata",
+                               wraps=skill_manager.parse_skill_metadata) as parse:
+            changes, retired = registry.scan_skills()
+            assert parse.call_count == 0, "unchanged skills were re-parsed"
+            assert changes == {"added": [], "updated": [], "removed": []} and not retired
+            assert registry.list_payload() is listing, "unchanged scan invalidated the payload cache"
+
+            # 只 touch 不改內容：沿用原物件
+            path = os.path.join(root, "alpha", "SKILL.md")
+            stamp = os.stat(path).st_mtime + 5
+            os.utime(path, (stamp, stamp))
+            changes, _ = registry.scan_skills()
+            assert registry.get_skill("alpha") is alpha and not changes["updated"]
+
+            # 只改 Markdown 內文：Frontmatter 雜湊相同，同樣沿用原物件
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("More usage notes.\n" * 1000)
+            changes, _ = registry.scan_skills()
+            assert registry.get_skill("alpha") is alpha and not changes["updated"]
+
+            write_skill(root, "alpha", "2.0")
+            write_skill(root, "gamma", "1.0")
+            changes, retired = registry.scan_skills()
+            assert parse.call_count == 2, parse.call_count
+        assert changes == {"added": ["gamma"], "updated": ["alpha"], "removed": []}, changes
+        assert retired == [alpha] and registry.get_skill("alpha").version == "2.0"
+        assert registry.get_skill("beta") is beta
+        assert registry.list_payload().etag != listing.etag
+
+        shutil.rmtree(os.path.join(root, "beta"))
+        changes, retired = registry.scan_skills()
+        assert changes["removed"] == ["beta"] and retired == [beta]
+        assert registry.get_skill("beta") is None
+    print("✓ Incremental rescan passed.\n")
+
+def test_running_job_keeps_old_version():
+    print("Testing hot reload while a job is running...")
+    with tempfile.TemporaryDirectory() as root:
+        write_skill(root, "alpha", "1.0")
+        registry = SkillRegistry(root, reload_interval=0.05)
+
+        async def scenario():
+            registry.start()
+            old = registry.get_skill("alpha")
+            closed = []
+            real_aclose = old.aclose
+
+            async def tracking_aclose():
+                closed.append(old._active)
+                await real_aclose()
+
+            old.aclose = tracking_aclose
+            running = asyncio.create_task(old.run_async("0.6"))
+            await asyncio.sleep(0.1)
+            write_skill(root, "alpha", "2.0")
+            for _ in range(40):
+                await asyncio.sleep(0.05)
+                if registry.get_skill("alpha") is not old:
+                    break
+            new = registry.get_skill("alpha")
+            assert new is not old and new.version == "2.0"
+            assert not closed, "old skill closed while a job was still running"
+
+            new_result = await new.run_async("0")
+            old_result = await running
+            await registry.stop()
+            return old_result, new_result, closed
+
+        old_result, new_result, closed = asyncio.run(scenario())
+        assert old_result[0] and "version 1.0" in old_result[1], old_result
+        assert new_result[0] and "version 2.0" in new_result[1], new_result
+        assert closed == [0], closed
+        assert registry.stats()["reloads"] == 1
+    print("✓ Hot reload passed.\n")
+
+def test_search_index_updates_incrementally():
+    print("Testing skill search index...")
+    with tempfile.TemporaryDirectory() as root:
+        write_skill(root, "pdf-report", "1.0")
+        write_skill(root, "pptx-polish", "1.0")
+        registry = SkillRegistry(root)
+        assert registry.search_skills("pp") == (1, [{"id": "pptx-polish", "name": "pptx-polish",
+                                                     "description": "", "version": "1.0"}])
+        assert registry.search_skills("report polish") == (0, [])
+
+        skill_md = os.path.join(root, "pptx-polish", "SKILL.md")
+        with open(skill_md, "w", encoding="utf-8") as f:
+            f.write("---\nname: pptx-polish\nversion: \"1.1\"\ndescription: 簡報排版修飾\n"
+                    "tags: [slides, report]\n---\n")
+        shutil.rmtree(os.path.join(root, "pdf-report"))
+        registry.scan_skills()
+        assert registry.search_skills("排版")[0] == 1
+        total, items = registry.search_skills("report", fields=["id", "tags"])
+        assert total == 1 and items == [{"id": "pptx-polish", "tags": ["slides", "report"]}], items
+        assert registry.search_skills("pdf") == (0, [])
+        try:
+            registry.search_skills(fields=["nope"])
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+    print("✓ Search index passed.\n")
+
+def test_frontmatter_parser():
+    print("Testing SKILL.md frontmatter parser...")
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "SKILL.md")
+        body = "# 說明\n\n---\nnot: [frontmatter\n" * 5000
+        with open(path, "w", encoding="utf-8-sig") as f:
+            f.write("---\nname: demo\nversion: \"1.2.0\"\ninputs:\n  - id: report\n    type: file\n---\n" + body)
+        cache = FrontmatterCache()
+        metadata = cache.parse(path)
+        assert metadata == {"name": "demo", "version": "1.2.0", "inputs": [{"id": "report", "type": "file"}]}
+        metadata["name"] = "mutated"
+        assert cache.parse(path)["name"] == "demo" and (cache.hits, cache.misses) == (1, 1)
+
+        # 內容變動 (大小或 mtime 改變) 後重新解析
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("前言\n---\nname: legacy\n---\n" + body)
+        assert cache.parse(path) == {"name": "legacy"} and cache.misses == 2
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("---\nname: unterminated\n")
+        os.utime(path, (1, 1))
+        assert cache.parse(path) is None
+        assert cache.parse(os.path.join(root, "missing.md")) is None
+    print("✓ Frontmatter parser passed.\n")
+
+def test_manifest_snapshot():
+    print("Testing manifest snapshot loading...")
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as cache_dir:
+        for name in ("alpha", "beta", "gamma"):
+            write_skill(os.path.join(root, "skills"), name, "1.0")
+        skills_dir = os.path.join(root, "skills")
+        manifest = os.path.join(cache_dir, "skills_manifest.json")
+        SkillRegistry(skills_dir, manifest_path=manifest)
+        assert os.path.exists(manifest)
+
+        # 第二次啟動：全部由快照載入，不讀取也不解析 SKILL.md
+        with mock.patch.object(skill_manager, "parse_skill_metadata",
+                               wraps=skill_manager.parse_skill_metadata) as parse:
+            written_at = os.stat(manifest).st_mtime_ns
+            registry = SkillRegistry(skills_dir, manifest_path=manifest)
+            assert parse.call_count == 0 and registry.snapshot_hits == 3
+            assert registry.get_skill("beta").version == "1.0"
+            assert os.stat(manifest).st_mtime_ns == written_at, "unchanged snapshot was rewritten"
+
+            # 快照過期的技能重新解析
+            write_skill(skills_dir, "beta", "2.0")
+            registry = SkillRegistry(skills_dir, manifest_path=manifest)
+            assert parse.call_count == 1 and registry.snapshot_hits == 2
+            assert registry.get_skill("beta").version == "2.0"
+
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        assert len(SkillRegistry(skills_dir, manifest_path=manifest).skills) == 3
+    print("✓ Manifest snapshot passed.\n")
+
+def test_import_is_lazy():
+    print("Testing that importing the app does not scan skills or touch the disk...")
+    code = ("import os, sys, app.main\n"
+            "from app.services import skill_manager, result_cache, storage\n"
+            "assert skill_manager._skill_registry is None\n"
+            "assert result_cache._result_cache is None and storage._upload_storage is None\n"
+            "assert os.listdir(os.environ['LAZY_ROOT']) == [], os.listdir(os.environ['LAZY_ROOT'])\n"
+            "assert skill_manager.skill_registry is skill_manager.get_skill_registry()\n"
+            "assert skill_manager.skill_manager.get_skill() is not None\n"
+            "assert storage.upload_storage is storage.get_upload_storage()\n"
+            "assert os.path.isdir(os.path.join(os.environ['LAZY_ROOT'], 'uploads'))\n")
+    with tempfile.TemporaryDirectory() as root:
+        env = dict(os.environ, SKILL_MANIFEST_PATH="", LAZY_ROOT=root,
+                   UPLOAD_DIR=os.path.join(root, "uploads"), RESULT_CACHE_DIR=os.path.join(root, "results"))
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    assert result.returncode == 0, result.stderr
+    print("✓ Lazy import passed.\n")
+
+if __name__ == "__main__":
+    test_incremental_rescan()
+    test_running_job_keeps_old_version()
+    test_search_index_updates_incrementally()
+    test_frontmatter_parser()
+    test_manifest_snapshot()
+    test_import_is_lazy()
+    print("All skill registry tests passed!")
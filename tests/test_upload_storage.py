@@ -0,0 +1,135 @@
+import asyncio
+import io
+import os
+import tempfile
+import time
+from app.services.storage import UploadStorage, StorageGC, safe_filename
+
+class FakeUpload:
+    """模擬 Starlette UploadFile 的非同步分塊讀取介面"""
+
+    def __init__(self, filename, data):
+        self.filename = filename
+        self._buffer = io.BytesIO(data)
+
+    async def read(self, size=-1):
+        return self._buffer.read(size)
+
+def test_content_addressed_dedupe():
+    print("Testing UploadStorage dedupe and workspaces...")
+    with tempfile.TemporaryDirectory() as root:
+        storage = UploadStorage(root)
+        data = os.urandom(3 * 1024 * 1024 + 17)
+
+        async def scenario():
+            return await asyncio.gather(
+                storage.save_upload(FakeUpload("deck.pptx", data)),
+                storage.save_upload(FakeUpload("deck.pptx", data))
+            )
+
+        first, second = asyncio.run(scenario())
+        assert first.sha256 == second.sha256 and first.path == second.path
+        assert first.size == len(data)
+        assert os.listdir(storage.tmp_dir) == []
+
+        ws_a, ws_b = storage.create_workspace(), storage.create_workspace()
+        path_a = storage.materialize(first, ws_a, "deck.pptx")
+        path_b = storage.materialize(second, ws_b, "deck.pptx")
+        assert path_a != path_b
+        with open(path_b, "rb") as f:
+            assert f.read() == data
+    print("✓ Dedupe and workspaces passed.\n")
+
+def test_path_safety():
+    print("Testing UploadStorage path safety...")
+    with tempfile.TemporaryDirectory() as root:
+        storage = UploadStorage(root)
+        assert safe_filename("../../etc/passwd") == "passwd"
+        assert safe_filename("..\\..\\evil.pptx") == "evil.pptx"
+        assert safe_filename("..") == "upload"
+        assert storage.resolve("../outside.pptx") is None
+        assert storage.resolve("blobs/ab/abcdef") is None
+        ws = storage.create_workspace()
+        assert storage.resolve(f"{ws}/out.pptx") == os.path.realpath(os.path.join(root, ws, "out.pptx"))
+    print("✓ Path safety passed.\n")
+
+def make_workspace(storage, size, age, pinned=False):
+    ws = storage.create_workspace()
+    path = storage.workspace_path(ws, "out.pptx")
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    if not pinned:
+        storage.release(ws)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    os.utime(storage.workspace_path(ws), (stamp, stamp))
+    return ws
+
+def test_gc_quota_age_and_pins():
+    print("Testing StorageGC quota, age and pinning...")
+    with tempfile.TemporaryDirectory() as root:
+        storage = UploadStorage(root)
+        expired = make_workspace(storage, 1000, age=7200)
+        oldest = make_workspace(storage, 1000, age=300)
+        older = make_workspace(storage, 1000, age=200, pinned=True)  # 模擬進行中的工作
+        newest = make_workspace(storage, 1000, age=100)
+
+        gc = StorageGC(storage, quota_bytes=2000, max_age_seconds=3600)
+        result = gc.run_once()
+        remaining = set(os.listdir(root)) - {"blobs"}
+        assert expired not in remaining, "expired workspace was kept"
+        assert oldest not in remaining, "LRU workspace was kept over quota"
+        assert older in remaining, "pinned workspace was evicted"
+        assert newest in remaining
+        assert result == {"expired": 1, "quota": 1, "freed_bytes": 2000}, result
+        assert gc.stats()["usage_bytes"] == 2000
+
+    # blob 與工作目錄中的輸入檔互為硬連結：刪掉其中一端不會釋放空間
+    with tempfile.TemporaryDirectory() as root:
+        storage = UploadStorage(root)
+        blob = asyncio.run(storage.save_upload(FakeUpload("deck.pptx", os.urandom(1000))))
+        linked = storage.create_workspace()
+        input_path = storage.materialize(blob, linked, "deck.pptx")
+        storage.release_blob(blob.sha256)
+        storage.release(linked)
+        assert os.stat(input_path).st_nlink == 2
+        stamp = time.time() - 400
+        os.utime(blob.path, (stamp, stamp))
+        os.utime(storage.workspace_path(linked), (stamp + 100, stamp + 100))
+        newest = make_workspace(storage, 1000, age=100)
+
+        gc = StorageGC(storage, quota_bytes=1000, max_age_seconds=3600)
+        result = gc.run_once()
+        assert not os.path.exists(blob.path) and not os.path.exists(input_path)
+        assert newest in os.listdir(root), "GC kept evicting after the quota was met"
+        assert result == {"expired": 0, "quota": 2, "freed_bytes": 1000}, result
+        assert gc.stats()["usage_bytes"] == 1000
+    print("✓ StorageGC passed.\n")
+
+def test_gc_skips_unmaterialized_blobs():
+    print("Testing StorageGC blob pinning...")
+    with tempfile.TemporaryDirectory() as root:
+        storage = UploadStorage(root)
+        blob = asyncio.run(storage.save_upload(FakeUpload("deck.pptx", os.urandom(1000))))
+        stamp = time.time() - 7200
+        os.utime(blob.path, (stamp, stamp))
+
+        gc = StorageGC(storage, quota_bytes=0, max_age_seconds=3600)
+        assert gc.run_once()["freed_bytes"] == 0
+        assert os.path.exists(blob.path), "blob was evicted before it was materialized"
+
+        ws = storage.create_workspace()
+        storage.materialize(blob, ws, "deck.pptx")
+        storage.release_blob(blob.sha256)
+        storage.discard_workspace(ws)
+        assert not os.path.exists(storage.workspace_path(ws)) and not storage.is_pinned(ws)
+        assert gc.run_once() == {"expired": 1, "quota": 0, "freed_bytes": 1000}
+        assert not os.path.exists(blob.path)
+    print("✓ Blob pinning passed.\n")
+
+if __name__ == "__main__":
+    test_content_addressed_dedupe()
+    test_path_safety()
+    test_gc_quota_age_and_pins()
+    test_gc_skips_unmaterialized_blobs()
+    print("All upload storage tests passed!")